@@ -0,0 +1,496 @@
+"""Batches of cascading scans over many targets.
+
+A batch is a list of target specs (hosts, IPs or CIDR ranges). CIDRs are
+expanded lazily: targets are materialized one at a time as the scheduler
+reaches them, so a /16 costs a cursor, not 65k rows. Every batch is stored
+in SQLite together with its cursor and per-target results, so batches
+resume where they left off after a webapp restart.
+
+The scheduler hands targets to the scan registry round-robin across the
+running batches (one large batch does not starve a small one), only while
+the registry has a free slot (interactive scans never wait behind a batch)
+and no faster than a token bucket allows (BATCH_SUBMIT_RATE per second,
+bursts of BATCH_SUBMIT_BURST).
+"""
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import tempfile
+import ipaddress
+import threading
+
+from scan_registry import QueueFull, RUNNING, COMPLETED, FAILED, CANCELLED
+
+BATCH_DB_PATH = os.environ.get("BATCH_DB_PATH", os.path.join(tempfile.gettempdir(), "webapp-all-batches.sqlite3"))
+# Scans started per second by all batches together, and how many may start at once
+BATCH_SUBMIT_RATE = float(os.environ.get("BATCH_SUBMIT_RATE", "0.5"))
+BATCH_SUBMIT_BURST = max(1, int(os.environ.get("BATCH_SUBMIT_BURST", "2")))
+# Largest CIDR range and batch accepted, in targets
+BATCH_MAX_CIDR_HOSTS = int(os.environ.get("BATCH_MAX_CIDR_HOSTS", "65536"))
+BATCH_MAX_TARGETS = int(os.environ.get("BATCH_MAX_TARGETS", "1000000"))
+# Seconds between scheduler passes when nothing wakes it earlier
+BATCH_POLL_INTERVAL = float(os.environ.get("BATCH_POLL_INTERVAL", "5"))
+
+# Batch states
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_CANCELLED = "cancelled"
+# Target states: the scan registry's, plus pending (not handed to the registry yet)
+PENDING = "pending"
+QUEUED = "queued"
+TARGET_STATES = (PENDING, QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)
+_ACTIVE_TARGET_STATES = (QUEUED, RUNNING)
+_TERMINAL_TARGET_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_HOSTNAME = re.compile(r"^[A-Za-z0-9_]([A-Za-z0-9_.-]{0,252})$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    state TEXT NOT NULL,
+    specs TEXT NOT NULL,
+    options TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    cursor_spec INTEGER NOT NULL DEFAULT 0,
+    cursor_offset INTEGER NOT NULL DEFAULT 0,
+    materialized INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_batches_state ON batches (state, created_at);
+CREATE TABLE IF NOT EXISTS batch_targets (
+    batch_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    state TEXT NOT NULL,
+    scan_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    return_code INTEGER,
+    error TEXT,
+    ports INTEGER,
+    endpoints INTEGER,
+    findings INTEGER,
+    time_saved REAL,
+    artifacts TEXT,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (batch_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_batch_targets_state ON batch_targets (batch_id, state, seq);
+CREATE INDEX IF NOT EXISTS idx_batch_targets_scan ON batch_targets (scan_id);
+"""
+
+
+class InvalidBatch(Exception):
+    pass
+
+
+def _network(spec):
+    return ipaddress.ip_network(spec, strict=False) if "/" in spec else None
+
+
+def _host_range(network):
+    """(first host index, host count) of a network: network/broadcast addresses are skipped"""
+    if network.num_addresses <= 2:
+        return 0, network.num_addresses
+    if network.version == 4:
+        return 1, network.num_addresses - 2
+    return 1, network.num_addresses - 1
+
+
+def spec_size(spec):
+    network = _network(spec)
+    return _host_range(network)[1] if network else 1
+
+
+def target_at(spec, index):
+    """The index-th target of a spec, without expanding the rest of it"""
+    network = _network(spec)
+    if network is None:
+        return spec
+    first, _ = _host_range(network)
+    return str(network.network_address + first + index)
+
+
+def parse_targets(entries):
+    """Validated target specs from a list of strings or a text blob.
+
+    Text is split on whitespace and commas; '#' starts a comment. Raises
+    InvalidBatch on a malformed entry, an oversized CIDR or an empty list.
+    """
+    if isinstance(entries, str):
+        entries = [re.sub(r"#.*", "", line) for line in entries.splitlines()]
+    specs = []
+    for entry in entries:
+        for spec in re.split(r"[\s,]+", str(entry).strip()):
+            if not spec:
+                continue
+            if "/" in spec:
+                try:
+                    network = ipaddress.ip_network(spec, strict=False)
+                except ValueError:
+                    raise InvalidBatch(f"Invalid CIDR range: {spec}")
+                if _host_range(network)[1] > BATCH_MAX_CIDR_HOSTS:
+                    raise InvalidBatch(f"CIDR range {spec} exceeds {BATCH_MAX_CIDR_HOSTS} hosts")
+                specs.append(str(network))
+                continue
+            try:
+                specs.append(str(ipaddress.ip_address(spec)))
+            except ValueError:
+                if not _HOSTNAME.match(spec):
+                    raise InvalidBatch(f"Invalid target: {spec}")
+                specs.append(spec.lower())
+    if not specs:
+        raise InvalidBatch("No targets given")
+    total = sum(spec_size(spec) for spec in specs)
+    if total > BATCH_MAX_TARGETS:
+        raise InvalidBatch(f"Batch has {total} targets (limit {BATCH_MAX_TARGETS})")
+    return specs
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, `burst` at once"""
+
+    def __init__(self, rate=BATCH_SUBMIT_RATE, burst=BATCH_SUBMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else BATCH_POLL_INTERVAL
+
+
+class BatchScheduler:
+    """Feeds the targets of every running batch to a ScanRegistry.
+
+    Targets are checkpointed as pending before they are submitted, so after a
+    restart every target is either still to come (behind the cursor), pending,
+    or has a scan; targets whose scans the registry could not recover are
+    submitted again (at least once). start() runs after the registry's
+    recover(); start() and stop() run on the loop.
+    """
+
+    def __init__(self, registry, path=BATCH_DB_PATH, bucket=None):
+        self.registry = registry
+        self.path = path
+        self.bucket = bucket or TokenBucket()
+        self._local = threading.local()
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._last_batch = None
+        registry.add_state_listener(self._on_scan_state)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- lifecycle --------------------------------------------------------------
+
+    def start(self):
+        """Recover interrupted batches and start scheduling on the running loop"""
+        self._stopping = False
+        self._loop = asyncio.get_event_loop()
+        self._wake = asyncio.Event()
+        conn = self._connect()
+        active = conn.execute(
+            f"SELECT batch_id, seq, scan_id FROM batch_targets WHERE state IN ({','.join('?' * len(_ACTIVE_TARGET_STATES))})"
+            " AND batch_id IN (SELECT id FROM batches WHERE state = ?)",
+            _ACTIVE_TARGET_STATES + (BATCH_RUNNING,)).fetchall()
+        recovered = 0
+        with conn:
+            for row in active:
+                record = self.registry.get(row["scan_id"]) if row["scan_id"] else None
+                if record is not None and record.active:
+                    # Reattached or queued again by the registry's recover()
+                    continue
+                # Its scan went away with the previous process: submit it again
+                conn.execute("UPDATE batch_targets SET state = ?, scan_id = NULL WHERE batch_id = ? AND seq = ?",
+                             (PENDING, row["batch_id"], row["seq"]))
+                recovered += 1
+        running = conn.execute("SELECT COUNT(*) FROM batches WHERE state = ?", (BATCH_RUNNING,)).fetchone()[0]
+        if running:
+            print(f"[BATCH] Resuming {running} batches ({recovered} interrupted targets)")
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop scheduling; targets in flight stay checkpointed and run again on the next start"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # --- submission -------------------------------------------------------------
+
+    def create(self, specs, options=None, name=None):
+        """Store a new batch of parsed specs (see parse_targets); returns its dict"""
+        batch_id = f"batch-{int(time.time())}-{uuid.uuid4().hex[:6]}"
+        total = sum(spec_size(spec) for spec in specs)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO batches (id, name, state, specs, options, total, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (batch_id, name, BATCH_RUNNING, json.dumps(specs), json.dumps(options or {}), total, time.time()))
+        print(f"[BATCH] Created {batch_id}: {total} targets from {len(specs)} specs")
+        self.wake()
+        return self.get(batch_id)
+
+    async def cancel(self, batch_id):
+        """Cancel a batch: drop its remaining targets and stop its scans; returns its dict or None"""
+        conn = self._connect()
+        with conn:
+            updated = conn.execute("UPDATE batches SET state = ?, finished_at = ? WHERE id = ? AND state = ?",
+                                   (BATCH_CANCELLED, time.time(), batch_id, BATCH_RUNNING)).rowcount
+            if updated:
+                conn.execute("UPDATE batch_targets SET state = ? WHERE batch_id = ? AND state = ?",
+                             (CANCELLED, batch_id, PENDING))
+        if updated:
+            active = conn.execute(
+                f"SELECT scan_id FROM batch_targets WHERE batch_id = ? AND state IN ({','.join('?' * len(_ACTIVE_TARGET_STATES))})",
+                (batch_id,) + _ACTIVE_TARGET_STATES).fetchall()
+            for row in active:
+                await self.registry.cancel(row["scan_id"])
+            print(f"[BATCH] Cancelled {batch_id} ({len(active)} scans stopped)")
+        return self.get(batch_id)
+
+    # --- scheduling ---------------------------------------------------------------
+
+    async def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                delay = await self._tick()
+            except Exception as e:
+                print(f"[BATCH] Scheduler error: {e}")
+                delay = BATCH_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _has_free_slot(self):
+        stats = self.registry.stats()
+        return stats["running"] + stats["queued"] < self.registry.max_concurrent
+
+    async def _tick(self):
+        """Submit targets while slots and tokens allow; returns seconds until the next pass"""
+        while not self._stopping:
+            if not self._has_free_slot():
+                # A finishing scan wakes the scheduler
+                return BATCH_POLL_INTERVAL
+            batch_id = self._next_batch()
+            if batch_id is None:
+                return BATCH_POLL_INTERVAL
+            wait = self.bucket.take()
+            if wait:
+                return wait
+            if not await self._submit_next(batch_id):
+                return BATCH_POLL_INTERVAL
+        return BATCH_POLL_INTERVAL
+
+    def _next_batch(self):
+        """The running batch after the last one served that still has targets to submit"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, total, materialized FROM batches WHERE state = ? ORDER BY created_at, id",
+            (BATCH_RUNNING,)).fetchall()
+        candidates = []
+        for row in rows:
+            if row["materialized"] < row["total"] or conn.execute(
+                    "SELECT 1 FROM batch_targets WHERE batch_id = ? AND state = ? LIMIT 1",
+                    (row["id"], PENDING)).fetchone():
+                candidates.append(row["id"])
+        if not candidates:
+            return None
+        ids = [row["id"] for row in rows]
+        last = ids.index(self._last_batch) if self._last_batch in ids else -1
+        # Round-robin: continue after the batch served last
+        ordered = [batch_id for batch_id in ids[last + 1:] + ids[:last + 1] if batch_id in candidates]
+        self._last_batch = ordered[0]
+        return ordered[0]
+
+    def _checkpoint_next(self, conn, batch_id):
+        """The batch's oldest pending target, materializing the next one from its specs if none"""
+        row = conn.execute("SELECT seq, target FROM batch_targets WHERE batch_id = ? AND state = ? ORDER BY seq LIMIT 1",
+                           (batch_id, PENDING)).fetchone()
+        if row:
+            return row["seq"], row["target"]
+        batch = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if batch["materialized"] >= batch["total"]:
+            return None
+        specs = json.loads(batch["specs"])
+        spec_index, offset = batch["cursor_spec"], batch["cursor_offset"]
+        target = target_at(specs[spec_index], offset)
+        offset += 1
+        if offset >= spec_size(specs[spec_index]):
+            spec_index, offset = spec_index + 1, 0
+        seq = batch["materialized"]
+        with conn:
+            conn.execute("INSERT INTO batch_targets (batch_id, seq, target, state) VALUES (?, ?, ?, ?)",
+                         (batch_id, seq, target, PENDING))
+            conn.execute("UPDATE batches SET cursor_spec = ?, cursor_offset = ?, materialized = ? WHERE id = ?",
+                         (spec_index, offset, seq + 1, batch_id))
+        return seq, target
+
+    async def _submit_next(self, batch_id):
+        conn = self._connect()
+        checkpoint = self._checkpoint_next(conn, batch_id)
+        if checkpoint is None:
+            self._refresh_state(conn, batch_id)
+            return True
+        seq, target = checkpoint
+        options = json.loads(conn.execute("SELECT options FROM batches WHERE id = ?", (batch_id,)).fetchone()[0])
+        options.update(batch_id=batch_id, batch_seq=seq)
+        try:
+            record = await self.registry.submit(target, options=options)
+        except QueueFull as e:
+            print(f"[BATCH] Registry queue full, {batch_id} waits: {e}")
+            return False
+        with conn:
+            # The registry may have started (or even failed) it already; only move forward from pending
+            conn.execute("UPDATE batch_targets SET scan_id = ?, attempts = attempts + 1,"
+                         " state = CASE WHEN state = ? THEN ? ELSE state END WHERE batch_id = ? AND seq = ?",
+                         (record.id, PENDING, QUEUED, batch_id, seq))
+        return True
+
+    def _on_scan_state(self, record, old_state, new_state):
+        batch_id = record.options.get("batch_id")
+        if batch_id is None:
+            return
+        if self._stopping and new_state == CANCELLED:
+            # Stopped by the shutdown, not by a user: keep the target to run after the restart
+            return
+        conn = self._connect()
+        if new_state == RUNNING:
+            with conn:
+                conn.execute("UPDATE batch_targets SET state = ?, scan_id = ?, started_at = ? WHERE batch_id = ? AND seq = ?",
+                             (RUNNING, record.id, record.started_at or time.time(), batch_id, record.options.get("batch_seq")))
+            return
+        if new_state not in _TERMINAL_TARGET_STATES:
+            return
+        progress = record.progress.snapshot()
+        counts = progress["counts"]
+        with conn:
+            conn.execute(
+                "UPDATE batch_targets SET state = ?, scan_id = ?, return_code = ?, error = ?, ports = ?, endpoints = ?,"
+                " findings = ?, time_saved = ?, artifacts = ?, finished_at = ? WHERE batch_id = ? AND seq = ?",
+                (new_state, record.id, record.return_code, record.error, counts.get("ports"), counts.get("endpoints"),
+                 counts.get("findings"), progress["time_saved_seconds"], json.dumps(progress["artifacts"]),
+                 record.finished_at or time.time(), batch_id, record.options.get("batch_seq")))
+        self._refresh_state(conn, batch_id)
+        self.wake()
+
+    def _refresh_state(self, conn, batch_id):
+        """Mark a running batch completed once every target has finished"""
+        placeholders = ','.join('?' * len(_TERMINAL_TARGET_STATES))
+        with conn:
+            updated = conn.execute(
+                "UPDATE batches SET state = ?, finished_at = ? WHERE id = ? AND state = ? AND materialized >= total"
+                f" AND NOT EXISTS (SELECT 1 FROM batch_targets WHERE batch_id = ? AND state NOT IN ({placeholders}))",
+                (BATCH_COMPLETED, time.time(), batch_id, BATCH_RUNNING, batch_id) + _TERMINAL_TARGET_STATES).rowcount
+        if updated:
+            print(f"[BATCH] {batch_id} completed")
+
+    # --- queries ------------------------------------------------------------------
+
+    def _batch_dict(self, conn, batch):
+        counts = dict.fromkeys(TARGET_STATES, 0)
+        for row in conn.execute("SELECT state, COUNT(*) FROM batch_targets WHERE batch_id = ? GROUP BY state",
+                                (batch["id"],)):
+            counts[row[0]] = row[1]
+        # Targets behind the cursor have not been materialized yet; a cancelled batch never will
+        counts[CANCELLED if batch["state"] == BATCH_CANCELLED else PENDING] += batch["total"] - batch["materialized"]
+        done = counts[COMPLETED] + counts[FAILED] + counts[CANCELLED]
+        return {
+            "id": batch["id"],
+            "name": batch["name"],
+            "state": batch["state"],
+            "options": json.loads(batch["options"]),
+            "specs": len(json.loads(batch["specs"])),
+            "total": batch["total"],
+            "targets": counts,
+            "percent": round(100.0 * done / batch["total"], 1) if batch["total"] else 100.0,
+            "created_at": batch["created_at"],
+            "finished_at": batch["finished_at"],
+        }
+
+    def get(self, batch_id):
+        conn = self._connect()
+        batch = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return self._batch_dict(conn, batch) if batch else None
+
+    def list(self, state=None):
+        conn = self._connect()
+        if state:
+            rows = conn.execute("SELECT * FROM batches WHERE state = ? ORDER BY created_at DESC", (state,)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM batches ORDER BY created_at DESC").fetchall()
+        return [self._batch_dict(conn, row) for row in rows]
+
+    def results(self, batch_id, state=None, limit=100, offset=0):
+        """Per-target results of a batch and their totals, or None for an unknown batch"""
+        batch = self.get(batch_id)
+        if batch is None:
+            return None
+        if state is not None and state not in TARGET_STATES:
+            raise InvalidBatch(f"Unknown target state: {state}")
+        conn = self._connect()
+        totals = conn.execute(
+            "SELECT COALESCE(SUM(ports), 0), COALESCE(SUM(endpoints), 0), COALESCE(SUM(findings), 0),"
+            " COALESCE(SUM(time_saved), 0) FROM batch_targets WHERE batch_id = ?", (batch_id,)).fetchone()
+        where, params = "batch_id = ?", [batch_id]
+        if state:
+            where += " AND state = ?"
+            params.append(state)
+        rows = conn.execute(f"SELECT * FROM batch_targets WHERE {where} ORDER BY seq LIMIT ? OFFSET ?",
+                            params + [max(1, min(limit, 1000)), max(0, offset)]).fetchall()
+        targets = []
+        for row in rows:
+            target = dict(row)
+            target["artifacts"] = json.loads(row["artifacts"]) if row["artifacts"] else []
+            del target["batch_id"]
+            targets.append(target)
+        return {
+            "batch": batch,
+            "aggregate": {"ports": totals[0], "endpoints": totals[1], "findings": totals[2],
+                          "time_saved_seconds": round(totals[3], 1)},
+            "targets": targets,
+            "limit": limit,
+            "offset": offset,
+        }
+
+    def stats(self):
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT state, COUNT(*) FROM batches GROUP BY state").fetchall())
+        return {
+            "path": self.path,
+            "submit_rate": self.bucket.rate,
+            "submit_burst": self.bucket.burst,
+            "batches": counts,
+            "scheduler_running": self._task is not None and not self._task.done(),
+        }
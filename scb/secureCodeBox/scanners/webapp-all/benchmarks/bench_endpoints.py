@@ -0,0 +1,370 @@
+"""Load benchmark of webapp-all endpoints against a local S3 stand-in.
+
+Usage (from the webapp-all directory, after pip install -r benchmarks/requirements.txt):
+
+    python3 benchmarks/bench_endpoints.py --sizes 10,1000,100000 --requests 200 --concurrency 8 --json > bench.json
+
+For every bucket size a moto S3 server (or --s3-endpoint, e.g. a local
+MinIO binary) is seeded with synthetic naabu/tlsx/zap/nuclei objects, and
+the webapp is started with uvicorn in a child process, with the Kubernetes
+API stubbed (see bench_kube_client.py) and its state files in a temporary
+directory. /discover-files, /list-scan-folders, /download-folder and
+/download-nuclei are then driven by --concurrency parallel clients;
+/stream-output is measured as synthetic scans whose output is replayed to
+--concurrency subscribers each. Reported per endpoint: the first (cold
+index) request, p50/p99/mean latency of full responses, throughput and the
+server's peak RSS (Linux; VmHWM, reset before every endpoint).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import concurrent.futures
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, APP_DIR)
+
+import boto3
+import requests
+from botocore.config import Config
+
+from bench_kube_client import start_stub_cluster
+
+# Scan folder every size has (sizes below 4 objects have no folder at all)
+HOT_FOLDER = "scan-00000000"
+NUCLEI_LINES = 20
+HTTP_TIMEOUT = 600
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- synthetic bucket contents ------------------------------------------------
+
+def synthetic_object(i):
+    """(key, body) of the i-th object: each scan folder has tlsx findings, a ZAP report and
+    nuclei results, next to a top-level naabu export, like a cascade leaves them"""
+    folder = f"scan-{i // 4:08x}"
+    host = f"10.{(i // 4) >> 16 & 255}.{(i // 4) >> 8 & 255}.{(i // 4) & 255}"
+    kind = i % 4
+    if kind == 0:
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime(1790000000 + i))
+        body = [{"name": f"Port {port} open", "category": "Open Port", "severity": "INFORMATIONAL",
+                 "location": f"tcp://{host}:{port}", "attributes": {"host": host, "ip": host, "port": port,
+                                                                   "protocol": "tcp"}} for port in (22, 80, 443)]
+        return f"naabu-findings-{host.replace('.', '_')}-{stamp}.json", json.dumps(body)
+    if kind == 1:
+        body = [{"name": "TLS certificate", "category": "TLS", "severity": "INFORMATIONAL",
+                 "location": f"{host}:443", "attributes": {"host": host, "port": "443", "tls_version": "tls13",
+                                                           "cipher": "TLS_AES_128_GCM_SHA256",
+                                                           "subject_cn": f"{host}.example", "serial": f"{i:x}"}}]
+        return f"{folder}/findings.json", json.dumps(body)
+    if kind == 2:
+        rows = "".join(f"<tr><td>Alert {n}</td><td>Medium</td><td>https://{host}/path/{n}</td></tr>"
+                       for n in range(20))
+        return f"{folder}/zap-report.html", f"<html><body><h1>ZAP report {host}</h1><table>{rows}</table></body></html>"
+    lines = (json.dumps({"template-id": f"tech-detect-{n}", "host": host, "matched-at": f"https://{host}:443/",
+                         "type": "http", "timestamp": "2026-10-01T00:00:00Z",
+                         "info": {"name": f"Template {n}", "severity": ("info", "low", "medium", "high")[n % 4]}})
+             for n in range(NUCLEI_LINES))
+    return f"{folder}/nuclei-results.jsonl", "\n".join(lines) + "\n"
+
+
+def seed_bucket(s3, bucket, count, workers):
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except s3.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    def put(i):
+        key, body = synthetic_object(i)
+        s3.put_object(Bucket=bucket, Key=key, Body=body.encode())
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(put, range(count)):
+            pass
+    return time.perf_counter() - start
+
+
+# --- webapp under test ----------------------------------------------------------
+
+def serve(port, stream_lines):
+    """--serve mode: run the webapp with scans that only print synthetic output"""
+    os.chdir(APP_DIR)
+    import uvicorn
+    import main_patched
+
+    script = f"for i in range({stream_lines}):\n    print(f'[bench] line {{i}} ' + 'x' * 80)\n"
+
+    def build_command(record):
+        return [sys.executable, "-c", script], APP_DIR
+
+    main_patched.scan_registry.command_builder = build_command
+    uvicorn.run(main_patched.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+class WebappProcess:
+    def __init__(self, s3_endpoint, bucket, stream_lines, state_dir, kubeconfig, log):
+        self.port = _free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        env = dict(os.environ,
+                   MINIO_ENDPOINT=s3_endpoint, MINIO_BUCKET=bucket, KUBECONFIG=kubeconfig,
+                   FINDINGS_DB_PATH=os.path.join(state_dir, "findings.sqlite3"),
+                   STATE_JOURNAL_PATH=os.path.join(state_dir, "state.sqlite3"),
+                   BATCH_DB_PATH=os.path.join(state_dir, "batches.sqlite3"),
+                   CASCADE_CACHE_PATH=os.path.join(state_dir, "cascade-cache.sqlite3"),
+                   BULK_FETCH_CACHE_DIR=os.path.join(state_dir, "bulk-fetch"),
+                   SCAN_LOG_DIR=os.path.join(state_dir, "scan-logs"),
+                   SCAN_EVENTS_DIR=os.path.join(state_dir, "scan-events"),
+                   SCAN_MAX_PER_TARGET="100")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(self.port),
+             "--stream-lines", str(stream_lines)],
+            cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"webapp exited with code {self.process.returncode}")
+            try:
+                if requests.get(f"{self.base}/status", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("webapp did not become ready")
+
+    def reset_peak_rss(self):
+        # Writing 5 to clear_refs resets VmHWM (Linux >= 4.0)
+        try:
+            with open(f"/proc/{self.process.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    def peak_rss_mb(self):
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+# --- load driver ------------------------------------------------------------------
+
+_sessions = threading.local()
+
+
+def _session():
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def fetch(url):
+    """(seconds, ok, bytes) of one full GET, body included"""
+    start = time.perf_counter()
+    try:
+        with _session().get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+            size = sum(len(chunk) for chunk in response.iter_content(65536))
+            ok = response.status_code < 400
+    except requests.RequestException:
+        ok, size = False, 0
+    return time.perf_counter() - start, ok, size
+
+
+def summarize(results, wall, concurrency):
+    latencies = sorted(r[0] * 1000 for r in results) or [0.0]
+    total_bytes = sum(r[2] for r in results)
+    return {
+        "requests": len(results),
+        "concurrency": concurrency,
+        "errors": sum(1 for r in results if not r[1]),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "throughput_rps": round(len(results) / wall, 2) if wall else None,
+        "mb_per_s": round(total_bytes / wall / 1e6, 3) if wall else None,
+        "bytes_per_response": round(total_bytes / len(results)) if results else 0,
+    }
+
+
+def run_endpoint(url, count, concurrency):
+    first = fetch(url)
+    wall_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: fetch(url), range(count)))
+    report = summarize(results, time.perf_counter() - wall_start, concurrency)
+    report["first_request_ms"] = round(first[0] * 1000, 3)
+    report["first_request_ok"] = first[1]
+    return report
+
+
+def _read_stream(url):
+    """(seconds, ok, output lines) of one /stream-output subscription read to its end"""
+    start = time.perf_counter()
+    lines = 0
+    try:
+        with requests.get(url, stream=True, timeout=HTTP_TIMEOUT) as response:
+            ok = response.status_code < 400
+            for line in response.iter_lines():
+                if line.startswith(b"data: ") and b'"output"' in line:
+                    lines += 1
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok, lines
+
+
+def run_stream(base, rounds, subscribers):
+    """Full replays of synthetic scans, each fanned out to `subscribers` clients"""
+    results = []
+    wall_start = time.perf_counter()
+    for n in range(rounds):
+        response = requests.post(f"{base}/scans", json={"target": f"bench-{n}.local"}, timeout=30)
+        response.raise_for_status()
+        url = f"{base}/stream-output?scan_id={response.json()['id']}"
+        with concurrent.futures.ThreadPoolExecutor(max_workers=subscribers) as executor:
+            results.extend(executor.map(lambda _: _read_stream(url), range(subscribers)))
+    wall = time.perf_counter() - wall_start
+    report = summarize([(seconds, ok, 0) for seconds, ok, _ in results], wall, subscribers)
+    lines = sum(r[2] for r in results)
+    report.pop("mb_per_s")
+    report.pop("bytes_per_response")
+    report["scans"] = rounds
+    report["lines_per_subscriber"] = round(lines / len(results)) if results else 0
+    report["lines_per_s"] = round(lines / wall, 1) if wall else None
+    return report
+
+
+def bench_size(args, s3, s3_endpoint, kubeconfig, count, log):
+    bucket = f"bench-{count}"
+    seed_seconds = seed_bucket(s3, bucket, count, args.seed_workers)
+    with tempfile.TemporaryDirectory(prefix="webapp-bench-") as state_dir:
+        webapp = WebappProcess(s3_endpoint, bucket, args.stream_lines, state_dir, kubeconfig, log)
+        try:
+            webapp.wait_ready()
+            # The startup findings ingest would otherwise compete with the measured requests
+            ingest_start = time.perf_counter()
+            requests.post(f"{webapp.base}/findings/ingest", timeout=HTTP_TIMEOUT)
+            ingest_seconds = time.perf_counter() - ingest_start
+            endpoints = {}
+            for name, path in (("discover-files", "/discover-files"),
+                               ("list-scan-folders", "/list-scan-folders"),
+                               ("download-folder", f"/download-folder/{HOT_FOLDER}"),
+                               ("download-nuclei", "/download-nuclei"),
+                               ("download-nuclei-ndjson", "/download-nuclei?format=ndjson")):
+                webapp.reset_peak_rss()
+                endpoints[name] = run_endpoint(f"{webapp.base}{path}", args.requests, args.concurrency)
+                endpoints[name]["peak_rss_mb"] = webapp.peak_rss_mb()
+            webapp.reset_peak_rss()
+            endpoints["stream-output"] = run_stream(webapp.base, args.stream_scans, args.concurrency)
+            endpoints["stream-output"]["peak_rss_mb"] = webapp.peak_rss_mb()
+        finally:
+            webapp.stop()
+    return {
+        "objects": count,
+        "bucket": bucket,
+        "seed_seconds": round(seed_seconds, 2),
+        "findings_ingest_seconds": round(ingest_seconds, 2),
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma-separated bucket sizes (objects)")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint and size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stream-scans", type=int, default=3, help="synthetic scans streamed per size")
+    parser.add_argument("--stream-lines", type=int, default=2000, help="output lines per synthetic scan")
+    parser.add_argument("--seed-workers", type=int, default=32)
+    parser.add_argument("--s3-endpoint", help="seed and use this S3 endpoint (e.g. a local MinIO) instead of moto")
+    parser.add_argument("--server-log", default=os.devnull, help="file for the webapp's output")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stream_lines)
+        return
+
+    moto_server = None
+    if args.s3_endpoint:
+        s3_endpoint = args.s3_endpoint
+        access_key = os.environ.get("MINIO_ACCESS_KEY", "admin")
+        secret_key = os.environ.get("MINIO_SECRET_KEY", "password")
+    else:
+        from moto.server import ThreadedMotoServer
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        moto_port = _free_port()
+        moto_server = ThreadedMotoServer(ip_address="127.0.0.1", port=moto_port, verbose=False)
+        moto_server.start()
+        s3_endpoint = f"http://127.0.0.1:{moto_port}"
+        access_key = secret_key = "bench"
+        os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.update(MINIO_ACCESS_KEY=access_key, MINIO_SECRET_KEY=secret_key)
+    s3 = boto3.client("s3", endpoint_url=s3_endpoint, aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+                      region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+                      config=Config(max_pool_connections=args.seed_workers))
+    stub_server, kubeconfig = start_stub_cluster()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "s3_endpoint": "moto" if moto_server else s3_endpoint,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "sizes": [],
+    }
+    try:
+        with open(args.server_log, "a") as log:
+            for count in (int(size) for size in args.sizes.split(",") if size.strip()):
+                if not args.json:
+                    print(f"[BENCH] {count} objects: seeding and benchmarking...", file=sys.stderr)
+                report["sizes"].append(bench_size(args, s3, s3_endpoint, kubeconfig, count, log))
+    finally:
+        stub_server.shutdown()
+        os.remove(kubeconfig)
+        if moto_server:
+            moto_server.stop()
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"webapp-all endpoint benchmark ({report['s3_endpoint']}, concurrency {args.concurrency})")
+    for size in report["sizes"]:
+        print(f"  {size['objects']} objects (seeded in {size['seed_seconds']}s, "
+              f"findings ingest {size['findings_ingest_seconds']}s)")
+        for name, r in size["endpoints"].items():
+            print(f"    {name:<24} p50={r['p50_ms']:.1f}ms p99={r['p99_ms']:.1f}ms "
+                  f"{r['throughput_rps']} req/s errors={r['errors']} peak_rss={r['peak_rss_mb']}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Latency benchmark: load_kube() + new CustomObjectsApi per request vs the shared client.
+
+Usage (from the webapp-all directory):
+
+    python3 benchmarks/bench_kube_client.py --iterations 200 --concurrency 4
+
+Each iteration reads one Scan CRD, like /status and /mobile-status do. The
+"per-request" mode re-loads kube config and builds a new CustomObjectsApi
+for every call, exactly like the old route handlers; the "shared" mode uses
+kube_client.get_custom_objects_api(). Without --kubeconfig a local stub API
+server and a throwaway kubeconfig are used, so only client-side cost differs.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class _StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid 40ms delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        name = self.path.rstrip('/').split('/')[-1]
+        body = json.dumps({"apiVersion": "execution.securecodebox.io/v1", "kind": "Scan",
+                           "metadata": {"name": name}, "status": {"state": "Scanning"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_cluster():
+    """Serve a fake API server on localhost and point KUBECONFIG at it"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    kubeconfig = tempfile.NamedTemporaryFile("w", suffix=".kubeconfig", delete=False)
+    kubeconfig.write(f"""apiVersion: v1
+kind: Config
+clusters:
+- name: bench
+  cluster:
+    server: http://127.0.0.1:{server.server_address[1]}
+contexts:
+- name: bench
+  context:
+    cluster: bench
+    user: bench
+current-context: bench
+users:
+- name: bench
+  user:
+    token: bench-token
+""")
+    kubeconfig.close()
+    return server, kubeconfig.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--kubeconfig", help="benchmark against a real cluster instead of the local stub")
+    parser.add_argument("--namespace", default=os.environ.get("K8S_NAMESPACE", "default"))
+    parser.add_argument("--scan-name", default="bench-scan", help="Scan CRD to read (a 404 still measures the round trip)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+
+    if args.kubeconfig:
+        os.environ["KUBECONFIG"] = args.kubeconfig
+        server = None
+    else:
+        server, os.environ["KUBECONFIG"] = start_stub_cluster()
+
+    # Imported after KUBECONFIG is set: the kubernetes package reads it at import time
+    from kubernetes import client, config
+    from kubernetes.config.config_exception import ConfigException
+    import kube_client
+
+    def get_scan(api):
+        api.get_namespaced_custom_object("execution.securecodebox.io", "v1", args.namespace, "scans", args.scan_name)
+
+    def per_request_call():
+        try:
+            config.load_incluster_config()
+        except ConfigException:
+            config.load_kube_config()
+        get_scan(client.CustomObjectsApi())
+
+    def shared_call():
+        get_scan(kube_client.get_custom_objects_api())
+
+    def run(fn):
+        def timed():
+            start = time.perf_counter()
+            try:
+                fn()
+                ok = True
+            except client.exceptions.ApiException as e:
+                ok = e.status == 404
+            except Exception:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        wall_start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(lambda _: timed(), range(args.iterations)))
+        wall = time.perf_counter() - wall_start
+
+        latencies = sorted(r[0] * 1000 for r in results)
+        return {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "errors": sum(1 for r in results if not r[1]),
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "throughput_rps": round(args.iterations / wall, 2),
+        }
+
+    # Warm up the shared client so its one-time setup is not counted
+    try:
+        shared_call()
+    except Exception as e:
+        print(f"[BENCH] Warm-up call failed ({e}); latencies will include errors", file=sys.stderr)
+
+    report = {
+        "cluster": "stub" if server else args.kubeconfig,
+        "per_request_client": run(per_request_call),
+        "shared_client": run(shared_call),
+    }
+    per_request = report["per_request_client"]["p50_ms"]
+    shared = report["shared_client"]["p50_ms"]
+    report["p50_speedup"] = round(per_request / shared, 2) if shared else None
+    if server:
+        server.shutdown()
+        os.remove(os.environ["KUBECONFIG"])
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"Kubernetes client benchmark against {report['cluster']} cluster")
+    for mode in ("per_request_client", "shared_client"):
+        r = report[mode]
+        print(f"  {mode:<20} p50={r['p50_ms']:.2f}ms p99={r['p99_ms']:.2f}ms "
+              f"mean={r['mean_ms']:.2f}ms {r['throughput_rps']:.1f} req/s errors={r['errors']}")
+    print(f"  p50 speedup: {report['p50_speedup']}x")
+
+
+if __name__ == "__main__":
+    main()
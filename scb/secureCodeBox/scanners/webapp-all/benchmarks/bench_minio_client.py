@@ -0,0 +1,103 @@
+"""Latency benchmark: per-request boto3 clients vs the shared MinIO client.
+
+Usage (from the webapp-all directory, with MinIO reachable at MINIO_ENDPOINT):
+
+    python3 benchmarks/bench_minio_client.py --iterations 200 --concurrency 8
+
+Each iteration performs one small list_objects_v2 call. The "per-request"
+mode builds a fresh boto3 client for every call, exactly like the old
+route handlers did; the "shared" mode reuses minio_client.get_s3_client().
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import concurrent.futures
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import boto3
+import minio_client
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+
+
+def per_request_call():
+    s3 = boto3.client(
+        's3',
+        endpoint_url=minio_client.MINIO_ENDPOINT,
+        aws_access_key_id=minio_client.MINIO_ACCESS_KEY,
+        aws_secret_access_key=minio_client.MINIO_SECRET_KEY,
+    )
+    s3.list_objects_v2(Bucket=MINIO_BUCKET, MaxKeys=1)
+
+
+def shared_call():
+    minio_client.get_s3_client().list_objects_v2(Bucket=MINIO_BUCKET, MaxKeys=1)
+
+
+def run(fn, iterations, concurrency):
+    def timed():
+        start = time.perf_counter()
+        try:
+            fn()
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    wall_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: timed(), range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": sum(1 for r in results if not r[1]),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "throughput_rps": round(iterations / wall, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+
+    # Warm up the shared client so its one-time setup is not counted
+    try:
+        shared_call()
+    except Exception as e:
+        print(f"[BENCH] Warm-up call failed ({e}); latencies will include errors", file=sys.stderr)
+
+    report = {
+        "endpoint": minio_client.MINIO_ENDPOINT,
+        "bucket": MINIO_BUCKET,
+        "per_request_client": run(per_request_call, args.iterations, args.concurrency),
+        "shared_client": run(shared_call, args.iterations, args.concurrency),
+    }
+    per_request = report["per_request_client"]["p50_ms"]
+    shared = report["shared_client"]["p50_ms"]
+    report["p50_speedup"] = round(per_request / shared, 2) if shared else None
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"MinIO client benchmark against {report['endpoint']} (bucket {report['bucket']})")
+    for mode in ("per_request_client", "shared_client"):
+        r = report[mode]
+        print(f"  {mode:<20} p50={r['p50_ms']:.2f}ms p99={r['p99_ms']:.2f}ms "
+              f"mean={r['mean_ms']:.2f}ms {r['throughput_rps']:.1f} req/s errors={r['errors']}")
+    print(f"  p50 speedup: {report['p50_speedup']}x")
+
+
+if __name__ == "__main__":
+    main()
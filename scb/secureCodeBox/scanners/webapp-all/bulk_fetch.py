@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import concurrent.futures
+
+from minio_client import get_s3_client, MINIO_POOL_SIZE
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+BULK_FETCH_WORKERS = max(1, min(int(os.environ.get("BULK_FETCH_WORKERS", "8")), MINIO_POOL_SIZE))
+# Seconds a single object may take end to end, and the whole batch
+BULK_FETCH_OBJECT_TIMEOUT = float(os.environ.get("BULK_FETCH_OBJECT_TIMEOUT", "30"))
+BULK_FETCH_DEADLINE = float(os.environ.get("BULK_FETCH_DEADLINE", "300"))
+BULK_FETCH_CACHE_DIR = os.environ.get("BULK_FETCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "webapp-all-minio-cache"))
+BULK_FETCH_CHUNK_SIZE = 256 * 1024
+
+_MANIFEST = "manifest.json"
+
+
+class FetchCancelled(Exception):
+    pass
+
+
+def safe_filename(key):
+    """Flatten a MinIO key into a local file name"""
+    if key.startswith('securecodebox/securecodebox/'):
+        # Remove the bucket prefix
+        key = key.replace('securecodebox/securecodebox/', '')
+    return key.replace('/', '_').replace(':', '_')
+
+
+class BulkFetcher:
+    """Download many MinIO objects with one bounded worker pool.
+
+    Objects are cached in cache_dir and skipped when their ETag has not
+    changed since the last fetch. Every object has its own deadline and
+    the whole batch has an overall deadline.
+    """
+
+    def __init__(self, bucket=MINIO_BUCKET, cache_dir=BULK_FETCH_CACHE_DIR, workers=BULK_FETCH_WORKERS,
+                 object_timeout=BULK_FETCH_OBJECT_TIMEOUT, deadline=BULK_FETCH_DEADLINE):
+        self.bucket = bucket
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.object_timeout = object_timeout
+        self.deadline = deadline
+        self._manifest_lock = threading.Lock()
+        self._manifest = None
+        self.last_report = None
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                with open(os.path.join(self.cache_dir, _MANIFEST)) as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _save_manifest(self):
+        path = os.path.join(self.cache_dir, _MANIFEST)
+        with self._manifest_lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self._manifest, f)
+            os.replace(path + '.tmp', path)
+
+    def _cached_path(self, key, etag):
+        entry = self._manifest.get(key)
+        if entry and etag and entry.get('etag') == etag and os.path.exists(entry['path']):
+            return entry['path']
+        return None
+
+    def _download(self, key, cancel_event):
+        """Worker: stream one object into the cache, honouring both deadlines"""
+        started = time.time()
+        s3 = get_s3_client()
+        obj = s3.get_object(Bucket=self.bucket, Key=key)
+        cache_path = os.path.join(self.cache_dir, safe_filename(key))
+        part_path = f"{cache_path}.{threading.get_ident()}.part"
+        size = 0
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in obj['Body'].iter_chunks(BULK_FETCH_CHUNK_SIZE):
+                    if cancel_event.is_set():
+                        raise FetchCancelled(f"batch deadline reached while fetching {key}")
+                    if time.time() - started > self.object_timeout:
+                        raise TimeoutError(f"{key} exceeded {self.object_timeout}s")
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(part_path, cache_path)
+        except BaseException:
+            obj['Body'].close()
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        with self._manifest_lock:
+            self._manifest[key] = {'etag': obj.get('ETag'), 'path': cache_path, 'size': size}
+        return cache_path, size
+
+    def fetch(self, objects, dest_dir):
+        """Fetch index entries (dicts with 'key' and 'etag') into dest_dir.
+
+        Returns the list of local paths; a throughput report is kept in
+        self.last_report.
+        """
+        self._load_manifest()
+        os.makedirs(dest_dir, exist_ok=True)
+        start = time.time()
+        cancel_event = threading.Event()
+        downloaded = []
+        report = {'objects': len(objects), 'downloaded': 0, 'cached': 0, 'failed': 0,
+                  'timed_out': 0, 'bytes': 0, 'workers': self.workers}
+
+        def place(key, cache_path):
+            local_path = os.path.join(dest_dir, safe_filename(key))
+            if os.path.abspath(local_path) != os.path.abspath(cache_path):
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+                try:
+                    os.link(cache_path, local_path)
+                except OSError:
+                    shutil.copyfile(cache_path, local_path)
+            downloaded.append(local_path)
+
+        to_fetch = []
+        for obj in objects:
+            cached = self._cached_path(obj['key'], obj.get('etag'))
+            if cached:
+                place(obj['key'], cached)
+                report['cached'] += 1
+            else:
+                to_fetch.append(obj['key'])
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(self._download, key, cancel_event): key for key in to_fetch}
+            done, not_done = concurrent.futures.wait(futures, timeout=self.deadline)
+            if not_done:
+                print(f"[BULK-FETCH] Overall deadline of {self.deadline}s reached, {len(not_done)} objects unfinished")
+                cancel_event.set()
+                for future in not_done:
+                    future.cancel()
+            for future in futures:
+                key = futures[future]
+                if future.cancelled():
+                    report['timed_out'] += 1
+                    continue
+                try:
+                    cache_path, size = future.result()
+                except (TimeoutError, FetchCancelled) as e:
+                    print(f"[BULK-FETCH] Timeout downloading {key}: {e}")
+                    report['timed_out'] += 1
+                    continue
+                except Exception as e:
+                    print(f"[BULK-FETCH] Error downloading {key} from MinIO: {e}")
+                    report['failed'] += 1
+                    continue
+                place(key, cache_path)
+                report['downloaded'] += 1
+                report['bytes'] += size
+        finally:
+            cancel_event.set()
+            executor.shutdown(wait=True)
+            self._save_manifest()
+
+        elapsed = time.time() - start
+        report['seconds'] = round(elapsed, 3)
+        report['objects_per_second'] = round(len(downloaded) / elapsed, 2) if elapsed else None
+        report['mb_per_second'] = round(report['bytes'] / (1024 * 1024) / elapsed, 2) if elapsed else None
+        self.last_report = report
+        print(f"[BULK-FETCH] {report['downloaded']} downloaded, {report['cached']} unchanged (cache), "
+              f"{report['failed']} failed, {report['timed_out']} timed out in {elapsed:.2f}s "
+              f"({report['mb_per_second']} MB/s, {self.workers} workers)")
+        return downloaded
+
+
+bulk_fetcher = BulkFetcher()
@@ -0,0 +1,210 @@
+"""Cache of earlier cascade stage results, for incremental cascades.
+
+TLSX results are keyed by a hash of the target and its Naabu open-port set;
+ZAP results by endpoint and a hash of the endpoint's TLSX inputs (certificate
+and TLS parameters). Entries older than CASCADE_CACHE_MAX_AGE are ignored.
+Results are always stored; they are only reused when the cascade runs with
+CASCADE_INCREMENTAL=1.
+
+Used by run_cascading_manual.sh:
+
+    python3 cascade_cache.py tlsx-lookup --target T --ports 22,443 \\
+        --targets-out zap-targets.txt --inputs-out endpoint-inputs.json
+    python3 cascade_cache.py endpoint-inputs --tlsx-findings findings.json --output endpoint-inputs.json
+    python3 cascade_cache.py tlsx-store --target T --ports 22,443 --targets-file zap-targets.txt \\
+        --inputs-file endpoint-inputs.json --artifact s3://... --duration 120
+
+tlsx-lookup exits 0 on a fresh hit (and writes the cached endpoint list), 1 otherwise.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from fingerprint import evidence_of, target_key
+
+CASCADE_CACHE_PATH = os.environ.get("CASCADE_CACHE_PATH", os.path.join(tempfile.gettempdir(), "webapp-all-cascade-cache.sqlite3"))
+# Seconds a cached stage result may be reused
+CASCADE_CACHE_MAX_AGE = float(os.environ.get("CASCADE_CACHE_MAX_AGE", "86400"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tlsx_results (
+    target TEXT NOT NULL,
+    port_hash TEXT NOT NULL,
+    ports TEXT NOT NULL,
+    endpoints TEXT NOT NULL,
+    endpoint_inputs TEXT NOT NULL,
+    artifact TEXT,
+    duration REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (target, port_hash)
+);
+CREATE TABLE IF NOT EXISTS zap_results (
+    endpoint TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    scan_name TEXT,
+    artifact TEXT,
+    duration REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (endpoint, input_hash)
+);
+"""
+
+
+def incremental_enabled():
+    return os.environ.get("CASCADE_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+
+
+def _hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def port_set_hash(target, ports):
+    """Hash of a target's open-port set (order and duplicates do not matter)"""
+    port_list = sorted({int(p) for p in ports if str(p).strip()})
+    return _hash([target_key(target), port_list]), port_list
+
+
+def tlsx_endpoints(findings):
+    """HTTPS endpoints and their input hashes from TLSX findings.
+
+    Same selection as the jq filter in run_cascading_manual.sh: port 443 or
+    anything with a TLS version, as https://host:port.
+    """
+    inputs = {}
+    for finding in findings:
+        attributes = finding.get("attributes") or {}
+        if attributes.get("port") != "443" and attributes.get("tls_version") is None:
+            continue
+        endpoint = f"https://{attributes.get('host') or attributes.get('ip')}:{attributes.get('port')}"
+        inputs[endpoint] = _hash([endpoint, evidence_of("tlsx", finding)])
+    return inputs
+
+
+class CascadeCache:
+    """SQLite-backed stage cache; safe to share between the cascade's processes"""
+
+    def __init__(self, path=CASCADE_CACHE_PATH, max_age=CASCADE_CACHE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _fresh_since(self):
+        return time.time() - self.max_age
+
+    def lookup_tlsx(self, target, ports):
+        """Cached TLSX result for this exact port set, or None"""
+        port_hash, _ = port_set_hash(target, ports)
+        row = self._connect().execute(
+            "SELECT * FROM tlsx_results WHERE target = ? AND port_hash = ? AND created_at >= ?",
+            (target_key(target), port_hash, self._fresh_since())).fetchone()
+        if row is None:
+            return None
+        return {"endpoints": json.loads(row["endpoints"]), "endpoint_inputs": json.loads(row["endpoint_inputs"]),
+                "artifact": row["artifact"], "duration": row["duration"] or 0.0, "created_at": row["created_at"]}
+
+    def store_tlsx(self, target, ports, endpoints, endpoint_inputs, artifact, duration):
+        port_hash, port_list = port_set_hash(target, ports)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tlsx_results (target, port_hash, ports, endpoints, endpoint_inputs, artifact,"
+                " duration, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (target_key(target), port_hash, json.dumps(port_list), json.dumps(endpoints),
+                 json.dumps(endpoint_inputs), artifact, duration, time.time()))
+
+    def lookup_zap(self, endpoint, input_hash):
+        row = self._connect().execute(
+            "SELECT * FROM zap_results WHERE endpoint = ? AND input_hash = ? AND created_at >= ?",
+            (endpoint, input_hash or "", self._fresh_since())).fetchone()
+        return dict(row) if row else None
+
+    def store_zap(self, endpoint, input_hash, scan_name, artifact, duration):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO zap_results (endpoint, input_hash, scan_name, artifact, duration, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", (endpoint, input_hash or "", scan_name, artifact, duration, time.time()))
+
+    def stats(self):
+        conn = self._connect()
+        since = self._fresh_since()
+        return {
+            "path": self.path,
+            "max_age_seconds": self.max_age,
+            "tlsx_entries": conn.execute("SELECT COUNT(*) FROM tlsx_results").fetchone()[0],
+            "tlsx_fresh": conn.execute("SELECT COUNT(*) FROM tlsx_results WHERE created_at >= ?", (since,)).fetchone()[0],
+            "zap_entries": conn.execute("SELECT COUNT(*) FROM zap_results").fetchone()[0],
+            "zap_fresh": conn.execute("SELECT COUNT(*) FROM zap_results WHERE created_at >= ?", (since,)).fetchone()[0],
+        }
+
+
+cascade_cache = CascadeCache()
+
+
+def _read_lines(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage cache for incremental cascading scans")
+    sub = parser.add_subparsers(dest="command", required=True)
+    lookup = sub.add_parser("tlsx-lookup", help="write cached TLSX endpoints for this port set (exit 1 on miss)")
+    lookup.add_argument("--target", required=True)
+    lookup.add_argument("--ports", required=True, help="comma-separated open ports")
+    lookup.add_argument("--targets-out", required=True)
+    lookup.add_argument("--inputs-out", required=True)
+    inputs = sub.add_parser("endpoint-inputs", help="hash the TLSX inputs of every HTTPS endpoint")
+    inputs.add_argument("--tlsx-findings", required=True)
+    inputs.add_argument("--output", required=True)
+    store = sub.add_parser("tlsx-store", help="remember the TLSX result of this port set")
+    store.add_argument("--target", required=True)
+    store.add_argument("--ports", required=True)
+    store.add_argument("--targets-file", required=True)
+    store.add_argument("--inputs-file", required=True)
+    store.add_argument("--artifact")
+    store.add_argument("--duration", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.command == "tlsx-lookup":
+        cached = cascade_cache.lookup_tlsx(args.target, args.ports.split(","))
+        if cached is None:
+            return 1
+        with open(args.targets_out, "w") as f:
+            f.writelines(f"{endpoint}\n" for endpoint in cached["endpoints"])
+        with open(args.inputs_out, "w") as f:
+            json.dump(cached["endpoint_inputs"], f)
+        # Read by the shell script: <seconds saved> <artifact uri>
+        print(f"{cached['duration']:.0f} {cached['artifact'] or ''}")
+        return 0
+    if args.command == "endpoint-inputs":
+        with open(args.tlsx_findings) as f:
+            findings = json.load(f)
+        with open(args.output, "w") as f:
+            json.dump(tlsx_endpoints(findings if isinstance(findings, list) else []), f)
+        return 0
+    with open(args.inputs_file) as f:
+        endpoint_inputs = json.load(f)
+    cascade_cache.store_tlsx(args.target, args.ports.split(","), _read_lines(args.targets_file), endpoint_inputs,
+                             args.artifact, args.duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
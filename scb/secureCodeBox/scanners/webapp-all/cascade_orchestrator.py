@@ -0,0 +1,264 @@
+"""ZAP + Nuclei stage of the cascading scan (Naabu -> TLSX -> ZAP -> Nuclei).
+
+run_cascading_manual.sh calls this once the TLSX HTTPS target list exists:
+
+    python3 cascade_orchestrator.py --namespace default \\
+        --zap-targets zap-targets.txt --nuclei-targets /tmp/nuclei-targets.txt \\
+        --nuclei-scan-name nuclei-cascade-1-2-3-4-1700000000
+
+Nuclei is submitted straight away and runs alongside the ZAP baseline
+scans, which are submitted with at most ZAP_CONCURRENCY in flight. Every
+scan is tracked on its own. Exits non-zero only if Nuclei fails, matching
+the shell workflow where a failed ZAP target is a warning.
+
+Progress (stage and per-target ZAP events, findings artifacts) is reported
+through progress.emit_event() when CASCADE_EVENTS_FILE is set.
+
+Every finished ZAP scan is recorded in cascade_cache. With
+CASCADE_INCREMENTAL=1, endpoints whose TLSX inputs (--endpoint-inputs) match
+a fresh cached result are not scanned again.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import threading
+import concurrent.futures
+
+from kube_client import get_custom_objects_api
+from progress import emit_event
+from cascade_cache import cascade_cache, incremental_enabled
+from scan_watcher import ScanWatcher, SCAN_GROUP, SCAN_VERSION, SCAN_PLURAL, SCAN_ID_LABEL, TERMINAL_STATES, DELETED
+
+ZAP_CONCURRENCY = int(os.environ.get("ZAP_CONCURRENCY", "4"))
+ZAP_SCAN_TIMEOUT = int(os.environ.get("ZAP_SCAN_TIMEOUT", "1800"))
+NUCLEI_SCAN_TIMEOUT = int(os.environ.get("NUCLEI_SCAN_TIMEOUT", "1800"))
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+# Scan CRD outcome -> status of the stage_finished progress event
+STAGE_STATUS = {"Done": "done", "Errored": "failed", DELETED: "failed", "Timeout": "timeout"}
+
+_print_lock = threading.Lock()
+
+
+def print_status(status, message):
+    icons = {"INFO": "ℹ️ ", "SUCCESS": "✅", "WARNING": "⚠️ ", "ERROR": "❌", "RUNNING": "🔄"}
+    with _print_lock:
+        print(f"{icons.get(status, '')} {message}", flush=True)
+
+
+def safe_scan_name(target, prefix):
+    """Same naming rules as safe_scan_name() in run_cascading_manual.sh"""
+    name = f"{prefix}-{target}".lower()
+    name = re.sub(r'[^a-z0-9-]', '-', name)
+    name = re.sub(r'-+', '-', name).strip('-')
+    return f"{name}-{int(time.time())}"
+
+
+class CascadeOrchestrator:
+    """Submits and tracks the ZAP and Nuclei Scan CRDs of one cascade"""
+
+    def __init__(self, namespace, zap_concurrency=ZAP_CONCURRENCY, endpoint_inputs=None, incremental=False):
+        self.namespace = namespace
+        self.zap_concurrency = max(1, zap_concurrency)
+        self.endpoint_inputs = endpoint_inputs or {}
+        self.incremental = incremental
+        self.results = {}
+        # One watch for every scan of the cascade instead of polling each of them
+        self.watcher = ScanWatcher(namespace)
+        self.watcher.add_listener(self._log_transition)
+        self._tracked = {}
+        # Scan UIDs seen on completion; the operator stores findings under scan-<uid>/
+        self._uids = {}
+
+    def create_scan(self, name, scan_type, parameters, extra_spec=None):
+        spec = {"scanType": scan_type, "parameters": parameters}
+        spec.update(extra_spec or {})
+        body = {
+            "apiVersion": f"{SCAN_GROUP}/{SCAN_VERSION}",
+            "kind": "Scan",
+            "metadata": {"name": name, "namespace": self.namespace},
+            "spec": spec,
+        }
+        if os.environ.get("SCAN_ID"):
+            # Lets the webapp find this cascade's scans again after a restart
+            body["metadata"]["labels"] = {SCAN_ID_LABEL: os.environ["SCAN_ID"]}
+        get_custom_objects_api().create_namespaced_custom_object(SCAN_GROUP, SCAN_VERSION, self.namespace, SCAN_PLURAL, body)
+
+    def _log_transition(self, name, old_state, new_state, scan):
+        if new_state in TERMINAL_STATES:
+            self._uids[name] = scan.get('metadata', {}).get('uid')
+        tracked = self._tracked.get(name)
+        if tracked:
+            label, started = tracked
+            print_status("INFO", f"[{label}] Scan {name} state: {new_state} ({int(time.time() - started)}s)")
+
+    def wait_for_scan(self, name, timeout, label):
+        """Block until the watcher reports the scan Done/Errored/Deleted or the timeout passes"""
+        self._tracked[name] = (label, time.time())
+        try:
+            state = self.watcher.wait_for(name, TERMINAL_STATES, timeout)
+        finally:
+            self._tracked.pop(name, None)
+        return state or "Timeout"
+
+    def findings_uri(self, name):
+        uid = self._uids.get(name)
+        return f"s3://{MINIO_BUCKET}/scan-{uid}/findings.json" if uid else None
+
+    def emit_findings_artifact(self, stage, name):
+        uri = self.findings_uri(name)
+        if uri:
+            emit_event("artifact", stage=stage, scan=name, uri=uri)
+
+    def split_cached(self, zap_targets):
+        """(targets to scan, cached results) - only cached in incremental mode"""
+        if not self.incremental:
+            return zap_targets, []
+        to_scan, cached = [], []
+        for zap_target in zap_targets:
+            hit = None
+            if zap_target in self.endpoint_inputs:
+                try:
+                    hit = cascade_cache.lookup_zap(zap_target, self.endpoint_inputs[zap_target])
+                except Exception as e:
+                    print_status("WARNING", f"Cascade cache lookup failed for {zap_target}: {e}")
+            if hit:
+                cached.append((zap_target, hit))
+            else:
+                to_scan.append(zap_target)
+        return to_scan, cached
+
+    def run_zap(self, zap_target):
+        if not re.match(r'^https?://', zap_target):
+            print_status("WARNING", f"Target doesn't start with http:// or https://, adding https:// to {zap_target}")
+            zap_target = f"https://{zap_target}"
+        safe_target = re.sub(r'^https?://', '', zap_target)
+        safe_target = re.sub(r'[:/.]', '-', safe_target)
+        scan_name = safe_scan_name(safe_target, "zap-scan")
+        started = time.time()
+        print_status("RUNNING", f"Running ZAP baseline scan for {zap_target} ({scan_name})")
+        emit_event("zap_target", target=zap_target, scan=scan_name, state="started")
+        try:
+            self.create_scan(scan_name, "zap-baseline-scan", ["-t", zap_target])
+        except Exception as e:
+            print_status("ERROR", f"ZAP scan for {zap_target} could not be created: {e}")
+            emit_event("zap_target", target=zap_target, scan=scan_name, state="Errored", duration=0)
+            return zap_target, scan_name, "Errored", 0
+        state = self.wait_for_scan(scan_name, ZAP_SCAN_TIMEOUT, f"ZAP {zap_target}")
+        duration = time.time() - started
+        emit_event("zap_target", target=zap_target, scan=scan_name, state=state, duration=round(duration, 1))
+        if state == "Done":
+            self.emit_findings_artifact("zap", scan_name)
+            try:
+                cascade_cache.store_zap(zap_target, self.endpoint_inputs.get(zap_target), scan_name,
+                                        self.findings_uri(scan_name), duration)
+            except Exception as e:
+                print_status("WARNING", f"Could not cache the ZAP result for {zap_target}: {e}")
+            print_status("SUCCESS", f"ZAP scan for {zap_target} completed successfully ({duration:.0f}s)")
+        elif state == "Timeout":
+            print_status("WARNING", f"ZAP scan timed out after {ZAP_SCAN_TIMEOUT}s for {zap_target}")
+        elif state == DELETED:
+            print_status("ERROR", f"ZAP scan {scan_name} for {zap_target} was deleted before it finished")
+        else:
+            print_status("ERROR", f"ZAP scan for {zap_target} failed. Check logs with: kubectl logs -n {self.namespace} -l securecodebox.io/scan={scan_name}")
+        print_status("INFO", f"=== ZAP SCAN COMPLETED FOR {zap_target} ===")
+        return zap_target, scan_name, state, duration
+
+    def run_nuclei(self, scan_name, targets_file):
+        started = time.time()
+        print_status("RUNNING", f"Starting Nuclei scan {scan_name} with targets file {targets_file}")
+        emit_event("stage_started", stage="nuclei", scan=scan_name)
+        try:
+            self.create_scan(
+                scan_name, "nuclei",
+                ["-l", targets_file, "-no-httpx", "-jsonl", "-o", "/home/securecodebox/nuclei-results.jsonl"],
+                {"ttlSecondsAfterFinished": 0},
+            )
+        except Exception as e:
+            print_status("ERROR", f"Failed to create Nuclei scan: {e}")
+            emit_event("stage_finished", stage="nuclei", status="failed")
+            return "Errored", 0
+        state = self.wait_for_scan(scan_name, NUCLEI_SCAN_TIMEOUT, "Nuclei")
+        duration = time.time() - started
+        emit_event("stage_finished", stage="nuclei", status=STAGE_STATUS[state])
+        if state == "Done":
+            self.emit_findings_artifact("nuclei", scan_name)
+            print_status("SUCCESS", f"Nuclei scan completed successfully! ({duration:.0f}s)")
+        elif state == "Timeout":
+            print_status("WARNING", f"Nuclei scan timed out after {NUCLEI_SCAN_TIMEOUT}s")
+        elif state == DELETED:
+            print_status("ERROR", f"Nuclei scan {scan_name} was deleted before it finished")
+        else:
+            print_status("ERROR", f"Nuclei scan {scan_name} failed")
+        return state, duration
+
+    def run(self, zap_targets, nuclei_targets_file, nuclei_scan_name):
+        zap_targets, cached = self.split_cached(zap_targets)
+        saved = sum(hit["duration"] or 0 for _, hit in cached)
+        for zap_target, hit in cached:
+            print_status("SUCCESS", f"Reusing cached ZAP result for {zap_target} from {hit['scan_name']} "
+                                    f"({time.time() - hit['created_at']:.0f}s old)")
+            emit_event("cache_hit", stage="zap", target=zap_target, scan=hit["scan_name"], uri=hit["artifact"],
+                       saved=round(hit["duration"] or 0, 1))
+        if cached:
+            print_status("INFO", f"{len(cached)} ZAP endpoints unchanged, about {saved:.0f}s of ZAP scanning skipped")
+        print_status("INFO", f"Submitting {len(zap_targets)} ZAP scans ({self.zap_concurrency} at a time) and Nuclei in parallel")
+        started = time.time()
+        emit_event("stage_started", stage="zap", total=len(zap_targets), concurrency=self.zap_concurrency)
+        self.watcher.start()
+        if not self.watcher.wait_synced(timeout=60):
+            print_status("WARNING", f"Scan watcher not synced yet: {self.watcher.last_error}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as nuclei_executor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=self.zap_concurrency) as zap_executor:
+            # Nuclei only needs the TLSX target list, so it does not wait for ZAP
+            nuclei_future = nuclei_executor.submit(self.run_nuclei, nuclei_scan_name, nuclei_targets_file)
+            zap_results = list(zap_executor.map(self.run_zap, zap_targets))
+            nuclei_state, nuclei_duration = nuclei_future.result()
+
+        succeeded = sum(1 for r in zap_results if r[2] == "Done")
+        # Failed targets are warnings in this workflow; the stage only fails if none succeeded
+        emit_event("stage_finished", stage="zap", status="done" if succeeded or not zap_results else "failed",
+                   completed=succeeded, total=len(zap_results), cached=len(cached))
+        print_status("SUCCESS" if succeeded == len(zap_results) else "WARNING",
+                     f"=== ALL ZAP SCANS COMPLETED ({succeeded}/{len(zap_results)} succeeded) ===")
+        for zap_target, scan_name, state, duration in zap_results:
+            print_status("INFO", f"  {zap_target}: {state} in {duration:.0f}s ({scan_name})")
+        serial_time = sum(r[3] for r in zap_results) + nuclei_duration
+        print_status("INFO", f"ZAP + Nuclei stage took {time.time() - started:.0f}s (sequential estimate {serial_time:.0f}s)")
+        self.results = {"zap": zap_results, "zap_cached": cached,
+                        "nuclei": (nuclei_scan_name, nuclei_state, nuclei_duration)}
+        self.watcher.stop()
+        return nuclei_state == "Done"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ZAP and Nuclei stages of a cascading scan")
+    parser.add_argument("--namespace", default=os.environ.get("K8S_NAMESPACE", "default"))
+    parser.add_argument("--zap-targets", required=True, help="file with one HTTPS endpoint per line")
+    parser.add_argument("--nuclei-targets", required=True, help="targets file passed to nuclei -l")
+    parser.add_argument("--nuclei-scan-name", required=True)
+    parser.add_argument("--zap-concurrency", type=int, default=ZAP_CONCURRENCY)
+    parser.add_argument("--endpoint-inputs", help="JSON map of endpoint -> TLSX input hash (cascade_cache.py endpoint-inputs)")
+    parser.add_argument("--incremental", action="store_true", default=incremental_enabled(),
+                        help="reuse fresh cached ZAP results (default: $CASCADE_INCREMENTAL)")
+    args = parser.parse_args()
+
+    with open(args.zap_targets) as f:
+        zap_targets = [line.strip() for line in f if line.strip()]
+    endpoint_inputs = {}
+    if args.endpoint_inputs:
+        try:
+            with open(args.endpoint_inputs) as f:
+                endpoint_inputs = json.load(f)
+        except (OSError, ValueError) as e:
+            print_status("WARNING", f"Could not read endpoint inputs {args.endpoint_inputs}: {e}")
+
+    orchestrator = CascadeOrchestrator(args.namespace, args.zap_concurrency, endpoint_inputs, args.incremental)
+    ok = orchestrator.run(zap_targets, args.nuclei_targets, args.nuclei_scan_name)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,585 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import collections
+import urllib.parse
+from datetime import datetime, timezone
+
+from minio_client import get_s3_client
+from object_index import object_index, SCANNER_TYPES, MINIO_BUCKET
+from nuclei_stream import iter_jsonl_findings
+from fingerprint import fingerprint_finding, target_key
+
+FINDINGS_DB_PATH = os.environ.get("FINDINGS_DB_PATH", os.path.join(tempfile.gettempdir(), "webapp-all-findings.sqlite3"))
+# A /findings query triggers a background ingest when the last one is older than this
+FINDINGS_INGEST_TTL = float(os.environ.get("FINDINGS_INGEST_TTL", "60"))
+FINDINGS_PAGE_SIZE = int(os.environ.get("FINDINGS_PAGE_SIZE", "100"))
+FINDINGS_MAX_PAGE_SIZE = int(os.environ.get("FINDINGS_MAX_PAGE_SIZE", "1000"))
+
+SEVERITIES = ("info", "low", "medium", "high", "critical", "unknown")
+_SEVERITY_ALIASES = {"informational": "info", "information": "info", "moderate": "medium"}
+
+# Bumped when the tables change; older databases are dropped and re-ingested from MinIO
+SCHEMA_VERSION = 2
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_objects (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    scanner TEXT,
+    scan_folder TEXT,
+    target TEXT,
+    scan_time REAL,
+    findings INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_objects_scanner_target ON ingested_objects (scanner, target, scan_time);
+CREATE TABLE IF NOT EXISTS object_targets (
+    key TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_key TEXT NOT NULL,
+    scan_folder TEXT,
+    scanner TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    host TEXT,
+    port INTEGER,
+    rule_id TEXT,
+    name TEXT,
+    category TEXT,
+    location TEXT,
+    scan_time REAL,
+    fingerprint TEXT NOT NULL,
+    status TEXT,
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_findings_object_fingerprint ON findings (object_key, fingerprint);
+CREATE INDEX IF NOT EXISTS idx_findings_fingerprint ON findings (fingerprint, scan_time);
+CREATE INDEX IF NOT EXISTS idx_findings_status ON findings (status, scan_time);
+CREATE INDEX IF NOT EXISTS idx_findings_scanner_time ON findings (scanner, scan_time);
+CREATE INDEX IF NOT EXISTS idx_findings_severity_time ON findings (severity, scan_time);
+CREATE INDEX IF NOT EXISTS idx_findings_host_time ON findings (host, scan_time);
+CREATE INDEX IF NOT EXISTS idx_findings_port ON findings (port);
+CREATE INDEX IF NOT EXISTS idx_findings_rule ON findings (rule_id);
+CREATE INDEX IF NOT EXISTS idx_findings_time ON findings (scan_time);
+"""
+
+# Columns a query may filter on by exact value
+_EXACT_FILTERS = ("scanner", "severity", "host", "port", "rule_id", "scan_folder", "fingerprint", "status")
+# Finding status relative to the previous scan of the same target
+NEW = "new"
+RECURRING = "recurring"
+RESOLVED = "resolved"
+_NAABU_EXPORT = re.compile(r"^naabu-findings-(.+)-\d{8}_\d{6}\.json$")
+
+
+class InvalidQuery(Exception):
+    pass
+
+
+def normalize_severity(value):
+    severity = str(value or "").strip().lower()
+    severity = _SEVERITY_ALIASES.get(severity, severity)
+    return severity if severity in SEVERITIES else "unknown"
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO 8601 string, a date, an epoch number or a datetime"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp() if value.tzinfo else value.replace(tzinfo=timezone.utc).timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        # Nuclei writes nanosecond timestamps, more digits than fromisoformat accepts
+        head, sep, tail = text.partition(".")
+        if not sep:
+            return None
+        digits = "".join(c for c in tail if c.isdigit())
+        zone = tail[len(digits):].replace("Z", "+00:00")
+        try:
+            parsed = datetime.fromisoformat(f"{head}.{digits[:6]}{zone}")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _port(value):
+    try:
+        port = int(value)
+    except (TypeError, ValueError):
+        return None
+    return port if 0 < port < 65536 else None
+
+
+def _location_parts(location):
+    """(host, port) of a URL or host:port location string"""
+    if not location:
+        return None, None
+    text = str(location)
+    parsed = urllib.parse.urlsplit(text if "://" in text else f"//{text}")
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port is None and parsed.scheme in ("http", "https"):
+        port = 443 if parsed.scheme == "https" else 80
+    return parsed.hostname, port
+
+
+def normalize_scb_finding(finding, scanner):
+    """Columns of one secureCodeBox findings.json entry"""
+    attributes = finding.get("attributes") or {}
+    location = finding.get("location")
+    location_host, location_port = _location_parts(location)
+    return {
+        "scanner": scanner,
+        "severity": normalize_severity(finding.get("severity")),
+        "host": attributes.get("host") or attributes.get("hostname") or attributes.get("ip") or location_host,
+        "port": _port(attributes.get("port")) or location_port,
+        "rule_id": str(attributes.get("template_id") or attributes.get("templateId") or attributes.get("zap_plugin_id")
+                       or attributes.get("pluginId") or attributes.get("rule_id") or finding.get("category") or "") or None,
+        "name": finding.get("name"),
+        "category": finding.get("category"),
+        "location": location,
+        "scan_time": parse_time(finding.get("identified_at") or finding.get("parsed_at")),
+    }
+
+
+def normalize_nuclei_result(result):
+    """Columns of one raw nuclei JSONL result"""
+    info = result.get("info") or {}
+    location = result.get("matched-at") or result.get("host")
+    location_host, location_port = _location_parts(location)
+    return {
+        "scanner": "nuclei",
+        "severity": normalize_severity(info.get("severity")),
+        "host": location_host or result.get("ip"),
+        "port": _port(result.get("port")) or location_port,
+        "rule_id": result.get("template-id") or result.get("templateID"),
+        "name": info.get("name"),
+        "category": result.get("type"),
+        "location": location,
+        "scan_time": parse_time(result.get("timestamp")),
+    }
+
+
+def is_findings_object(file_info):
+    key = file_info["key"]
+    if key.endswith(".jsonl"):
+        return file_info["scanner_type"] == "nuclei"
+    return key.endswith(".json") and file_info["file_type"] == "findings"
+
+
+def folder_scanner(files):
+    """Scanner that produced a scan folder, judged by the other files in it"""
+    kinds = {f["scanner_type"] for f in files}
+    for scanner in ("nuclei", "zap", "naabu", "tlsx"):
+        if scanner in kinds:
+            return scanner
+    return "other"
+
+
+class FindingsStore:
+    """Findings parsed out of MinIO into an indexed SQLite database.
+
+    Each findings object (secureCodeBox findings.json, naabu exports and raw
+    nuclei JSONL) is ingested once per ETag; a changed object replaces its
+    rows. Queries run against the local database, never against MinIO.
+
+    Every object is one scan of one target. Its findings are fingerprinted
+    and marked new or recurring against the previous scan of the same
+    scanner and target; delta() also lists the ones that were resolved.
+    """
+
+    def __init__(self, path=FINDINGS_DB_PATH, bucket=MINIO_BUCKET):
+        self.path = path
+        self.bucket = bucket
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+        self._ingest_thread = None
+        self._ingest_again = False
+        self._run_lock = threading.Lock()
+        self._initialized = False
+        self._stats = {"ingests": 0, "last_ingest_at": None, "last_ingest_seconds": None,
+                       "last_objects_ingested": 0, "last_findings_ingested": 0, "last_error": None}
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets /findings read while an ingest is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._write_lock:
+                if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                    # Everything but object_targets can be rebuilt from MinIO
+                    conn.executescript("DROP TABLE IF EXISTS findings; DROP TABLE IF EXISTS ingested_objects;")
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                self._initialized = True
+        return conn
+
+    # --- ingestion -------------------------------------------------------
+
+    def _parse(self, file_info, scanner):
+        """Yield (columns, finding, raw_json) for every finding of one MinIO object"""
+        body = get_s3_client().get_object(Bucket=self.bucket, Key=file_info["key"])["Body"]
+        if file_info["key"].endswith(".jsonl"):
+            for line, result in iter_jsonl_findings(body):
+                if isinstance(result, dict):
+                    yield normalize_nuclei_result(result), result, line.decode(errors="replace")
+            return
+        try:
+            document = json.loads(body.read())
+        finally:
+            body.close()
+        if isinstance(document, dict):
+            document = document.get("findings", [])
+        for finding in document if isinstance(document, list) else []:
+            if isinstance(finding, dict):
+                yield normalize_scb_finding(finding, scanner), finding, json.dumps(finding)
+
+    def _object_target(self, conn, key, hosts):
+        """Target an object was scanned for: as registered, from a naabu export name, else its main host"""
+        row = conn.execute("SELECT target FROM object_targets WHERE key = ?", (key,)).fetchone()
+        if row:
+            return row["target"]
+        match = _NAABU_EXPORT.match(key)
+        if match:
+            return target_key(match.group(1))
+        if hosts:
+            return target_key(collections.Counter(hosts).most_common(1)[0][0])
+        return None
+
+    def _ingest_object(self, conn, file_info, scanner):
+        key = file_info["key"]
+        object_time = parse_time(file_info.get("last_modified")) or time.time()
+        rows = []
+        error = None
+        try:
+            for columns, finding, raw in self._parse(file_info, scanner):
+                # Hosts are stored lowercased so the host filter can use its index
+                host = str(columns["host"]).lower() if columns["host"] else None
+                rows.append((key, file_info.get("scan_folder"), columns["scanner"], columns["severity"], host,
+                             columns["port"], columns["rule_id"], columns["name"], columns["category"],
+                             columns["location"], columns["scan_time"] or object_time,
+                             fingerprint_finding(columns, finding), raw))
+        except Exception as e:
+            # Recorded with its ETag, so a broken object is not re-read until it changes
+            error = str(e)
+            rows = []
+            print(f"[FINDINGS-STORE] Could not parse {key}: {e}")
+        target = self._object_target(conn, key, [row[4] for row in rows if row[4]])
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM findings WHERE object_key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO findings (object_key, scan_folder, scanner, severity, host, port, rule_id, name, category,"
+                " location, scan_time, fingerprint, raw) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested_objects (key, etag, scanner, scan_folder, target, scan_time, findings,"
+                " error, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, file_info.get("etag"), scanner, file_info.get("scan_folder"), target, object_time, len(rows),
+                 error, time.time()))
+            self._mark_statuses(conn, scanner, target, object_time)
+        return len(rows)
+
+    def _scan_history(self, conn, scanner, target):
+        """Successfully parsed objects of one scanner and target, oldest first"""
+        return conn.execute(
+            "SELECT key, scan_time FROM ingested_objects WHERE scanner = ? AND target IS ? AND error IS NULL"
+            " ORDER BY scan_time, key", (scanner, target)).fetchall()
+
+    def _mark_statuses(self, conn, scanner, target, since):
+        """Re-mark findings of scans at or after `since` as new/recurring against their predecessor"""
+        previous = None
+        for obj in self._scan_history(conn, scanner, target):
+            if obj["scan_time"] >= since:
+                conn.execute(
+                    "UPDATE findings SET status = CASE WHEN EXISTS (SELECT 1 FROM findings p WHERE p.object_key = ?"
+                    " AND p.fingerprint = findings.fingerprint) THEN ? ELSE ? END WHERE object_key = ?",
+                    (previous, RECURRING, NEW, obj["key"]))
+            previous = obj["key"]
+
+    def set_object_target(self, key, target):
+        """Record which target a findings object was scanned for (e.g. from a cascade's artifact events)"""
+        conn = self._connect()
+        target = target_key(target)
+        with self._write_lock, conn:
+            conn.execute("INSERT OR REPLACE INTO object_targets (key, target, updated_at) VALUES (?, ?, ?)",
+                         (key, target, time.time()))
+            row = conn.execute("SELECT scanner, target, scan_time FROM ingested_objects WHERE key = ?", (key,)).fetchone()
+            if row is None or row["target"] == target:
+                return
+            # Already ingested under a guessed target: move it and re-mark both scan histories
+            conn.execute("UPDATE ingested_objects SET target = ? WHERE key = ?", (target, key))
+            self._mark_statuses(conn, row["scanner"], row["target"], row["scan_time"])
+            self._mark_statuses(conn, row["scanner"], target, row["scan_time"])
+
+    def _candidates(self):
+        """(file_info, scanner) for every findings object in the bucket"""
+        scanner_files = object_index.scanner_files()
+        folders = {}
+        for files in scanner_files.values():
+            for f in files or []:
+                if f["scan_folder"]:
+                    folders.setdefault(f["scan_folder"], []).append(f)
+        for scanner in SCANNER_TYPES:
+            for f in scanner_files.get(scanner) or []:
+                if not is_findings_object(f):
+                    continue
+                folder_files = folders.get(f["scan_folder"]) if f["scan_folder"] else None
+                if folder_files is None:
+                    yield f, scanner
+                    continue
+                if f["key"].endswith(".jsonl") and any(o["key"].endswith("findings.json") for o in folder_files):
+                    # The operator's parsed findings.json covers the same results
+                    continue
+                yield f, folder_scanner(folder_files)
+
+    def ingest(self):
+        """Ingest new or changed findings objects; returns (objects, findings) ingested"""
+        with self._run_lock:
+            return self._ingest()
+
+    def _ingest(self):
+        start = time.time()
+        conn = self._connect()
+        known = {row["key"]: row for row in conn.execute("SELECT key, etag, scanner, target, scan_time FROM ingested_objects")}
+        candidates = list(self._candidates())
+        changed = [(f, scanner) for f, scanner in candidates
+                   if f["key"] not in known or known[f["key"]]["etag"] != f.get("etag")]
+        # Oldest first, so each scan is usually compared with one that is already stored
+        changed.sort(key=lambda c: parse_time(c[0].get("last_modified")) or 0)
+        objects = findings = 0
+        for file_info, scanner in changed:
+            findings += self._ingest_object(conn, file_info, scanner)
+            objects += 1
+        current = {f["key"] for f, _ in candidates}
+        removed = [known[key] for key in known if key not in current]
+        if removed:
+            # Objects deleted from MinIO take their findings with them
+            with self._write_lock, conn:
+                conn.executemany("DELETE FROM findings WHERE object_key = ?", [(r["key"],) for r in removed])
+                conn.executemany("DELETE FROM ingested_objects WHERE key = ?", [(r["key"],) for r in removed])
+                for r in removed:
+                    self._mark_statuses(conn, r["scanner"], r["target"], r["scan_time"] or 0)
+        self._stats.update(ingests=self._stats["ingests"] + 1, last_ingest_at=time.time(),
+                           last_ingest_seconds=round(time.time() - start, 3),
+                           last_objects_ingested=objects, last_findings_ingested=findings, last_error=None)
+        print(f"[FINDINGS-STORE] Ingested {findings} findings from {objects} objects "
+              f"({len(removed)} removed) in {time.time() - start:.2f}s")
+        return objects, findings
+
+    def ingest_in_background(self):
+        """Start an ingest thread; if one is running, it goes round once more when done"""
+        with self._ingest_lock:
+            if self._ingest_thread is not None and self._ingest_thread.is_alive():
+                self._ingest_again = True
+                return False
+            self._ingest_again = False
+            self._ingest_thread = threading.Thread(target=self._ingest_loop, name="findings-ingest", daemon=True)
+            self._ingest_thread.start()
+            return True
+
+    def _ingest_loop(self):
+        while True:
+            try:
+                self.ingest()
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+                print(f"[FINDINGS-STORE] Ingest failed: {e}")
+            with self._ingest_lock:
+                if not self._ingest_again:
+                    self._ingest_thread = None
+                    return
+                self._ingest_again = False
+
+    def ensure_recent(self, wait=False):
+        """Ingest when the last ingest is older than FINDINGS_INGEST_TTL (in the background unless wait)"""
+        last = self._stats["last_ingest_at"]
+        if last is not None and time.time() - last < FINDINGS_INGEST_TTL:
+            return
+        if wait:
+            self.ingest()
+        else:
+            self.ingest_in_background()
+
+    # --- queries ---------------------------------------------------------
+
+    def query(self, filters=None, limit=FINDINGS_PAGE_SIZE, offset=0, include_raw=False):
+        """One page of findings, newest first.
+
+        filters: scanner, severity, host, port, rule_id, scan_folder,
+        fingerprint, status (exact match; comma-separated values match any), since/until (ISO 8601 or
+        epoch seconds, on scan time) and q (substring of name or location).
+        Raises InvalidQuery for malformed filter values.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+        limit = max(1, min(int(limit), FINDINGS_MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        clauses, params = [], []
+        for column in _EXACT_FILTERS:
+            if column not in filters:
+                continue
+            values = [v.strip() for v in str(filters[column]).split(",") if v.strip()]
+            if column == "severity":
+                values = [normalize_severity(v) for v in values]
+            elif column == "port":
+                ports = [_port(v) for v in values]
+                if None in ports:
+                    raise InvalidQuery(f"Invalid port: {filters[column]}")
+                values = ports
+            elif column == "host":
+                values = [v.lower() for v in values]
+            placeholders = ", ".join("?" for _ in values)
+            clauses.append(f"{column} IN ({placeholders})")
+            params.extend(values)
+        for name, operator in (("since", ">="), ("until", "<")):
+            if name in filters:
+                value = parse_time(filters[name])
+                if value is None:
+                    raise InvalidQuery(f"Invalid {name}: {filters[name]} (use ISO 8601 or epoch seconds)")
+                clauses.append(f"scan_time {operator} ?")
+                params.append(value)
+        if "q" in filters:
+            clauses.append("(name LIKE ? OR location LIKE ?)")
+            params.extend([f"%{filters['q']}%"] * 2)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM findings{where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM findings{where} ORDER BY scan_time DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+        findings = [self._row_to_dict(row, include_raw) for row in rows]
+        return {
+            "findings": findings,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + len(findings) if offset + len(findings) < total else None,
+        }
+
+    @staticmethod
+    def _row_to_dict(row, include_raw):
+        data = {
+            "id": row["id"],
+            "scanner": row["scanner"],
+            "severity": row["severity"],
+            "host": row["host"],
+            "port": row["port"],
+            "rule_id": row["rule_id"],
+            "name": row["name"],
+            "category": row["category"],
+            "location": row["location"],
+            "scan_time": datetime.fromtimestamp(row["scan_time"], timezone.utc).isoformat() if row["scan_time"] else None,
+            "scan_folder": row["scan_folder"],
+            "object_key": row["object_key"],
+            "fingerprint": row["fingerprint"],
+            "status": row["status"],
+        }
+        if include_raw:
+            data["raw"] = json.loads(row["raw"])
+        return data
+
+    def delta(self, scanner, target=None, scan=None, include_recurring=False):
+        """Compare one scan with the previous scan of the same scanner and target.
+
+        The scan is the object key or scan folder `scan`, else the latest scan
+        of `target`, else the scanner's latest scan. Returns None if there is
+        no such scan; otherwise new (and optionally recurring) findings of the
+        scan and the findings of the previous scan it no longer has.
+        """
+        conn = self._connect()
+        clauses, params = ["scanner = ?", "error IS NULL"], [scanner]
+        if scan:
+            clauses.append("(key = ? OR scan_folder = ?)")
+            params.extend([scan, scan])
+        elif target:
+            clauses.append("target = ?")
+            params.append(target_key(target))
+        current = conn.execute(
+            f"SELECT * FROM ingested_objects WHERE {' AND '.join(clauses)} ORDER BY scan_time DESC, key DESC LIMIT 1",
+            params).fetchone()
+        if current is None:
+            return None
+        previous = None
+        for obj in self._scan_history(conn, scanner, current["target"]):
+            if obj["key"] == current["key"]:
+                break
+            previous = obj["key"]
+
+        statuses = (NEW, RECURRING) if include_recurring else (NEW,)
+        placeholders = ", ".join("?" for _ in statuses)
+        rows = conn.execute(
+            f"SELECT * FROM findings WHERE object_key = ? AND status IN ({placeholders}) ORDER BY id",
+            [current["key"], *statuses]).fetchall()
+        resolved = conn.execute(
+            "SELECT * FROM findings p WHERE p.object_key = ? AND NOT EXISTS (SELECT 1 FROM findings c"
+            " WHERE c.object_key = ? AND c.fingerprint = p.fingerprint) ORDER BY id",
+            (previous, current["key"])).fetchall() if previous else []
+        counts = {row[0]: row[1] for row in conn.execute(
+            "SELECT status, COUNT(DISTINCT fingerprint) FROM findings WHERE object_key = ? GROUP BY status",
+            (current["key"],))}
+
+        def unique(rows, status=None):
+            # A scan may report the same issue more than once; the delta lists it once
+            findings = {}
+            for row in rows:
+                finding = findings.setdefault(row["fingerprint"], self._row_to_dict(row, include_raw=True))
+                if status:
+                    finding["status"] = status
+            return list(findings.values())
+
+        new = unique(rows)
+        gone = unique(resolved, RESOLVED)
+        return {
+            "scanner": scanner,
+            "target": current["target"],
+            "scan": {"key": current["key"], "scan_folder": current["scan_folder"],
+                     "scan_time": datetime.fromtimestamp(current["scan_time"], timezone.utc).isoformat()},
+            "previous_scan": previous,
+            "summary": {NEW: counts.get(NEW, 0), RECURRING: counts.get(RECURRING, 0), RESOLVED: len(gone)},
+            "findings": new + gone,
+        }
+
+    def stats(self):
+        conn = self._connect()
+        stats = dict(self._stats)
+        stats["path"] = self.path
+        stats["findings"] = conn.execute("SELECT COUNT(*) FROM findings").fetchone()[0]
+        stats["objects"] = conn.execute("SELECT COUNT(*) FROM ingested_objects").fetchone()[0]
+        stats["objects_with_errors"] = conn.execute(
+            "SELECT COUNT(*) FROM ingested_objects WHERE error IS NOT NULL").fetchone()[0]
+        stats["by_scanner"] = {row[0]: row[1] for row in conn.execute(
+            "SELECT scanner, COUNT(*) FROM findings GROUP BY scanner")}
+        stats["ingest_running"] = self._ingest_thread is not None and self._ingest_thread.is_alive()
+        return stats
+
+
+findings_store = FindingsStore()
@@ -0,0 +1,89 @@
+"""Stable fingerprints of scanner findings.
+
+A fingerprint is a SHA-256 over (scanner, normalized location, rule or
+template id, normalized evidence). Fields that change on every run -
+timestamps, finding ids, request/response dumps, hit counters - are left
+out, so the same issue found by two scans gets the same fingerprint.
+"""
+import re
+import json
+import hashlib
+import urllib.parse
+
+# Attributes that identify a finding, per scanner; everything else is ignored
+EVIDENCE_ATTRIBUTES = {
+    "naabu": ("protocol",),
+    "tlsx": ("fingerprint_hash", "serial", "subject_dn", "subject_cn", "subject_an", "issuer_dn", "issuer_cn",
+             "not_after", "tls_version", "cipher"),
+    "zap": ("zap_pluginid", "zap_plugin_id", "pluginId", "zap_param", "param", "zap_cweid", "method"),
+    "nuclei": ("matcher_name", "matcher-name", "extracted_results", "extracted-results", "type"),
+}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def target_key(target):
+    """Comparable form of a scan target: lowercase, non-alphanumerics as '_'.
+
+    The naabu export file names use the same substitution, so a target
+    recovered from a file name matches one given on submission.
+    """
+    return re.sub(r"[^a-z0-9]", "_", str(target or "").strip().lower())
+
+
+def normalize_location(location):
+    """URL or host:port with volatile parts removed.
+
+    Scheme and host are lowercased, default ports and fragments dropped,
+    query values replaced by their sorted parameter names, trailing
+    slashes removed.
+    """
+    if not location:
+        return ""
+    text = str(location).strip()
+    parsed = urllib.parse.urlsplit(text if "://" in text else f"//{text}")
+    host = (parsed.hostname or "").lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    scheme = parsed.scheme.lower()
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    params = sorted({name for name, _ in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)})
+    path = parsed.path.rstrip("/")
+    query = f"?{'&'.join(params)}" if params else ""
+    return f"{scheme}://{netloc}{path}{query}" if scheme else f"{netloc}{path}{query}"
+
+
+def _evidence_value(value):
+    if isinstance(value, list):
+        return sorted(_evidence_value(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _evidence_value(v) for k, v in sorted(value.items())}
+    return str(value).strip()
+
+
+def evidence_of(scanner, finding):
+    """The identifying fields of a finding (a secureCodeBox finding or a raw nuclei result)"""
+    keys = EVIDENCE_ATTRIBUTES.get(scanner, ())
+    source = finding.get("attributes") if isinstance(finding.get("attributes"), dict) else finding
+    evidence = {}
+    for key in keys:
+        value = source.get(key)
+        if value not in (None, "", []):
+            evidence[key.replace("-", "_")] = _evidence_value(value)
+    return evidence
+
+
+def fingerprint_finding(columns, finding):
+    """SHA-256 fingerprint of one finding from its normalized columns and raw document"""
+    scanner = columns["scanner"]
+    location = columns.get("location")
+    if not location and columns.get("host"):
+        location = f"{columns['host']}:{columns['port']}" if columns.get("port") else columns["host"]
+    material = [
+        scanner,
+        normalize_location(location),
+        str(columns.get("rule_id") or columns.get("name") or "").strip().lower(),
+        evidence_of(scanner, finding),
+    ]
+    return hashlib.sha256(json.dumps(material, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
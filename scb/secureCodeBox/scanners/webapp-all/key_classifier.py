@@ -0,0 +1,103 @@
+"""Classification of MinIO object keys into (scanner type, file type).
+
+Every listing endpoint goes through classify() (via the object index), so
+a key is labelled the same way everywhere. Results are memoized per key
+and ETag. The operator's generic findings.json does not name its
+scanner; it is taken for TLSX unless KEY_CLASSIFIER_SNIFF is on,
+in which case the object's metadata (x-amz-meta-scanner) or its first
+bytes decide, at the cost of one ranged GET per object version.
+"""
+import os
+import re
+import functools
+
+from minio_client import get_s3_client
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+# Look inside ambiguous objects to find their scanner
+KEY_CLASSIFIER_SNIFF = os.environ.get("KEY_CLASSIFIER_SNIFF", "0").lower() in ("1", "true", "yes")
+KEY_CLASSIFIER_SNIFF_BYTES = int(os.environ.get("KEY_CLASSIFIER_SNIFF_BYTES", "4096"))
+# Memoized (key, etag) classifications
+KEY_CLASSIFIER_CACHE_SIZE = int(os.environ.get("KEY_CLASSIFIER_CACHE_SIZE", "131072"))
+
+SCANNER_TYPES = ('naabu', 'tlsx', 'zap', 'nuclei', 'other')
+
+# (scanner, key pattern, ((file type pattern or None, file type), ...)), first match wins
+_KEY_RULES = (
+    ('naabu', re.compile(r'naabu', re.I), ((None, 'findings'),)),
+    ('tlsx', re.compile(r'tlsx', re.I), ((None, 'findings'),)),
+    ('zap', re.compile(r'zap|\.html$', re.I), ((re.compile(r'report|\.html$', re.I), 'report'),
+                                               (None, 'findings'))),
+    ('nuclei', re.compile(r'nuclei|\.jsonl$', re.I), ((re.compile(r'\.jsonl$', re.I), 'raw'),
+                                                      (re.compile(r'\.md$', re.I), 'summary'),
+                                                      (None, 'findings'))),
+)
+# Parsed findings the operator stores for any scanner (scan-{uid}/findings.json)
+_GENERIC_FINDINGS = re.compile(r'findings\.json$')
+_GENERIC_SCANNER = 'tlsx'
+
+# Markers of each scanner in secureCodeBox findings (see the parsers) or raw output
+_CONTENT_SIGNATURES = (
+    ('zap', re.compile(rb'"zap_[a-z]+"\s*:|<OWASPZAPReport')),
+    ('nuclei', re.compile(rb'"template[-_]id"\s*:|"matched-at"\s*:')),
+    ('naabu', re.compile(rb'"category"\s*:\s*"Open Port"')),
+    ('tlsx', re.compile(rb'"category"\s*:\s*"(?:TLSX Result|TLS Certificate Info|TLS)"')),
+)
+
+
+def match_key(key):
+    """(scanner_type, file_type, ambiguous) from the key alone"""
+    for scanner_type, pattern, file_types in _KEY_RULES:
+        if pattern.search(key):
+            for file_pattern, file_type in file_types:
+                if file_pattern is None or file_pattern.search(key):
+                    return scanner_type, file_type, False
+    if _GENERIC_FINDINGS.search(key):
+        return _GENERIC_SCANNER, 'findings', True
+    return 'other', 'unknown', False
+
+
+def is_result_key(key):
+    """True for keys holding scanner results (findings or raw output, not rendered reports)"""
+    scanner_type, file_type, _ = match_key(key)
+    return scanner_type != 'other' and file_type != 'report'
+
+
+def sniff_scanner(key, bucket=MINIO_BUCKET):
+    """Scanner named by an object's metadata or recognised in its first bytes (None if neither)"""
+    response = get_s3_client().get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{KEY_CLASSIFIER_SNIFF_BYTES - 1}")
+    try:
+        scanner_type = (response.get('Metadata') or {}).get('scanner', '').lower()
+        if scanner_type in SCANNER_TYPES:
+            return scanner_type
+        head = response['Body'].read()
+    finally:
+        response['Body'].close()
+    for scanner_type, signature in _CONTENT_SIGNATURES:
+        if signature.search(head):
+            return scanner_type
+    return None
+
+
+@functools.lru_cache(maxsize=KEY_CLASSIFIER_CACHE_SIZE)
+def _classify(key, etag, bucket, sniff):
+    # Sniffing errors propagate, so only successful lookups are memoized
+    scanner_type, file_type, ambiguous = match_key(key)
+    if ambiguous and sniff:
+        scanner_type = sniff_scanner(key, bucket) or scanner_type
+    return scanner_type, file_type
+
+
+def classify(key, etag=None, bucket=MINIO_BUCKET):
+    """Return (scanner_type, file_type) for a MinIO object key"""
+    try:
+        return _classify(key, etag, bucket, KEY_CLASSIFIER_SNIFF)
+    except Exception as e:
+        print(f"[KEY-CLASSIFIER] Could not sniff {key}: {e}")
+        return _classify(key, etag, bucket, False)
+
+
+def stats():
+    info = _classify.cache_info()
+    return {"sniff": KEY_CLASSIFIER_SNIFF, "cached": info.currsize, "max_cached": info.maxsize,
+            "hits": info.hits, "misses": info.misses}
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+
+from kubernetes import client, config
+from kubernetes.config.config_exception import ConfigException
+
+from metrics import observe_kube
+
+# Connection settings for the shared Kubernetes client (override via env vars)
+K8S_POOL_SIZE = int(os.environ.get("K8S_POOL_SIZE", "16"))
+# How often (seconds) the token / kubeconfig file is checked for rotation
+K8S_CREDENTIAL_CHECK_INTERVAL = float(os.environ.get("K8S_CREDENTIAL_CHECK_INTERVAL", "30"))
+K8S_SERVICE_ACCOUNT_TOKEN = "/var/run/secrets/kubernetes.io/serviceaccount/token"
+
+_api_client = None
+_custom_objects_api = None
+_client_lock = threading.Lock()
+
+_state = {
+    "source": None,
+    "credential_path": None,
+    "credential_mtime": None,
+    "created_at": None,
+    "last_check": 0.0,
+    "refreshes": 0,
+    "last_error": None,
+}
+
+
+class KubeConfigError(Exception):
+    """No in-cluster or local kube config could be loaded"""
+
+
+class _TimedApiClient(client.ApiClient):
+    """ApiClient that records the latency of every call (see metrics.py).
+
+    Calls are labelled with the resource path template. Older clients pass
+    it to call_api(resource_path, method, ...); newer ones pass it to
+    param_serialize() and call call_api(method, url, ...) with the full URL.
+    """
+
+    _HTTP_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+    _last_path = threading.local()
+
+    def param_serialize(self, method, resource_path, *args, **kwargs):
+        self._last_path.value = resource_path
+        return super().param_serialize(method, resource_path, *args, **kwargs)
+
+    def call_api(self, *args, **kwargs):
+        if args and str(args[0]).upper() in self._HTTP_METHODS:
+            method, path = args[0], getattr(self._last_path, "value", None) or "unknown"
+        else:
+            path, method = args[0], args[1]
+        start = time.monotonic()
+        outcome = "error"
+        try:
+            result = super().call_api(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            observe_kube(method, path, time.monotonic() - start, outcome)
+
+
+def _credential_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def load_configuration():
+    """Load in-cluster config, falling back to kubeconfig, into a fresh Configuration.
+
+    Returns (configuration, source, credential_path); credential_path is the
+    file whose modification signals rotated credentials.
+    """
+    configuration = client.Configuration()
+    try:
+        config.load_incluster_config(client_configuration=configuration)
+        source, credential_path = "in-cluster", K8S_SERVICE_ACCOUNT_TOKEN
+    except ConfigException:
+        kubeconfig = os.path.expanduser(os.environ.get("KUBECONFIG", "~/.kube/config").split(os.pathsep)[0])
+        try:
+            config.load_kube_config(client_configuration=configuration)
+        except Exception as e:
+            raise KubeConfigError(f"Kube config load failed: {e}") from e
+        source, credential_path = "kubeconfig", kubeconfig
+    configuration.connection_pool_maxsize = K8S_POOL_SIZE
+    return configuration, source, credential_path
+
+
+def _build():
+    global _api_client, _custom_objects_api
+    configuration, source, credential_path = load_configuration()
+    _api_client = _TimedApiClient(configuration)
+    _custom_objects_api = client.CustomObjectsApi(_api_client)
+    now = time.time()
+    _state.update(source=source, credential_path=credential_path,
+                  credential_mtime=_credential_mtime(credential_path),
+                  created_at=now, last_check=now, last_error=None)
+    print(f"[KUBE-CLIENT] Loaded {source} kube config (pool size {K8S_POOL_SIZE})")
+
+
+def _credentials_rotated():
+    _state["last_check"] = time.time()
+    mtime = _credential_mtime(_state["credential_path"])
+    return mtime is not None and mtime != _state["credential_mtime"]
+
+
+def get_api_client():
+    """Return the process-wide ApiClient, loading kube config on first use.
+
+    The client (and its urllib3 connection pool) is shared by every request
+    handler. The service account token / kubeconfig is re-checked at most
+    every K8S_CREDENTIAL_CHECK_INTERVAL seconds and the client rebuilt when
+    it changed. Raises KubeConfigError if no config can be loaded.
+    """
+    if _api_client is not None and time.time() - _state["last_check"] < K8S_CREDENTIAL_CHECK_INTERVAL:
+        return _api_client
+    with _client_lock:
+        try:
+            if _api_client is None:
+                _build()
+            elif time.time() - _state["last_check"] >= K8S_CREDENTIAL_CHECK_INTERVAL and _credentials_rotated():
+                print(f"[KUBE-CLIENT] {_state['credential_path']} changed, reloading credentials")
+                _build()
+                _state["refreshes"] += 1
+        except KubeConfigError as e:
+            _state["last_error"] = str(e)
+            if _api_client is None:
+                raise
+            print(f"[KUBE-CLIENT] Credential reload failed, keeping current client: {e}")
+        return _api_client
+
+
+def get_custom_objects_api():
+    """Shared CustomObjectsApi bound to get_api_client()"""
+    get_api_client()
+    return _custom_objects_api
+
+
+def reset_kube_client():
+    """Drop the shared client so the next call reloads kube config"""
+    global _api_client, _custom_objects_api
+    with _client_lock:
+        _api_client = None
+        _custom_objects_api = None
+
+
+def health_state():
+    """Snapshot of the shared client's configuration and refresh history"""
+    with _client_lock:
+        state = dict(_state)
+    state["client_initialized"] = _api_client is not None
+    state["pool_size"] = K8S_POOL_SIZE
+    state["credential_check_interval"] = K8S_CREDENTIAL_CHECK_INTERVAL
+    return state
@@ -0,0 +1,116 @@
+"""Cursor pagination, filters and field selection for the listing endpoints.
+
+Listings page through the object index's pre-sorted views: the cursor
+holds the sort position of the last row returned, so every page starts
+with a binary search instead of re-reading the bucket, and a page costs
+the same however large the bucket is. compact=true returns
+{"columns": [...], "rows": [[...], ...]} instead of one object per row.
+"""
+import os
+import json
+import base64
+
+from findings_store import parse_time
+
+LISTING_PAGE_SIZE = int(os.environ.get("LISTING_PAGE_SIZE", "100"))
+LISTING_MAX_PAGE_SIZE = int(os.environ.get("LISTING_MAX_PAGE_SIZE", "1000"))
+
+
+class InvalidListing(Exception):
+    pass
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidListing(f"Invalid cursor: {cursor}")
+    if not isinstance(position, list):
+        raise InvalidListing(f"Invalid cursor: {cursor}")
+    return position
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+class ListingQuery:
+    """Parsed listing parameters; raises InvalidListing for malformed values"""
+
+    def __init__(self, limit=None, cursor=None, prefix=None, since=None, until=None, scanner=None,
+                 fields=None, compact=False, all_fields=(), default_fields=None):
+        self.limit = max(1, min(int(limit or LISTING_PAGE_SIZE), LISTING_MAX_PAGE_SIZE))
+        self.after = decode_cursor(cursor) if cursor else None
+        self.prefix = prefix or None
+        self.since = parse_time(since)
+        self.until = parse_time(until)
+        for name, raw, parsed in (("since", since, self.since), ("until", until, self.until)):
+            if raw and parsed is None:
+                raise InvalidListing(f"Invalid {name}: {raw} (use ISO 8601 or epoch seconds)")
+        self.scanners = set(_split(scanner)) or None
+        self.fields = _split(fields) or list(default_fields or all_fields)
+        unknown = [f for f in self.fields if f not in all_fields]
+        if unknown:
+            raise InvalidListing(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(all_fields)})")
+        self.compact = compact
+
+    def in_time_range(self, timestamp):
+        if self.since is not None and (timestamp is None or timestamp < self.since):
+            return False
+        if self.until is not None and (timestamp is None or timestamp > self.until):
+            return False
+        return True
+
+
+def _start(items, sort_key, bound, descending, inclusive=False):
+    """Index of the first item sorted after the bound position (or at it, if inclusive)"""
+    bound = tuple(bound)
+    low, high = 0, len(items)
+    try:
+        while low < high:
+            middle = (low + high) // 2
+            position = tuple(sort_key(items[middle]))
+            if position == bound and inclusive or ((position < bound) if descending else (position > bound)):
+                high = middle
+            else:
+                low = middle + 1
+    except TypeError:
+        raise InvalidListing("Cursor does not belong to this listing")
+    return low
+
+
+def paginate(items, sort_key, query, match=None, descending=False, stop=None, floor=None):
+    """One page of a pre-sorted list: (rows as (absolute index, item), next cursor or None).
+
+    match(item) filters; floor is the first position worth looking at and
+    stop(item) ends the scan once the sort order guarantees nothing further
+    matches (e.g. a key prefix or a time bound).
+    """
+    if query.after is not None:
+        start = _start(items, sort_key, query.after, descending)
+    elif floor is not None:
+        start = _start(items, sort_key, floor, descending, inclusive=True)
+    else:
+        start = 0
+    rows = []
+    index = start
+    while index < len(items) and len(rows) < query.limit:
+        item = items[index]
+        if stop is not None and stop(item):
+            return rows, None
+        if match is None or match(item):
+            rows.append((index, item))
+        index += 1
+    more = index < len(items) and not (stop is not None and stop(items[index]))
+    return rows, (encode_cursor(list(sort_key(rows[-1][1]))) if more and rows else None)
+
+
+def shape(records, query):
+    """Apply field selection and compact mode to a page of row dicts"""
+    if query.compact:
+        return {"columns": query.fields, "rows": [[record.get(f) for f in query.fields] for record in records]}
+    return [{f: record.get(f) for f in query.fields} for record in records]
@@ -3,8 +3,7 @@ from fastapi import FastAPI, Request, Form
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.templating import Jinja2Templates
 import boto3
-from kubernetes import client, config
-import sys
+from kube_client import get_custom_objects_api
 import subprocess
 import shlex
 import yaml
@@ -57,20 +56,6 @@ def print_startup_debug():
 
 print_startup_debug()
 
-# Helper to load kube config robustly
-def load_kube():
-    try:
-        from kubernetes.config.config_exception import ConfigException
-        try:
-            config.load_incluster_config()
-            print('Loaded in-cluster kube config')
-        except ConfigException:
-            config.load_kube_config()
-            print('Loaded local kube config')
-    except Exception as e:
-        print(f'Kube config load failed: {e}')
-        sys.exit(1)
-
 @app.get("/reset")
 def reset():
     if scan_in_progress.locked():
@@ -184,9 +169,8 @@ def scan(request: Request, scanner: str = Form(...), target: str = Form(...)):
             "spec": {"scanType": scanner, "parameters": [target]}
         }
     print(f"Scan YAML: {scan_yaml}")
-    load_kube()
-    k8s_api = client.CustomObjectsApi()
     try:
+        k8s_api = get_custom_objects_api()
         k8s_api.create_namespaced_custom_object(
             group="execution.securecodebox.io",
             version="v1",
@@ -205,9 +189,8 @@ def scan(request: Request, scanner: str = Form(...), target: str = Form(...)):
 def status():
     if not current_scan_name:
         return {"status": "idle"}
-    load_kube()
-    k8s_api = client.CustomObjectsApi()
     try:
+        k8s_api = get_custom_objects_api()
         scan = k8s_api.get_namespaced_custom_object(
             group="execution.securecodebox.io",
             version="v1",
@@ -1,26 +1,71 @@
 import os, re, time, threading
+import asyncio
 from fastapi import FastAPI, Request, Form, Body
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
-import boto3
-from kubernetes import client, config
-import sys
-import subprocess
-import json
 import io
 import time
 import glob
 import zipfile
 import tempfile
-import queue
 import threading
 import signal
 import shutil
-import concurrent.futures
+from botocore.exceptions import ClientError
+from minio_client import get_s3_client, health_state as minio_client_health
+from object_index import object_index, SCANNER_TYPES, file_position, folder_position
+from key_classifier import is_result_key
+from listing import ListingQuery, InvalidListing, paginate, shape
+from minio_stream import stream_object, content_disposition
+import minio_async
+from minio_health import minio_breaker, minio_health_monitor
+from zip_stream import stream_zip
+from bulk_fetch import bulk_fetcher
+from nuclei_stream import stream_nuclei_envelope
+from scan_watcher import ScanWatcher, DELETED
+from kube_client import get_custom_objects_api, health_state as kube_client_health
+from sse_hub import sse_hub, format_sse, parse_last_event_id
+from progress import stage_history
+from findings_store import findings_store, InvalidQuery
+from cascade_cache import cascade_cache, incremental_enabled
+from scan_registry import (ScanRegistry, QueueFull, TRANSITIONS, QUEUED, COMPLETED, FAILED, CANCELLED,
+                           SCAN_OUTPUT_BUFFER_LINES)
+from batch_scheduler import BatchScheduler, InvalidBatch, parse_targets, BATCH_RUNNING
+from state_journal import state_journal, reconcile_lost_scan
+import metrics
 
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
 
+# Routes that reach MinIO on every call; refused at once while the MinIO circuit is open
+MINIO_ROUTE_PREFIXES = ("/download-object", "/download-scanner", "/download-folder", "/download-file", "/download-naabu",
+                        "/download-tlsx", "/download-zap", "/download-nuclei", "/mobile-download", "/findings/ingest",
+                        "/object-index/invalidate")
+
+@app.middleware("http")
+async def refuse_while_minio_down(request: Request, call_next):
+    if request.url.path.startswith(MINIO_ROUTE_PREFIXES) and not minio_breaker.allow():
+        retry_after = minio_breaker.retry_after()
+        return JSONResponse(
+            content={"error": f"MinIO is unavailable, retry in {retry_after}s", "minio": minio_health_monitor.status()},
+            status_code=503,
+            headers={"Retry-After": str(retry_after)}
+        )
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Labelled by route template, not raw path, to keep /metrics small
+    start = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe_http(request.method, getattr(route, "path", "unmatched"), status, time.monotonic() - start)
+
 # Configs (set these as env vars or hardcode for PoC)
 MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "http://localhost:9000")
 MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY", "admin")
@@ -28,16 +73,6 @@ MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY", "password")
 MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
 NAMESPACE = os.environ.get("K8S_NAMESPACE", "default")
 
-# Global state management
-scan_in_progress = threading.Lock()
-current_scan_name = None
-current_target = None
-current_results_dir = None
-output_queue = queue.Queue()
-current_process = None
-output_thread = None
-zap_done = False
-
 # At startup, print environment and config status
 def print_startup_debug():
     print('--- WEBAPP-ALL STARTUP DEBUG ---')
@@ -50,122 +85,180 @@ def print_startup_debug():
 
 print_startup_debug()
 
-# Helper to load kube config robustly
-def load_kube():
+# Scan CRD states from one Kubernetes watch, shared by status routes and /scan-events
+scan_watcher = ScanWatcher(NAMESPACE, api_factory=get_custom_objects_api)
+scan_watcher.add_listener(lambda name, old_state, new_state, scan: sse_hub.publish(
+    "scan-events", {"scan": name, "old_state": old_state, "state": new_state, "time": time.time()}))
+
+# Scan registry: every cascade gets its own process, output buffer and state,
+# so several can run at once (limits: SCAN_MAX_CONCURRENT / SCAN_MAX_PER_TARGET).
+# The state journal keeps scans across webapp restarts.
+CASCADE_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), 'run_cascading_manual.sh'))
+
+def build_cascade_command(record):
+    # Use the cascading script that runs Naabu -> TLSX -> ZAP -> Nuclei
+    incremental = record.options.get("incremental", incremental_enabled())
+    return (["bash", CASCADE_SCRIPT, record.target], os.path.dirname(CASCADE_SCRIPT),
+            {"CASCADE_INCREMENTAL": "1" if incremental else "0"})
+
+def on_scan_output(record, line):
+    print(f"CASCADING SCRIPT OUTPUT [{record.id}]: {line}")
+    sse_hub.publish(record.id, {'output': line})
+
+def on_scan_event(record, event):
+    # Typed progress events from the script (CASCADE_EVENTS_FILE), already applied to record.progress
+    sse_hub.publish(record.id, {'progress': event})
+    if event.get('type') == 'artifact':
+        print(f"[PROGRESS] {record.id}: {event.get('stage')} artifact {event.get('uri')}")
+        # New results were uploaded, pick them up on the next listing
+        object_index.invalidate()
+        # The findings store compares each scan with the previous one of the same target
+        prefix = f"s3://{MINIO_BUCKET}/"
+        if str(event.get('uri', '')).startswith(prefix):
+            findings_store.set_object_target(event['uri'][len(prefix):], record.target)
+    elif event.get('type') == 'stage_finished' and not event.get('cached'):
+        stage = record.progress.snapshot()['stages'].get(event.get('stage'))
+        if stage and stage['started_at'] is not None:
+            metrics.observe_stage(event['stage'], event.get('status') or 'done', stage['elapsed'])
+    elif event.get('type') == 'workflow_finished':
+        record.zap_done = record.progress.succeeded
+        print(f"[PROGRESS] {record.id}: workflow {event.get('status')}")
+
+def on_scan_state(record, old_state, new_state):
+    print(f"[SCAN-REGISTRY] {record.id}: {old_state} -> {new_state}")
+    sse_hub.publish(record.id, {'state': new_state})
+    if new_state in (COMPLETED, FAILED, CANCELLED):
+        sse_hub.close(record.id)
+        object_index.invalidate()
+        # Even a failed cascade may have uploaded findings for its earlier stages
+        findings_store.ingest_in_background()
+
+scan_registry = ScanRegistry(build_cascade_command, journal=state_journal)
+scan_registry.add_output_hook(on_scan_output)
+scan_registry.add_event_hook(on_scan_event)
+scan_registry.add_state_listener(on_scan_state)
+
+metrics.SCAN_QUEUE_DEPTH.set_function(lambda: scan_registry.stats()["queued"])
+metrics.SCANS_RUNNING.set_function(lambda: scan_registry.stats()["running"])
+metrics.SSE_SUBSCRIBERS.set_function(lambda: sse_hub.stats()["subscribers"])
+metrics.SSE_BUFFERED_EVENTS.set_function(lambda: sse_hub.stats()["buffered_events"])
+metrics.MINIO_BREAKER_STATE.set_function(lambda: ("closed", "half_open", "open").index(minio_breaker.state))
+
+# Batches of targets, fed to the registry round-robin and rate limited (BATCH_SUBMIT_RATE)
+batch_scheduler = BatchScheduler(scan_registry)
+
+@app.on_event("startup")
+def ingest_findings():
+    # Pick up findings uploaded while the webapp was down
+    findings_store.ingest_in_background()
+
+@app.on_event("startup")
+def monitor_minio():
+    # Routes read the cached probe result instead of probing MinIO themselves
+    minio_health_monitor.start()
+
+@app.on_event("startup")
+async def recover_scans():
+    # Reattach scans that kept running while the webapp was down, then resume batches
+    await scan_registry.recover(reconcile=lambda record: reconcile_lost_scan(record, NAMESPACE))
+    batch_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_scans():
+    # Batches first, so their in-flight targets stay checkpointed for the next start
+    await batch_scheduler.stop()
+    # Running scans are left running and reattached on the next start (SCAN_STOP_ON_SHUTDOWN=1 stops them)
+    await scan_registry.shutdown()
+    await minio_health_monitor.stop()
+    await minio_async.close()
+
+def resolve_scan(scan_id=None):
+    """The scan a legacy single-scan route refers to: the given one, else the latest"""
+    if scan_id:
+        return scan_registry.get(scan_id)
+    return scan_registry.latest()
+
+def cleanup_temp_files():
+    """Remove temporary ZIP and scan YAML files, unless other scans still need them"""
+    if scan_registry.latest(active_only=True) is not None:
+        print("Other scans are still active, keeping temporary files")
+        return
     try:
-        from kubernetes.config.config_exception import ConfigException
-        try:
-            config.load_incluster_config()
-            print('Loaded in-cluster kube config')
-        except ConfigException:
-            config.load_kube_config()
-            print('Loaded local kube config')
+        # Clean up temporary ZIP files
+        temp_dir = tempfile.gettempdir()
+        for temp_file in glob.glob(os.path.join(temp_dir, "*.zip")):
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                    print(f"Removed temp file: {temp_file}")
+            except Exception as e:
+                print(f"Error removing temp file {temp_file}: {e}")
+                
+        # Clean up temporary scan files
+        for temp_file in glob.glob("/tmp/*-scan-*.yaml"):
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                    print(f"Removed scan YAML: {temp_file}")
+            except Exception as e:
+                print(f"Error removing scan YAML {temp_file}: {e}")
+                
     except Exception as e:
-        print(f'Kube config load failed: {e}')
-        sys.exit(1)
+        print(f"Error during cleanup: {e}")
 
-def cleanup_process():
-    """Clean up any running process"""
-    global current_process, output_thread
-    
-    if current_process is not None:
-        try:
-            print(f"Terminating process (PID: {current_process.pid})")
-            current_process.terminate()
-            try:
-                current_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print("Process didn't terminate gracefully, forcing kill")
-                current_process.kill()
-                current_process.wait()
-        except Exception as e:
-            print(f"Error terminating process: {e}")
-        finally:
-            current_process = None
-    
-    if output_thread is not None and output_thread.is_alive():
-        print("Output thread is still running, but will be cleaned up")
+def render_scan_page(template, request, record, **extra):
+    context = {
+        "request": request, 
+        "scan_in_progress": record is not None and record.active, 
+        "scan_name": record.id if record else None, 
+        "target": record.target if record else None,
+        "results_dir": record.results_dir if record else None
+    }
+    context.update(extra)
+    return templates.TemplateResponse(template, context)
 
-def clear_output_queue():
-    """Clear the output queue"""
-    global output_queue
-    while not output_queue.empty():
-        try:
-            output_queue.get_nowait()
-        except queue.Empty:
-            break
+async def start_scan_page(template, request, target, options=None):
+    try:
+        record = await scan_registry.submit(target, options=options)
+    except QueueFull as e:
+        return render_scan_page(template, request, None, error=f"Too many scans waiting: {e}. Please try again later.")
+    if record.state == FAILED:
+        return render_scan_page(template, request, None, error=record.error, target=target)
+    if record.state == QUEUED:
+        message = (f"Cascading scan for {target} is queued (position {scan_registry.queue_position(record)}); "
+                   f"it starts when a scan slot frees up.\nCheck the output below for real-time progress.")
+    else:
+        message = f"Starting cascading scan (Naabu → TLSX → ZAP → Nuclei) for {target}...\nCheck the output below for real-time progress."
+    return render_scan_page(template, request, record, script_stdout=message, script_stderr="")
+
+async def clear_scan_state(scan_id=None):
+    record = resolve_scan(scan_id)
+    if record is not None and record.active:
+        await scan_registry.cancel(record.id)
+    await asyncio.to_thread(cleanup_temp_files)
+    return record
 
-def join_output_thread():
-    global output_thread
-    if output_thread is not None and output_thread.is_alive():
-        print("Joining output thread...")
-        output_thread.join(timeout=5)
-        output_thread = None
+def is_scan_result_key(key):
+    """True for MinIO keys holding Naabu, TLSX, ZAP or Nuclei results"""
+    return is_result_key(key)
 
 def fetch_all_scan_results_from_minio(temp_dir):
     """Fetch all scan results from MinIO including Naabu, TLSX, ZAP, and Nuclei"""
-    import boto3
-    import time
-    s3 = boto3.client(
-        's3',
-        endpoint_url=MINIO_ENDPOINT,
-        aws_access_key_id=MINIO_ACCESS_KEY,
-        aws_secret_access_key=MINIO_SECRET_KEY,
-    )
     print(f"[MINIO] Fetching all scan results from bucket: {MINIO_BUCKET}")
     start = time.time()
-    downloaded = []
     
     try:
-        # List all objects in the bucket
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(s3.list_objects_v2, Bucket=MINIO_BUCKET)
-            response = future.result(timeout=30)
-    except concurrent.futures.TimeoutError:
-        print("[MINIO] Timeout while listing objects!")
-        return []
+        # Paginated listing via the object index, entries carry their ETags
+        object_index.refresh()
+        objects = [f for files in object_index.scanner_files().values() for f in files if is_scan_result_key(f['key'])]
     except Exception as e:
         print(f"[MINIO] Error listing objects: {e}")
         return []
     
-    print(f"[MINIO] List objects took {time.time()-start:.2f}s")
+    print(f"[MINIO] List objects took {time.time()-start:.2f}s, {len(objects)} result files")
     
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            key = obj['Key']
-            print(f"[MINIO] Found object: {key}")
-            
-            # Download all relevant scan result files
-            if (key.endswith('findings.json') or 
-                key.endswith('zap-results.xml') or 
-                key.endswith('zap-results.json') or
-                key.endswith('.jsonl') or
-                'naabu-findings' in key or
-                'tlsx-findings' in key or
-                'nuclei' in key):
-                
-                # Create a meaningful filename
-                if key.startswith('securecodebox/securecodebox/'):
-                    # Remove the bucket prefix
-                    clean_key = key.replace('securecodebox/securecodebox/', '')
-                else:
-                    clean_key = key
-                
-                # Create a safe filename
-                safe_filename = clean_key.replace('/', '_').replace(':', '_')
-                local_path = os.path.join(temp_dir, safe_filename)
-                
-                print(f"[MINIO] Downloading {key} to {local_path}")
-                try:
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(s3.download_file, MINIO_BUCKET, key, local_path)
-                        future.result(timeout=30)
-                    downloaded.append(local_path)
-                    print(f"[MINIO] Successfully downloaded: {safe_filename}")
-                except concurrent.futures.TimeoutError:
-                    print(f"[MINIO] Timeout downloading {key}")
-                except Exception as e:
-                    print(f"[MINIO] Error downloading {key} from MinIO: {e}")
+    # One bounded worker pool; unchanged objects are served from the local ETag cache
+    downloaded = bulk_fetcher.fetch(objects, temp_dir)
     
     print(f"[MINIO] Total downloaded files: {len(downloaded)}")
     for file in downloaded:
@@ -182,395 +275,272 @@ def fetch_zap_reports_from_minio(scan_folder, temp_dir):
 def discover_scanner_files():
     """Discover all scanner files in MinIO and categorize them by scanner type and scan folders"""
     try:
-        import boto3
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
-        if 'Contents' not in response:
-            return {}
-        
-        # Organize by scan folders and scanner types
-        scan_folders = {}
-        scanner_files = {
-            'naabu': [],
-            'tlsx': [],
-            'zap': [],
-            'nuclei': [],
-            'other': []
-        }
-        
-        for obj in response['Contents']:
-            key = obj['Key']
-            file_info = {
-                'key': key,
-                'size': obj['Size'],
-                'last_modified': obj['LastModified'],
-                'file_type': 'unknown',
-                'scan_folder': None
-            }
-            
-            # Extract scan folder if present
-            if key.startswith('scan-') and '/' in key:
-                parts = key.split('/')
-                if len(parts) >= 2:
-                    file_info['scan_folder'] = parts[0]
-            
-            # Categorize files by patterns and content
-            if 'naabu' in key.lower() or (key.endswith('naabu-findings') and '.json' in key):
-                file_info['file_type'] = 'findings'
-                scanner_files['naabu'].append(file_info)
-            elif 'tlsx' in key.lower() or (key.endswith('findings.json') and 'scan-' in key and 'tlsx' in key):
-                file_info['file_type'] = 'findings'
-                scanner_files['tlsx'].append(file_info)
-            elif 'zap' in key.lower() or key.endswith('.html') or (key.endswith('.json') and 'zap' in key):
-                if 'report' in key.lower() or key.endswith('.html'):
-                    file_info['file_type'] = 'report'
-                else:
-                    file_info['file_type'] = 'findings'
-                scanner_files['zap'].append(file_info)
-            elif 'nuclei' in key.lower() or key.endswith('.jsonl') or key.endswith('nuclei-results'):
-                if key.endswith('.jsonl'):
-                    file_info['file_type'] = 'raw'
-                elif key.endswith('.md'):
-                    file_info['file_type'] = 'summary'
-                else:
-                    file_info['file_type'] = 'findings'
-                scanner_files['nuclei'].append(file_info)
-            elif key.endswith('findings.json') and 'scan-' in key:
-                # Generic findings.json in scan folders - try to determine scanner type
-                if file_info['scan_folder']:
-                    # This could be TLSX, ZAP, or other scanner findings
-                    file_info['file_type'] = 'findings'
-                    scanner_files['tlsx'].append(file_info)  # Most likely TLSX
-            else:
-                scanner_files['other'].append(file_info)
-            
-            # Organize by scan folders
-            if file_info['scan_folder']:
-                if file_info['scan_folder'] not in scan_folders:
-                    scan_folders[file_info['scan_folder']] = []
-                scan_folders[file_info['scan_folder']].append(file_info)
-        
-        # Sort each scanner's files by last modified (newest first)
-        for scanner in scanner_files:
-            scanner_files[scanner].sort(key=lambda x: x['last_modified'], reverse=True)
-        
-        # Sort scan folders by last modified (newest first)
-        for folder in scan_folders:
-            scan_folders[folder].sort(key=lambda x: x['last_modified'], reverse=True)
-        
         return {
-            'scanner_files': scanner_files,
-            'scan_folders': scan_folders
+            'scanner_files': object_index.scanner_files(),
+            'scan_folders': object_index.scan_folders()
         }
-        
     except Exception as e:
         print(f"[DISCOVER-FILES] Error: {e}")
         return {'scanner_files': {}, 'scan_folders': {}}
 
+async def fresh_object_index():
+    """Re-list a stale object index in a worker thread, so async routes can then read it without blocking"""
+    if not object_index.is_fresh():
+        await asyncio.to_thread(object_index.ensure_fresh)
+
 def get_latest_scanner_file(scanner_type, file_type=None):
     """Get the latest file for a specific scanner and optional file type"""
-    scanner_files = discover_scanner_files()
-    if scanner_type not in scanner_files or not scanner_files[scanner_type]:
+    files = object_index.files_for_scanner(scanner_type)
+    if not files:
         return None
     
     if file_type:
         # Filter by file type
-        filtered_files = [f for f in scanner_files[scanner_type] if f['file_type'] == file_type]
+        filtered_files = [f for f in files if f['file_type'] == file_type]
         return filtered_files[0] if filtered_files else None
     else:
         # Return the most recent file regardless of type
-        return scanner_files[scanner_type][0]
+        return files[0]
 
-def download_file_by_key(minio_key, filename_prefix):
-    """Generic function to download a file from MinIO by its key"""
+def download_file_by_key(minio_key, filename_prefix, request_headers=None):
+    """Generic function to stream a file from MinIO by its key"""
     try:
-        import boto3
-        import tempfile
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
+        # Create a nice filename
+        filename = f"{filename_prefix}-{int(time.time())}.json"
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Create a nice filename
-            filename = f"{filename_prefix}-{int(time.time())}.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=filename,
-                media_type='application/json'
-            )
+        return stream_object(minio_key, filename, media_type='application/json', request_headers=request_headers)
     except Exception as e:
         print(f"[DOWNLOAD-FILE] Error downloading {minio_key}: {e}")
         raise e
 
 @app.get("/clear-scan")
-def clear_scan():
-    global current_scan_name, current_target, current_results_dir, output_queue, current_process, output_thread, zap_done
+async def clear_scan(scan_id: str = None):
     print("=== CLEARING SCAN STATE ===")
-    
-    # Kill any running process
-    if current_process is not None:
-        try:
-            print(f"Terminating process (PID: {current_process.pid})")
-            current_process.terminate()
-            try:
-                current_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print("Process didn't terminate gracefully, forcing kill")
-                current_process.kill()
-                current_process.wait()
-        except Exception as e:
-            print(f"Error terminating process: {e}")
-        finally:
-            current_process = None
-    join_output_thread()
-    
-    # Release any locks
-    if scan_in_progress.locked():
-        print("Releasing scan lock")
-        scan_in_progress.release()
-    
-    # Clear the output queue
-    clear_output_queue()
-    
-    # Reset all global variables
-    current_scan_name = None
-    current_target = None
-    current_results_dir = None
-    zap_done = False
-    
-    # Clean up any temporary files
-    try:
-        import tempfile
-        import glob
-        import os
-        
-        # Clean up temporary ZIP files
-        temp_dir = tempfile.gettempdir()
-        for temp_file in glob.glob(os.path.join(temp_dir, "*.zip")):
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"Removed temp file: {temp_file}")
-            except Exception as e:
-                print(f"Error removing temp file {temp_file}: {e}")
-                
-        # Clean up temporary scan files
-        for temp_file in glob.glob("/tmp/*-scan-*.yaml"):
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"Removed scan YAML: {temp_file}")
-            except Exception as e:
-                print(f"Error removing scan YAML {temp_file}: {e}")
-                
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
-    
+    record = await clear_scan_state(scan_id)
     print("=== SCAN STATE CLEARED ===")
-    return {"status": "cleared", "message": "All scan state cleared and cleaned up"}
+    return {"status": "cleared", "scan_id": record.id if record else None,
+            "message": "Scan cancelled and temporary files cleaned up"}
 
 @app.get("/reset")
 def reset():
-    global current_scan_name, current_target, current_results_dir, zap_done
     print("=== RESETTING SCAN STATE ===")
-    
-    # Release any locks
-    if scan_in_progress.locked():
-        print("Releasing scan lock")
-        scan_in_progress.release()
-    
-    # Reset all global variables
-    current_scan_name = None
-    current_target = None
-    current_results_dir = None
-    zap_done = False
-    
+    # Running scans are left alone; only finished ones are forgotten
+    removed = scan_registry.forget_finished()
     print("=== SCAN STATE RESET ===")
-    return {"status": "reset"}
+    return {"status": "reset", "forgotten_scans": removed}
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    global current_scan_name, current_target, current_results_dir
-    
-    # Always set scan_in_progress to False unless a scan is running
-    in_progress = scan_in_progress.locked() and current_scan_name is not None
-    
-    # If there's no active scan but we have old state, clear it
-    if not in_progress and (current_scan_name is not None or current_target is not None):
-        print("Clearing stale scan state on page load")
-        current_scan_name = None
-        current_target = None
-        current_results_dir = None
-    
-    return templates.TemplateResponse("index.html", {
-        "request": request, 
-        "scan_in_progress": in_progress, 
-        "scan_name": current_scan_name, 
-        "target": current_target,
-        "results_dir": current_results_dir
-    })
+def index(request: Request, scan_id: str = None):
+    # Show the scan this page was opened for; without one the form is free for a new scan
+    return render_scan_page("index.html", request, scan_registry.get(scan_id) if scan_id else None)
 
 @app.post("/scan")
-def scan(request: Request, target: str = Form(...)):
-    global current_scan_name, current_target, current_results_dir, output_queue, output_thread, current_process, zap_done
-    if scan_in_progress.locked() or (current_process is not None and current_process.poll() is None):
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "error": "Scan in progress. Please wait for current scan to complete or use 'Clear Scan State' to reset.", 
-            "scan_in_progress": True, 
-            "scan_name": current_scan_name, 
-            "target": current_target,
-            "results_dir": current_results_dir
-        })
-    acquired = scan_in_progress.acquire(blocking=False)
-    if not acquired:
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "error": "Could not acquire scan lock. Please try again.", 
-            "scan_in_progress": True, 
-            "scan_name": current_scan_name, 
-            "target": current_target,
-            "results_dir": current_results_dir
-        })
-    scan_name = f"cascading-scan-{int(time.time())}"
-    current_scan_name = scan_name
-    current_target = target
-    current_results_dir = None
-    zap_done = False
-    clear_output_queue()
-    try:
-        # Use the cascading script that runs Naabu -> TLSX -> ZAP -> Nuclei
-        script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'run_cascading_manual.sh'))
-        current_process = subprocess.Popen(
-            ["bash", script_path, target], 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True,
-            cwd=os.path.dirname(script_path)
-        )
-        def read_output():
-            global current_results_dir, zap_done
-            try:
-                while True:
-                    output = current_process.stdout.readline()
-                    if output == '' and current_process.poll() is not None:
-                        break
-                    if output:
-                        line = output.strip()
-                        print(f"CASCADING SCRIPT OUTPUT: {line}")
-                        output_queue.put(line)
-                        # Detect cascading scan completion
-                        if 'CASCADING SCAN WORKFLOW COMPLETE' in line or 'All scans completed successfully' in line:
-                            zap_done = True
-                            print("Cascading scan completed! Download available.")
-                        if "nuclei-results.jsonl" in line:
-                            print("Nuclei results file found!")
-                        if "findings.json" in line:
-                            print("Findings file found!")
-            except Exception as e:
-                print(f"Error in output reading thread: {e}")
-            finally:
-                print("Output reading thread finished")
-                if scan_in_progress.locked():
-                    scan_in_progress.release()
-                current_scan_name = None
-                current_target = None
-        output_thread = threading.Thread(target=read_output, daemon=True)
-        output_thread.start()
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "scan_in_progress": True, 
-            "scan_name": scan_name, 
-            "target": target,
-            "results_dir": None,
-            "script_stdout": f"Starting cascading scan (Naabu → TLSX → ZAP → Nuclei) for {target}...\nCheck the output below for real-time progress.",
-            "script_stderr": ""
-        })
-    except Exception as e:
-        if scan_in_progress.locked():
-            scan_in_progress.release()
-        current_scan_name = None
-        current_target = None
-        current_process = None
-        output_thread = None
-        zap_done = False
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "error": str(e), 
-            "scan_in_progress": False, 
-            "scan_name": scan_name, 
-            "target": target,
-            "results_dir": None
-        })
+async def scan(request: Request, target: str = Form(...)):
+    return await start_scan_page("index.html", request, target)
 
 @app.get("/zap-ready")
-def zap_ready():
-    global zap_done
-    return {"zap_done": zap_done}
+def zap_ready(scan_id: str = None):
+    record = resolve_scan(scan_id)
+    return {"zap_done": record.zap_done if record else False}
 
 @app.get("/stream-output")
-def stream_output():
-    """Stream real-time output from the running script"""
-    def generate():
-        while True:
-            try:
-                # Get output from queue with timeout
-                line = output_queue.get(timeout=1)
-                yield f"data: {json.dumps({'output': line})}\n\n"
-            except queue.Empty:
-                # Send keepalive
-                yield f"data: {json.dumps({'keepalive': True})}\n\n"
-            except Exception as e:
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                break
-    
-    return StreamingResponse(generate(), media_type="text/plain")
+async def stream_output(request: Request, scan_id: str = None):
+    """Stream real-time output from a scan's script (the latest scan by default).
+
+    Every client has its own cursor into the scan's replay buffer and can
+    resume with Last-Event-ID after a reconnect.
+    """
+    if scan_id and scan_registry.get(scan_id) is None:
+        return JSONResponse(content={"error": f"Scan {scan_id} not found"}, status_code=404)
+    last_event_id = parse_last_event_id(request)
+
+    async def generate():
+        record = resolve_scan(scan_id)
+        while record is None:
+            # Nothing submitted yet: wait for the first scan
+            yield format_sse(None, {'keepalive': True})
+            await asyncio.sleep(1)
+            record = resolve_scan(scan_id)
+        if not record.active:
+            # Finished with no channel (webapp restarted, or evicted): nothing would publish or close it
+            output = record.output_tail(SCAN_OUTPUT_BUFFER_LINES)
+            sse_hub.replay_closed(record.id, [{'output': line} for line in output] + [{'state': record.state}])
+        async for event_id, data in sse_hub.subscribe(record.id, last_event_id):
+            yield format_sse(event_id, data)
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/scan-status")
-def get_scan_status():
-    """Get current scan status"""
-    global current_process, current_scan_name, current_target, current_results_dir
-    
-    if current_process is None:
+def get_scan_status(scan_id: str = None):
+    """Get scan status (the latest scan by default) with per-stage progress and ETAs"""
+    record = resolve_scan(scan_id)
+    if record is None:
         return {"status": "idle"}
-    
-    return_code = current_process.poll()
-    if return_code is None:
-        return {
-            "status": "running", 
-            "scan_name": current_scan_name,
-            "target": current_target,
-            "results_dir": current_results_dir
-        }
-    else:
-        return {
-            "status": "completed" if return_code == 0 else "failed",
-            "return_code": return_code,
-            "scan_name": current_scan_name,
-            "target": current_target,
-            "results_dir": current_results_dir
-        }
+    status = {
+        "status": record.state,
+        "scan_name": record.id,
+        "target": record.target,
+        "results_dir": record.results_dir,
+        "progress": record.progress.snapshot()
+    }
+    if record.state == QUEUED:
+        status["queue_position"] = scan_registry.queue_position(record)
+    if record.return_code is not None:
+        status["return_code"] = record.return_code
+    return status
 
 @app.get("/status")
 def status():
-    if not current_scan_name:
+    record = scan_registry.latest(active_only=True)
+    if record is None:
         return {"status": "idle"}
-    return {"status": "running", "scan_name": current_scan_name, "target": current_target}
+    return {"status": record.state, "scan_name": record.id, "target": record.target,
+            "active_scans": len([r for r in scan_registry.list() if r.active])}
+
+@app.get("/scans")
+def list_scans(state: str = None):
+    """All known scans, newest first, with the registry's limits and counts"""
+    if state is not None and state not in TRANSITIONS:
+        return JSONResponse(content={"error": f"Unknown state: {state}"}, status_code=400)
+    return {
+        "scans": [r.to_dict() for r in scan_registry.list(state)],
+        "registry": scan_registry.stats()
+    }
+
+@app.post("/scans")
+async def create_scan(payload: dict = Body(...)):
+    """Submit a cascading scan; it runs now or waits in the queue"""
+    target = str(payload.get("target") or "").strip()
+    if not target:
+        return JSONResponse(content={"error": "target is required"}, status_code=400)
+    # incremental: reuse cached TLSX/ZAP results whose inputs did not change (default: CASCADE_INCREMENTAL)
+    options = {"incremental": bool(payload["incremental"])} if "incremental" in payload else None
+    try:
+        record = await scan_registry.submit(target, options=options)
+    except QueueFull as e:
+        return JSONResponse(content={"error": str(e)}, status_code=429)
+    scan = record.to_dict()
+    scan["queue_position"] = scan_registry.queue_position(record)
+    return JSONResponse(content=scan, status_code=202)
+
+@app.get("/scans/{scan_id}")
+def get_scan(scan_id: str, output_lines: int = 0):
+    record = scan_registry.get(scan_id)
+    if record is None:
+        return JSONResponse(content={"error": f"Scan {scan_id} not found"}, status_code=404)
+    scan = record.to_dict(output_lines=output_lines)
+    scan["queue_position"] = scan_registry.queue_position(record)
+    return scan
+
+@app.delete("/scans/{scan_id}")
+async def cancel_scan(scan_id: str):
+    record = scan_registry.get(scan_id)
+    if record is None:
+        return JSONResponse(content={"error": f"Scan {scan_id} not found"}, status_code=404)
+    if not record.active:
+        return JSONResponse(content={"error": f"Scan {scan_id} already {record.state}"}, status_code=409)
+    await scan_registry.cancel(scan_id)
+    return record.to_dict()
+
+@app.post("/batches")
+async def create_batch(request: Request):
+    """Submit many targets as one batch.
+
+    Takes JSON ({"targets": ["10.0.0.0/24", "example.com"], "name": ..., "incremental": ...})
+    or a form upload with a `file` of targets (one per line or comma-separated,
+    '#' comments) and optional `name`/`incremental` fields. CIDR ranges are
+    expanded as the batch progresses.
+    """
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            payload = await request.json()
+            if not isinstance(payload, dict):
+                return JSONResponse(content={"error": "Expected a JSON object"}, status_code=400)
+            targets = payload.get("targets")
+            if not isinstance(targets, (list, str)):
+                return JSONResponse(content={"error": "targets must be a list or a string"}, status_code=400)
+        else:
+            payload = await request.form()
+            upload = payload.get("file")
+            if upload is None or not hasattr(upload, "read"):
+                return JSONResponse(content={"error": "Upload a targets file as 'file'"}, status_code=400)
+            targets = (await upload.read()).decode(errors="replace")
+        specs = parse_targets(targets)
+    except InvalidBatch as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except ValueError as e:
+        return JSONResponse(content={"error": f"Invalid request body: {str(e)}"}, status_code=400)
+    options = {}
+    if payload.get("incremental") not in (None, ""):
+        options["incremental"] = str(payload.get("incremental")).lower() in ("1", "true", "yes", "on")
+    batch = batch_scheduler.create(specs, options, name=payload.get("name") or None)
+    return JSONResponse(content=batch, status_code=202)
+
+@app.get("/batches")
+def list_batches(state: str = None):
+    return {"batches": batch_scheduler.list(state), "scheduler": batch_scheduler.stats()}
+
+@app.get("/batches/{batch_id}")
+def get_batch(batch_id: str):
+    batch = batch_scheduler.get(batch_id)
+    if batch is None:
+        return JSONResponse(content={"error": f"Batch {batch_id} not found"}, status_code=404)
+    return batch
+
+@app.get("/batches/{batch_id}/results")
+def get_batch_results(batch_id: str, state: str = None, limit: int = 100, offset: int = 0):
+    """Per-target scans, counts and artifacts of a batch, with totals over all its targets"""
+    try:
+        results = batch_scheduler.results(batch_id, state=state, limit=limit, offset=offset)
+    except InvalidBatch as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if results is None:
+        return JSONResponse(content={"error": f"Batch {batch_id} not found"}, status_code=404)
+    return results
+
+@app.delete("/batches/{batch_id}")
+async def cancel_batch(batch_id: str):
+    batch = batch_scheduler.get(batch_id)
+    if batch is None:
+        return JSONResponse(content={"error": f"Batch {batch_id} not found"}, status_code=404)
+    if batch["state"] != BATCH_RUNNING:
+        return JSONResponse(content={"error": f"Batch {batch_id} already {batch['state']}"}, status_code=409)
+    return await batch_scheduler.cancel(batch_id)
+
+@app.get("/findings")
+def query_findings(scanner: str = None, severity: str = None, host: str = None, port: str = None,
+                   rule_id: str = None, scan_folder: str = None, fingerprint: str = None, status: str = None,
+                   since: str = None, until: str = None, q: str = None, limit: int = 100, offset: int = 0,
+                   raw: bool = False):
+    """Query findings of all ingested scans, newest first.
+
+    Filters are exact matches (comma-separated for several values); status is
+    new or recurring against the previous scan of the same target; since/until
+    take ISO 8601 dates or epoch seconds, e.g. ?scanner=nuclei&severity=high,critical
+    &host=example.com&since=2026-10-01
+    """
+    findings_store.ensure_recent()
+    filters = {"scanner": scanner, "severity": severity, "host": host, "port": port, "rule_id": rule_id,
+               "scan_folder": scan_folder, "fingerprint": fingerprint, "status": status,
+               "since": since, "until": until, "q": q}
+    try:
+        return findings_store.query(filters, limit=limit, offset=offset, include_raw=raw)
+    except InvalidQuery as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"[FINDINGS] Query failed: {e}")
+        return JSONResponse(content={"error": f"Failed to query findings: {str(e)}"}, status_code=500)
+
+@app.post("/findings/ingest")
+def ingest_findings_now():
+    """Ingest new or changed findings objects from MinIO right away"""
+    try:
+        object_index.invalidate()
+        objects, findings = findings_store.ingest()
+        return {"status": "ingested", "objects": objects, "findings": findings, "store": findings_store.stats()}
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to ingest findings: {str(e)}"}, status_code=500)
 
 @app.get("/download-results/{scan_name}")
 def download_results(scan_name: str):
@@ -580,65 +550,112 @@ def download_results(scan_name: str):
         status_code=200
     )
 
+# Row fields of the paginated listings (?fields=a,b selects, ?compact=true returns columns + rows)
+FILE_FIELDS = ("file_id", "index", "filename", "full_path", "scanner_type", "scan_folder", "size_bytes", "size_human",
+               "file_type", "last_modified", "etag", "download_url")
+SCANNER_FILE_DEFAULT_FIELDS = ("file_id", "index", "filename", "full_path", "size_bytes", "size_human", "file_type",
+                               "last_modified", "download_url")
+FOLDER_FIELDS = ("folder_name", "total_files", "scanners", "scanner_counts", "latest_modified", "files")
+FOLDER_DEFAULT_FIELDS = FOLDER_FIELDS[:-1]
+RESULT_FIELDS = ("name", "path", "size", "full_path", "source", "scanner_type", "last_modified")
+RESULT_DEFAULT_FIELDS = RESULT_FIELDS[:5]
+OBJECT_FIELDS = ("key", "size", "last_modified", "scanner_type", "etag")
+OBJECT_DEFAULT_FIELDS = OBJECT_FIELDS[:3]
+DOWNLOAD_MEDIA_TYPES = {'.json': 'application/json', '.jsonl': 'application/x-ndjson', '.html': 'text/html',
+                        '.xml': 'application/xml', '.md': 'text/markdown', '.txt': 'text/plain'}
+# Sorts after every timestamp-tied key, so ?until= includes objects modified exactly then
+_LAST_KEY = "\U0010ffff"
+
+def size_human(size):
+    return f"{size / 1024:.1f} KB" if size < 1024*1024 else f"{size / (1024*1024):.1f} MB"
+
+def file_row(index, file_info):
+    return {
+        "file_id": file_info['file_id'],
+        "index": index,
+        "filename": file_info['key'].split('/')[-1],
+        "full_path": file_info['key'],
+        "scanner_type": file_info['scanner_type'],
+        "scan_folder": file_info['scan_folder'],
+        "size_bytes": file_info['size'],
+        "size_human": size_human(file_info['size']),
+        "file_type": file_info['file_type'],
+        "last_modified": str(file_info['last_modified']),
+        "etag": file_info['etag'],
+        "download_url": f"/download-object/{file_info['file_id']}",
+    }
+
+def page_newest_first(files, query, match=None):
+    """Page of a newest-first file list of the object index, with the query's time range and prefix"""
+    def matches(f):
+        return ((query.prefix is None or f['key'].startswith(query.prefix))
+                and (query.scanners is None or f['scanner_type'] in query.scanners)
+                and (match is None or match(f)))
+    return paginate(files, file_position, query, match=matches, descending=True,
+                    floor=(query.until, _LAST_KEY) if query.until is not None else None,
+                    stop=(lambda f: file_position(f)[0] < query.since) if query.since is not None else None)
+
+def object_row(file_info):
+    return {
+        "key": file_info['key'],
+        "size": file_info['size'],
+        "last_modified": str(file_info['last_modified']),
+        "scanner_type": file_info['scanner_type'],
+        "etag": file_info['etag'],
+    }
+
+def page_by_key(files, query, match=None):
+    """Page of the object index in key order, with the query's prefix, time range and scanners"""
+    def matches(f):
+        return ((query.scanners is None or f['scanner_type'] in query.scanners)
+                and (query.since is None and query.until is None or query.in_time_range(file_position(f)[0]))
+                and (match is None or match(f)))
+    return paginate(files, lambda f: (f['key'],), query, match=matches,
+                    floor=(query.prefix,) if query.prefix else None,
+                    stop=(lambda f: not f['key'].startswith(query.prefix)) if query.prefix else None)
+
 @app.get("/list-results")
-def list_results():
-    """List all available result files from MinIO only"""
+async def list_results(limit: int = None, cursor: str = None, prefix: str = None, since: str = None, until: str = None,
+                 scanner: str = None, fields: str = None, compact: bool = False):
+    """List result files from MinIO in key order, one page at a time (see next_cursor)"""
     try:
-        files = []
-        
-        # Only add MinIO files
-        try:
-            import boto3
-            s3 = boto3.client(
-                's3',
-                endpoint_url=MINIO_ENDPOINT,
-                aws_access_key_id=MINIO_ACCESS_KEY,
-                aws_secret_access_key=MINIO_SECRET_KEY,
-            )
-            
-            response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    size = obj['Size']
-                    
-                    # Only include relevant scan result files
-                    if (key.endswith('findings.json') or 
-                        key.endswith('zap-results.xml') or 
-                        key.endswith('zap-results.json') or
-                        key.endswith('.jsonl') or
-                        'naabu-findings' in key or
-                        'tlsx-findings' in key or
-                        'nuclei' in key):
-                        
-                        # Create a meaningful filename
-                        if key.startswith('securecodebox/securecodebox/'):
-                            clean_key = key.replace('securecodebox/securecodebox/', '')
-                        else:
-                            clean_key = key
-                        
-                        safe_filename = clean_key.replace('/', '_').replace(':', '_')
-                        
-                        files.append({
-                            "name": safe_filename,
-                            "path": f"minio://{key}",
-                            "size": size,
-                            "full_path": key,
-                            "source": "minio"
-                        })
-        except Exception as e:
-            print(f"[LIST-RESULTS] Error accessing MinIO: {e}")
-        
-        return JSONResponse(content={"files": files, "results_dir": "minio://securecodebox/securecodebox"})
-    
+        query = ListingQuery(limit, cursor, prefix, since, until, scanner, fields, compact,
+                             all_fields=RESULT_FIELDS, default_fields=RESULT_DEFAULT_FIELDS)
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    try:
+        await fresh_object_index()
+        rows, next_cursor = page_by_key(object_index.files_by_key(), query, match=lambda f: is_result_key(f['key']))
+        records = []
+        for _, file_info in rows:
+            key = file_info['key']
+            # Create a meaningful filename
+            if key.startswith('securecodebox/securecodebox/'):
+                clean_key = key.replace('securecodebox/securecodebox/', '')
+            else:
+                clean_key = key
+            records.append({
+                "name": clean_key.replace('/', '_').replace(':', '_'),
+                "path": f"minio://{key}",
+                "size": file_info['size'],
+                "full_path": key,
+                "source": "minio",
+                "scanner_type": file_info['scanner_type'],
+                "last_modified": str(file_info['last_modified']),
+            })
+        return JSONResponse(content={"files": shape(records, query), "next_cursor": next_cursor,
+                                     "results_dir": "minio://securecodebox/securecodebox"})
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
+        print(f"[LIST-RESULTS] Error accessing MinIO: {e}")
         return JSONResponse(
-            content={"error": f"Failed to list files: {str(e)}"}, 
-            status_code=500
+            content={"error": f"Cannot connect to MinIO at {MINIO_ENDPOINT}. Please ensure MinIO is running and port-forwarded. Error: {str(e)}"}, 
+            status_code=503
         )
 
 @app.get("/download-file/{filename:path}")
-def download_file(filename: str):
+def download_file(filename: str, request: Request):
     """Download a specific file from MinIO only"""
     
     # All files should be MinIO files
@@ -650,33 +667,16 @@ def download_file(filename: str):
     
     minio_key = filename.replace('minio://', '')
     try:
-        import boto3
-        import tempfile
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Get the original filename
-            original_filename = os.path.basename(minio_key)
-            if original_filename == 'findings.json':
-                # Try to get a more descriptive name from the path
-                path_parts = minio_key.split('/')
-                if len(path_parts) > 2:
-                    scan_type = path_parts[-2]  # e.g., scan-56073cce-a9c6-480f-bd3a-aaa271a2f87e
-                    original_filename = f"{scan_type}-findings.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=original_filename,
-                media_type='application/octet-stream'
-            )
+        # Get the original filename
+        original_filename = os.path.basename(minio_key)
+        if original_filename == 'findings.json':
+            # Try to get a more descriptive name from the path
+            path_parts = minio_key.split('/')
+            if len(path_parts) > 2:
+                scan_type = path_parts[-2]  # e.g., scan-56073cce-a9c6-480f-bd3a-aaa271a2f87e
+                original_filename = f"{scan_type}-findings.json"
+        
+        return stream_object(minio_key, original_filename, request_headers=request.headers)
     except Exception as e:
         return JSONResponse(
             content={"error": f"Failed to download MinIO file: {str(e)}"}, 
@@ -684,45 +684,20 @@ def download_file(filename: str):
         )
 
 @app.get("/download-naabu")
-def download_naabu():
+async def download_naabu(request: Request):
     """Download Naabu results from MinIO"""
     try:
-        import boto3
-        import tempfile
-        import requests
-        
-        # First check if MinIO is accessible
-        try:
-            health_check = requests.get(f"{MINIO_ENDPOINT}/minio/health/ready", timeout=5)
-            if health_check.status_code != 200:
-                return JSONResponse(
-                    content={"error": f"MinIO is not healthy. Status: {health_check.status_code}. Please ensure MinIO is running and port-forwarded to localhost:9000"}, 
-                    status_code=503
-                )
-        except requests.exceptions.RequestException as e:
-            return JSONResponse(
-                content={"error": f"Cannot connect to MinIO at {MINIO_ENDPOINT}. Please ensure MinIO is running and port-forwarded. Error: {str(e)}"}, 
-                status_code=503
-            )
-        
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
+        # MinIO availability is checked by refuse_while_minio_down; a half-open trial must reach MinIO
         # Find naabu findings files (cascading script creates scan-specific folders with findings.json)
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
         naabu_files = []
         
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                # Look for findings.json files in scan folders (Naabu scans create scan-{uid} folders)
-                if key.endswith('findings.json') and 'scan-' in key:
-                    naabu_files.append((key, obj['LastModified']))
-                    print(f"[DOWNLOAD-NAABU] Found file: {key}")
+        await fresh_object_index()
+        for file_info in object_index.files_by_key():
+            key = file_info['key']
+            # Look for findings.json files in scan folders (Naabu scans create scan-{uid} folders)
+            if key.endswith('findings.json') and 'scan-' in key:
+                naabu_files.append((key, file_info['last_modified']))
+                print(f"[DOWNLOAD-NAABU] Found file: {key}")
         
         if not naabu_files:
             print("[DOWNLOAD-NAABU] No naabu files found in MinIO")
@@ -736,18 +711,10 @@ def download_naabu():
         minio_key = latest_file[0]
         print(f"[DOWNLOAD-NAABU] Downloading: {minio_key}")
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Create a nice filename
-            filename = f"naabu-results-{int(time.time())}.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=filename,
-                media_type='application/json'
-            )
+        # Create a nice filename
+        filename = f"naabu-results-{int(time.time())}.json"
+        
+        return await minio_async.stream_object(minio_key, filename, media_type='application/json', request_headers=request.headers)
     except Exception as e:
         print(f"[DOWNLOAD-NAABU] Error: {e}")
         return JSONResponse(
@@ -756,31 +723,21 @@ def download_naabu():
         )
 
 @app.get("/download-tlsx")
-def download_tlsx():
+async def download_tlsx(request: Request):
     """Download TLSX results from MinIO"""
     try:
-        import boto3
-        import tempfile
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
         # Find TLSX findings files (script uploads to scan-specific folders)
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
         tlsx_files = []
         
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                # Look for findings.json files in scan folders (TLSX scans create scan-{uid} folders)
-                if key.endswith('findings.json') and 'scan-' in key:
-                    # The script uploads TLSX results to scan-specific folders
-                    # We need to find the most recent scan folder with findings.json
-                    tlsx_files.append((key, obj['LastModified']))
-                    print(f"[DOWNLOAD-TLSX] Found file: {key}")
+        await fresh_object_index()
+        for file_info in object_index.files_by_key():
+            key = file_info['key']
+            # Look for findings.json files in scan folders (TLSX scans create scan-{uid} folders)
+            if key.endswith('findings.json') and 'scan-' in key:
+                # The script uploads TLSX results to scan-specific folders
+                # We need to find the most recent scan folder with findings.json
+                tlsx_files.append((key, file_info['last_modified']))
+                print(f"[DOWNLOAD-TLSX] Found file: {key}")
         
         if not tlsx_files:
             print("[DOWNLOAD-TLSX] No TLSX files found in MinIO")
@@ -794,18 +751,10 @@ def download_tlsx():
         minio_key = latest_file[0]
         print(f"[DOWNLOAD-TLSX] Downloading: {minio_key}")
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Create a nice filename
-            filename = f"tlsx-results-{int(time.time())}.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=filename,
-                media_type='application/json'
-            )
+        # Create a nice filename
+        filename = f"tlsx-results-{int(time.time())}.json"
+        
+        return await minio_async.stream_object(minio_key, filename, media_type='application/json', request_headers=request.headers)
     except Exception as e:
         print(f"[DOWNLOAD-TLSX] Error: {e}")
         return JSONResponse(
@@ -814,30 +763,20 @@ def download_tlsx():
         )
 
 @app.get("/download-zap")
-def download_zap():
+async def download_zap(request: Request):
     """Download ZAP results from MinIO"""
     try:
-        import boto3
-        import tempfile
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
         # Find ZAP findings files (ZAP scans also create scan-specific folders)
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
         zap_files = []
         
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                # Look for findings.json files in scan folders
-                if key.endswith('findings.json') and 'scan-' in key:
-                    # ZAP scans create scan-{uid} folders with findings.json
-                    zap_files.append((key, obj['LastModified']))
-                    print(f"[DOWNLOAD-ZAP] Found file: {key}")
+        await fresh_object_index()
+        for file_info in object_index.files_by_key():
+            key = file_info['key']
+            # Look for findings.json files in scan folders
+            if key.endswith('findings.json') and 'scan-' in key:
+                # ZAP scans create scan-{uid} folders with findings.json
+                zap_files.append((key, file_info['last_modified']))
+                print(f"[DOWNLOAD-ZAP] Found file: {key}")
         
         if not zap_files:
             print("[DOWNLOAD-ZAP] No ZAP files found in MinIO")
@@ -851,18 +790,10 @@ def download_zap():
         minio_key = latest_file[0]
         print(f"[DOWNLOAD-ZAP] Downloading: {minio_key}")
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Create a nice filename
-            filename = f"zap-results-{int(time.time())}.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=filename,
-                media_type='application/json'
-            )
+        # Create a nice filename
+        filename = f"zap-results-{int(time.time())}.json"
+        
+        return await minio_async.stream_object(minio_key, filename, media_type='application/json', request_headers=request.headers)
     except Exception as e:
         print(f"[DOWNLOAD-ZAP] Error: {e}")
         return JSONResponse(
@@ -871,30 +802,13 @@ def download_zap():
         )
 
 @app.get("/download-nuclei")
-def download_nuclei():
-    """Download Nuclei results from MinIO"""
+async def download_nuclei(request: Request, format: str = "json"):
+    """Download Nuclei results from MinIO (format=ndjson returns the raw JSONL)"""
     try:
-        import boto3
-        import tempfile
-        import json
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
         # Find Nuclei results files (look for nuclei-results.jsonl in scan folders)
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
-        nuclei_files = []
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                # Look for nuclei-results.jsonl files in scan folders (this is what the working script creates)
-                if key.endswith('nuclei-results.jsonl') and 'scan-' in key:
-                    nuclei_files.append((key, obj['LastModified']))
-                    print(f"[DOWNLOAD-NUCLEI] Found file: {key}")
+        await fresh_object_index()
+        nuclei_files = [f for f in (object_index.files_for_scanner('nuclei') or [])
+                        if f['key'].endswith('nuclei-results.jsonl') and 'scan-' in f['key']]
         
         if not nuclei_files:
             print("[DOWNLOAD-NUCLEI] No Nuclei results found in MinIO")
@@ -903,58 +817,25 @@ def download_nuclei():
                 status_code=404
             )
         
-        # Get the most recent file
-        latest_file = max(nuclei_files, key=lambda x: x[1])
-        minio_key = latest_file[0]
+        # Index entries are sorted newest first
+        minio_key = nuclei_files[0]['key']
         print(f"[DOWNLOAD-NUCLEI] Downloading: {minio_key}")
         
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tmp') as tmp_file:
-            s3.download_file(MINIO_BUCKET, minio_key, tmp_file.name)
-            
-            # Convert JSONL to JSON array format for better readability
-            try:
-                nuclei_results = []
-                with open(tmp_file.name, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                nuclei_results.append(json.loads(line))
-                            except json.JSONDecodeError:
-                                continue
-                
-                # Create a structured result
-                structured_result = {
-                    "scan_info": {
-                        "scanner": "nuclei",
-                        "target": "IP address",
-                        "status": "completed",
-                        "findings_count": len(nuclei_results),
-                        "message": f"Found {len(nuclei_results)} vulnerabilities" if nuclei_results else "No vulnerabilities found"
-                    },
-                    "findings": nuclei_results
-                }
-                
-                # Write the structured result back to the temp file
-                with open(tmp_file.name, 'w') as f:
-                    json.dump(structured_result, f, indent=2)
-                
-                print(f"[DOWNLOAD-NUCLEI] Processed {len(nuclei_results)} findings")
-                
-            except Exception as e:
-                print(f"[DOWNLOAD-NUCLEI] Error processing file content: {e}")
-                # If processing fails, return the raw file
-                pass
-            
-            # Create a nice filename
-            filename = f"nuclei-results-{int(time.time())}.json"
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=filename,
-                media_type='application/json'
-            )
+        if format == "ndjson":
+            # Pass the JSONL through untouched for clients that can consume it
+            filename = f"nuclei-results-{int(time.time())}.jsonl"
+            return await minio_async.stream_object(minio_key, filename, media_type='application/x-ndjson',
+                                                   request_headers=request.headers)
+        
+        # Convert JSONL to the JSON envelope while streaming, one finding at a time
+        s3 = await minio_async.get_async_s3_client()
+        obj = await s3.get_object(Bucket=MINIO_BUCKET, Key=minio_key)
+        filename = f"nuclei-results-{int(time.time())}.json"
+        return StreamingResponse(
+            stream_nuclei_envelope(obj['Body']),
+            media_type='application/json',
+            headers={'Content-Disposition': content_disposition(filename)}
+        )
     except Exception as e:
         print(f"[DOWNLOAD-NUCLEI] Error: {e}")
         return JSONResponse(
@@ -962,6 +843,30 @@ def download_nuclei():
             status_code=500
         )
 
+@app.get("/download-delta/{scanner_type}")
+def download_delta(scanner_type: str, target: str = None, scan: str = None, include_recurring: bool = False):
+    """Download what changed in a scanner's latest scan (or `scan`, an object key or scan folder)
+    compared with the previous scan of the same target: new and resolved findings"""
+    if scanner_type not in SCANNER_TYPES:
+        return JSONResponse(content={"error": f"Unknown scanner type: {scanner_type}"}, status_code=400)
+    try:
+        findings_store.ensure_recent(wait=True)
+        delta = findings_store.delta(scanner_type, target=target, scan=scan, include_recurring=include_recurring)
+        if delta is None:
+            return JSONResponse(
+                content={"error": f"No ingested {scanner_type} scans found" + (f" for {target or scan}" if target or scan else "")},
+                status_code=404
+            )
+        print(f"[DOWNLOAD-DELTA] {delta['scan']['key']} vs {delta['previous_scan']}: {delta['summary']}")
+        filename = f"{scanner_type}-delta-{int(time.time())}.json"
+        return JSONResponse(content=delta, headers={'Content-Disposition': content_disposition(filename)})
+    except Exception as e:
+        print(f"[DOWNLOAD-DELTA] Error: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to build {scanner_type} delta: {str(e)}"},
+            status_code=500
+        )
+
 # Add new comprehensive file discovery and download endpoints
 
 @app.get("/discover-files")
@@ -991,10 +896,41 @@ def discover_files():
             status_code=500
         )
 
+@app.get("/object-index")
+def object_index_status():
+    """Show the state of the in-memory MinIO object index"""
+    return object_index.stats()
+
+@app.post("/object-index/invalidate")
+def invalidate_object_index(full: bool = False):
+    """Force the object index to re-list the bucket (full=true rebuilds from scratch)"""
+    try:
+        if full:
+            object_index.clear()
+        else:
+            object_index.invalidate()
+        object_index.refresh()
+        return {"status": "refreshed", "index": object_index.stats()}
+    except Exception as e:
+        return JSONResponse(
+            content={"error": f"Failed to refresh object index: {str(e)}"}, 
+            status_code=500
+        )
+
+@app.post("/minio-events")
+def minio_events(payload: dict = Body(...)):
+    """Webhook target for MinIO bucket notifications (keeps the object index current)"""
+    records = payload.get('Records', [])
+    applied = sum(1 for record in records if object_index.apply_event(record))
+    if applied:
+        findings_store.ingest_in_background()
+    return {"status": "ok", "records": len(records), "applied": applied}
+
 @app.get("/download-scanner/{scanner_type}")
-def download_scanner_latest(scanner_type: str, file_type: str = None):
+async def download_scanner_latest(scanner_type: str, request: Request, file_type: str = None):
     """Download the latest file for a specific scanner with optional file type filter"""
     try:
+        await fresh_object_index()
         file_info = get_latest_scanner_file(scanner_type, file_type)
         
         if not file_info:
@@ -1003,7 +939,9 @@ def download_scanner_latest(scanner_type: str, file_type: str = None):
                 status_code=404
             )
         
-        return download_file_by_key(file_info['key'], f"{scanner_type}-latest")
+        filename = f"{scanner_type}-latest-{int(time.time())}.json"
+        return await minio_async.stream_object(file_info['key'], filename, media_type='application/json',
+                                               request_headers=request.headers)
         
     except Exception as e:
         return JSONResponse(
@@ -1011,26 +949,49 @@ def download_scanner_latest(scanner_type: str, file_type: str = None):
             status_code=500
         )
 
+@app.get("/download-object/{file_id}")
+async def download_object(file_id: str, request: Request):
+    """Download one object by the file_id the listings report, resolved through the object index"""
+    if not object_index.is_fresh():
+        # Only the very first lookup builds the index, later ones never re-list
+        await asyncio.to_thread(object_index.get_by_id, file_id)
+    file_info = object_index.get_by_id(file_id)
+    if file_info is None:
+        return JSONResponse(content={"error": f"Unknown file id: {file_id}"}, status_code=404)
+    key = file_info['key']
+    try:
+        filename = key.split('/')[-1]
+        media_type = DOWNLOAD_MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), 'application/octet-stream')
+        return await minio_async.stream_object(key, filename, media_type=media_type, request_headers=request.headers)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'NotFound'):
+            # Deleted since the index last saw it
+            object_index.invalidate()
+            return JSONResponse(content={"error": f"{key} no longer exists"}, status_code=404)
+        return JSONResponse(content={"error": f"Failed to download {key}: {str(e)}"}, status_code=500)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Failed to download {key}: {str(e)}"}, status_code=500)
+
 @app.get("/download-scanner-file/{scanner_type}/{file_index}")
-def download_scanner_file_by_index(scanner_type: str, file_index: int):
-    """Download a specific file by index for a scanner"""
+def download_scanner_file_by_index(scanner_type: str, file_index: int, request: Request):
+    """Download a specific file by index for a scanner (positional, prefer /download-object/{file_id})"""
     try:
-        scanner_files = discover_scanner_files()
+        files = object_index.files_for_scanner(scanner_type)
         
-        if scanner_type not in scanner_files['scanner_files'] or not scanner_files['scanner_files'][scanner_type]:
+        if not files:
             return JSONResponse(
                 content={"error": f"No {scanner_type} files found"}, 
                 status_code=404
             )
         
-        if file_index >= len(scanner_files['scanner_files'][scanner_type]):
+        if file_index >= len(files):
             return JSONResponse(
-                content={"error": f"File index {file_index} out of range. Available files: {len(scanner_files['scanner_files'][scanner_type])}"}, 
+                content={"error": f"File index {file_index} out of range. Available files: {len(files)}"}, 
                 status_code=400
             )
         
-        file_info = scanner_files['scanner_files'][scanner_type][file_index]
-        return download_file_by_key(file_info['key'], f"{scanner_type}-file-{file_index}")
+        file_info = files[file_index]
+        return download_file_by_key(file_info['key'], f"{scanner_type}-file-{file_index}", request.headers)
         
     except Exception as e:
         return JSONResponse(
@@ -1039,39 +1000,38 @@ def download_scanner_file_by_index(scanner_type: str, file_index: int):
         )
 
 @app.get("/list-scanner-files/{scanner_type}")
-def list_scanner_files(scanner_type: str):
-    """List all available files for a specific scanner"""
+async def list_scanner_files(scanner_type: str, limit: int = None, cursor: str = None, prefix: str = None,
+                       since: str = None, until: str = None, fields: str = None, compact: bool = False):
+    """List the files of one scanner, newest first, one page at a time (see next_cursor)"""
     try:
-        scanner_files = discover_scanner_files()
+        query = ListingQuery(limit, cursor, prefix, since, until, None, fields, compact,
+                             all_fields=FILE_FIELDS, default_fields=SCANNER_FILE_DEFAULT_FIELDS)
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    try:
+        await fresh_object_index()
+        files = object_index.files_for_scanner(scanner_type)
         
-        if scanner_type not in scanner_files['scanner_files']:
+        if files is None:
             return JSONResponse(
                 content={"error": f"Unknown scanner type: {scanner_type}"}, 
                 status_code=400
             )
         
-        files = scanner_files['scanner_files'][scanner_type]
-        
-        # Format file information for display
-        formatted_files = []
-        for i, file_info in enumerate(files):
-            formatted_files.append({
-                "index": i,
-                "filename": file_info['key'].split('/')[-1],
-                "full_path": file_info['key'],
-                "size_bytes": file_info['size'],
-                "size_human": f"{file_info['size'] / 1024:.1f} KB" if file_info['size'] < 1024*1024 else f"{file_info['size'] / (1024*1024):.1f} MB",
-                "file_type": file_info['file_type'],
-                "last_modified": str(file_info['last_modified']),
-                "download_url": f"/download-scanner-file/{scanner_type}/{i}"
-            })
+        # Indexes are positions in the whole list, as /download-scanner-file expects
+        rows, next_cursor = page_newest_first(files, query)
+        records = [file_row(i, file_info) for i, file_info in rows]
         
         return {
             "scanner": scanner_type,
             "total_files": len(files),
-            "files": formatted_files
+            "returned": len(records),
+            "next_cursor": next_cursor,
+            "files": shape(records, query)
         }
         
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse(
             content={"error": f"Failed to list {scanner_type} files: {str(e)}"}, 
@@ -1079,49 +1039,48 @@ def list_scanner_files(scanner_type: str):
         )
 
 @app.get("/list-scan-folders")
-def list_scan_folders():
-    """List all available scan folders with their contents"""
+async def list_scan_folders(limit: int = None, cursor: str = None, prefix: str = None, since: str = None,
+                      until: str = None, scanner: str = None, fields: str = None, compact: bool = False):
+    """List scan folders, newest first, one page at a time (see next_cursor).
+
+    Folder files are only included with fields=...,files; scanner keeps
+    folders holding files of any of the given scanners.
+    """
     try:
-        scanner_files = discover_scanner_files()
-        scan_folders = scanner_files['scan_folders']
-        
-        # Format folder information for display
-        formatted_folders = []
-        for folder_name, files in scan_folders.items():
-            # Group files by scanner type within the folder
-            folder_scanners = {}
-            for file_info in files:
-                scanner_type = 'unknown'
-                if 'naabu' in file_info['key'].lower():
-                    scanner_type = 'naabu'
-                elif 'tlsx' in file_info['key'].lower() or file_info['key'].endswith('findings.json'):
-                    scanner_type = 'tlsx'
-                elif 'zap' in file_info['key'].lower() or file_info['key'].endswith('.html'):
-                    scanner_type = 'zap'
-                elif 'nuclei' in file_info['key'].lower() or file_info['key'].endswith('.jsonl'):
-                    scanner_type = 'nuclei'
-                
-                if scanner_type not in folder_scanners:
-                    folder_scanners[scanner_type] = []
-                folder_scanners[scanner_type].append(file_info)
-            
-            formatted_folders.append({
-                "folder_name": folder_name,
-                "total_files": len(files),
-                "scanners": list(folder_scanners.keys()),
-                "files": files,
-                "scanner_files": folder_scanners,
-                "latest_modified": max(f['last_modified'] for f in files) if files else None
-            })
-        
-        # Sort folders by latest modification time (newest first)
-        formatted_folders.sort(key=lambda x: x['latest_modified'], reverse=True)
+        query = ListingQuery(limit, cursor, prefix, since, until, scanner, fields, compact,
+                             all_fields=FOLDER_FIELDS, default_fields=FOLDER_DEFAULT_FIELDS)
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    try:
+        await fresh_object_index()
+        summaries = object_index.folder_summaries()
+        
+        def matches(summary):
+            return ((query.prefix is None or summary['folder_name'].startswith(query.prefix))
+                    and (query.scanners is None or not query.scanners.isdisjoint(summary['scanner_counts'])))
+        
+        rows, next_cursor = paginate(
+            summaries, folder_position, query, match=matches, descending=True,
+            floor=(query.until, _LAST_KEY) if query.until is not None else None,
+            stop=(lambda summary: folder_position(summary)[0] < query.since) if query.since is not None else None)
+        
+        records = []
+        for _, summary in rows:
+            record = dict(summary)
+            if "files" in query.fields:
+                record["files"] = [file_row(i, file_info)
+                                   for i, file_info in enumerate(object_index.files_in_folder(summary['folder_name']) or [])]
+            records.append(record)
         
         return {
-            "total_folders": len(formatted_folders),
-            "folders": formatted_folders
+            "total_folders": len(summaries),
+            "returned": len(records),
+            "next_cursor": next_cursor,
+            "folders": shape(records, query)
         }
         
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse(
             content={"error": f"Failed to list scan folders: {str(e)}"}, 
@@ -1129,44 +1088,32 @@ def list_scan_folders():
         )
 
 @app.get("/list-folder-contents/{folder_name}")
-def list_folder_contents(folder_name: str):
+async def list_folder_contents(folder_name: str):
     """List all files in a specific scan folder"""
     try:
-        scanner_files = discover_scanner_files()
-        scan_folders = scanner_files['scan_folders']
+        await fresh_object_index()
+        files = object_index.files_in_folder(folder_name)
         
-        if folder_name not in scan_folders:
+        if files is None:
             return JSONResponse(
                 content={"error": f"Folder {folder_name} not found"}, 
                 status_code=404
             )
         
-        files = scan_folders[folder_name]
-        
         # Format file information for display
         formatted_files = []
         for i, file_info in enumerate(files):
-            # Determine scanner type
-            scanner_type = 'unknown'
-            if 'naabu' in file_info['key'].lower():
-                scanner_type = 'naabu'
-            elif 'tlsx' in file_info['key'].lower() or file_info['key'].endswith('findings.json'):
-                scanner_type = 'tlsx'
-            elif 'zap' in file_info['key'].lower() or file_info['key'].endswith('.html'):
-                scanner_type = 'zap'
-            elif 'nuclei' in file_info['key'].lower() or file_info['key'].endswith('.jsonl'):
-                scanner_type = 'nuclei'
-            
             formatted_files.append({
+                "file_id": file_info['file_id'],
                 "index": i,
                 "filename": file_info['key'].split('/')[-1],
                 "full_path": file_info['key'],
-                "scanner_type": scanner_type,
+                "scanner_type": file_info['scanner_type'],
                 "size_bytes": file_info['size'],
-                "size_human": f"{file_info['size'] / 1024:.1f} KB" if file_info['size'] < 1024*1024 else f"{file_info['size'] / (1024*1024):.1f} MB",
+                "size_human": size_human(file_info['size']),
                 "file_type": file_info['file_type'],
                 "last_modified": str(file_info['last_modified']),
-                "download_url": f"/download-folder-file/{folder_name}/{i}"
+                "download_url": f"/download-object/{file_info['file_id']}"
             })
         
         return {
@@ -1182,20 +1129,17 @@ def list_folder_contents(folder_name: str):
         )
 
 @app.get("/download-folder-file/{folder_name}/{file_index}")
-def download_folder_file(folder_name: str, file_index: int):
-    """Download a specific file from a scan folder"""
+def download_folder_file(folder_name: str, file_index: int, request: Request):
+    """Download a specific file from a scan folder (positional, prefer /download-object/{file_id})"""
     try:
-        scanner_files = discover_scanner_files()
-        scan_folders = scanner_files['scan_folders']
+        files = object_index.files_in_folder(folder_name)
         
-        if folder_name not in scan_folders:
+        if files is None:
             return JSONResponse(
                 content={"error": f"Folder {folder_name} not found"}, 
                 status_code=404
             )
         
-        files = scan_folders[folder_name]
-        
         if file_index >= len(files):
             return JSONResponse(
                 content={"error": f"File index {file_index} out of range. Available files: {len(files)}"}, 
@@ -1205,7 +1149,7 @@ def download_folder_file(folder_name: str, file_index: int):
         file_info = files[file_index]
         filename = file_info['key'].split('/')[-1]
         
-        return download_file_by_key(file_info['key'], f"{folder_name}-{filename}")
+        return download_file_by_key(file_info['key'], f"{folder_name}-{filename}", request.headers)
         
     except Exception as e:
         return JSONResponse(
@@ -1214,53 +1158,24 @@ def download_folder_file(folder_name: str, file_index: int):
         )
 
 @app.get("/download-folder/{folder_name}")
-def download_folder_zip(folder_name: str):
-    """Download all files from a scan folder as a ZIP archive"""
+async def download_folder_zip(folder_name: str):
+    """Download all files from a scan folder as a streamed ZIP archive"""
     try:
-        import zipfile
-        import tempfile
-        import boto3
+        await fresh_object_index()
+        files = object_index.files_in_folder(folder_name)
         
-        scanner_files = discover_scanner_files()
-        scan_folders = scanner_files['scan_folders']
-        
-        if folder_name not in scan_folders:
+        if files is None:
             return JSONResponse(
                 content={"error": f"Folder {folder_name} not found"}, 
                 status_code=404
             )
         
-        files = scan_folders[folder_name]
-        
-        # Create a temporary ZIP file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-            with zipfile.ZipFile(tmp_zip.name, 'w') as zip_file:
-                s3 = boto3.client(
-                    's3',
-                    endpoint_url=MINIO_ENDPOINT,
-                    aws_access_key_id=MINIO_ACCESS_KEY,
-                    aws_secret_access_key=MINIO_SECRET_KEY,
-                )
-                
-                for file_info in files:
-                    # Download file from MinIO
-                    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                        s3.download_file(MINIO_BUCKET, file_info['key'], tmp_file.name)
-                        
-                        # Add to ZIP with original filename
-                        filename = file_info['key'].split('/')[-1]
-                        zip_file.write(tmp_file.name, filename)
-                        
-                        # Clean up temp file
-                        import os
-                        os.unlink(tmp_file.name)
-            
-            # Return the ZIP file
-            return FileResponse(
-                tmp_zip.name,
-                filename=f"{folder_name}-results.zip",
-                media_type='application/zip'
-            )
+        # Build the archive while it is being sent: no temp files, flat memory
+        return StreamingResponse(
+            stream_zip(files, strip_prefix=f"{folder_name}/"),
+            media_type='application/zip',
+            headers={'Content-Disposition': content_disposition(f"{folder_name}-results.zip")}
+        )
         
     except Exception as e:
         return JSONResponse(
@@ -1271,26 +1186,17 @@ def download_folder_zip(folder_name: str):
 
 
 @app.get("/debug")
-def debug():
-    # Get MinIO files for debugging
-    minio_files = []
+def debug(limit: int = None, cursor: str = None, prefix: str = None, since: str = None, until: str = None,
+          scanner: str = None, fields: str = None, compact: bool = False):
+    # MinIO files for debugging, one page in key order (see minio_files_next_cursor)
+    minio_files, next_cursor = [], None
     try:
-        import boto3
-        s3 = boto3.client(
-            's3',
-            endpoint_url=MINIO_ENDPOINT,
-            aws_access_key_id=MINIO_ACCESS_KEY,
-            aws_secret_access_key=MINIO_SECRET_KEY,
-        )
-        
-        response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                minio_files.append({
-                    "key": obj['Key'],
-                    "size": obj['Size'],
-                    "last_modified": str(obj['LastModified'])
-                })
+        query = ListingQuery(limit, cursor, prefix, since, until, scanner, fields, compact,
+                             all_fields=OBJECT_FIELDS, default_fields=OBJECT_DEFAULT_FIELDS)
+        rows, next_cursor = page_by_key(object_index.files_by_key(), query)
+        minio_files = shape([object_row(file_info) for _, file_info in rows], query)
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
         minio_files = [{"error": str(e)}]
     
@@ -1300,68 +1206,67 @@ def debug():
         "MINIO_SECRET_KEY": MINIO_SECRET_KEY,
         "MINIO_BUCKET": MINIO_BUCKET,
         "K8S_NAMESPACE": NAMESPACE,
-        "current_scan_name": current_scan_name,
-        "current_target": current_target,
-        "current_results_dir": current_results_dir,
-        "scan_in_progress_locked": scan_in_progress.locked(),
-        "current_process_pid": current_process.pid if current_process else None,
-        "current_process_returncode": current_process.poll() if current_process else None,
-        "output_queue_size": output_queue.qsize(),
-        "output_thread_alive": output_thread.is_alive() if output_thread else False,
-        "minio_files": minio_files
+        "scan_registry": scan_registry.stats(),
+        "sse_hub": sse_hub.stats(),
+        "scans": [r.to_dict() for r in scan_registry.list()],
+        "minio_client": minio_client_health(),
+        "kube_client": kube_client_health(),
+        "scan_watcher": scan_watcher.status(),
+        "stage_durations": stage_history.snapshot(),
+        "findings_store": findings_store.stats(),
+        "cascade_cache": cascade_cache.stats(),
+        "batch_scheduler": batch_scheduler.stats(),
+        "state_journal": state_journal.stats(),
+        "minio_health": minio_health_monitor.status(),
+        "minio_files": minio_files,
+        "minio_files_next_cursor": next_cursor
     } 
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus exposition of MinIO/Kubernetes/HTTP latency, stage durations, queue and SSE gauges"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/minio-health")
-def minio_health():
-    import requests
-    try:
-        resp = requests.get(f"{MINIO_ENDPOINT}/minio/health/ready", timeout=3)
-        if resp.status_code == 200:
-            return {"minio": "ok", "endpoint": MINIO_ENDPOINT}
-        else:
-            return {"minio": "unhealthy", "status_code": resp.status_code, "endpoint": MINIO_ENDPOINT}
-    except Exception as e:
-        return {"minio": "unreachable", "error": str(e), "endpoint": MINIO_ENDPOINT}
+async def minio_health(refresh: bool = False):
+    """Last background probe of MinIO and the circuit breaker state (refresh=true probes now)"""
+    health = await minio_health_monitor.probe() if refresh else minio_health_monitor.status()
+    minio = {"healthy": "ok", "reachable": "ok"}.get(health["status"], health["status"])
+    return {"minio": minio, "endpoint": MINIO_ENDPOINT, "health": health, "client": minio_client_health()}
 
 @app.get("/check-minio")
-def check_minio():
-    """Check MinIO connectivity and list available files"""
+async def check_minio(limit: int = None, cursor: str = None, prefix: str = None, since: str = None, until: str = None,
+                scanner: str = None, fields: str = None, compact: bool = False):
+    """Check MinIO connectivity and list available files, one page in key order (see next_cursor)"""
     try:
-        import boto3
-        import requests
-        
-        # Check MinIO health
-        try:
-            health_check = requests.get(f"{MINIO_ENDPOINT}/minio/health/ready", timeout=5)
-            health_status = "healthy" if health_check.status_code == 200 else f"unhealthy (status: {health_check.status_code})"
-        except requests.exceptions.RequestException as e:
-            health_status = f"unreachable: {str(e)}"
+        query = ListingQuery(limit, cursor, prefix, since, until, scanner, fields, compact,
+                             all_fields=OBJECT_FIELDS, default_fields=OBJECT_DEFAULT_FIELDS)
+    except InvalidListing as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    try:
+        # MinIO health from the last background probe
+        health = minio_health_monitor.status()
+        if health["error"] is not None:
+            health_status = f"unreachable: {health['error']}"
+        elif health["http_status"] is None:
+            health_status = "unknown (not probed yet)"
+        else:
+            health_status = "healthy" if health["http_status"] == 200 else f"unhealthy (status: {health['http_status']})"
         
         # Try to list files
         try:
-            s3 = boto3.client(
-                's3',
-                endpoint_url=MINIO_ENDPOINT,
-                aws_access_key_id=MINIO_ACCESS_KEY,
-                aws_secret_access_key=MINIO_SECRET_KEY,
-            )
-            
-            response = s3.list_objects_v2(Bucket=MINIO_BUCKET)
-            files = []
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    files.append({
-                        "key": obj['Key'],
-                        "size": obj['Size'],
-                        "last_modified": str(obj['LastModified'])
-                    })
+            await fresh_object_index()
+            objects = object_index.files_by_key()
+            rows, next_cursor = page_by_key(objects, query)
             
             return {
                 "minio_endpoint": MINIO_ENDPOINT,
                 "health_status": health_status,
                 "bucket": MINIO_BUCKET,
-                "files_found": len(files),
-                "files": files
+                "files_found": len(objects),
+                "next_cursor": next_cursor,
+                "files": shape([object_row(file_info) for _, file_info in rows], query)
             }
         except Exception as e:
             return {
@@ -1384,211 +1289,31 @@ def check_minio():
 # Add new cascading scanner routes after the existing routes
 
 @app.get("/cascading")
-def cascading_index(request: Request):
+def cascading_index(request: Request, scan_id: str = None):
     """Cascading scanner tab - separate from main scanner"""
-    global current_scan_name, current_target, current_results_dir
-    
-    # Always set scan_in_progress to False unless a scan is running
-    in_progress = scan_in_progress.locked() and current_scan_name is not None
-    
-    # If there's no active scan but we have old state, clear it
-    if not in_progress and (current_scan_name is not None or current_target is not None):
-        print("Clearing stale scan state on cascading page load")
-        current_scan_name = None
-        current_target = None
-        current_results_dir = None
-    
-    return templates.TemplateResponse("cascading.html", {
-        "request": request, 
-        "scan_in_progress": in_progress, 
-        "scan_name": current_scan_name, 
-        "target": current_target,
-        "results_dir": current_results_dir
-    })
+    return render_scan_page("cascading.html", request, scan_registry.get(scan_id) if scan_id else None)
 
 @app.post("/cascading-scan")
-def cascading_scan(request: Request, target: str = Form(...)):
+async def cascading_scan(request: Request, target: str = Form(...), incremental: str = Form(None)):
     """Start a cascading scan using the existing GUI logic"""
-    global current_scan_name, current_target, current_results_dir, output_queue, output_thread, current_process, zap_done
-    if scan_in_progress.locked() or (current_process is not None and current_process.poll() is None):
-        return templates.TemplateResponse("cascading.html", {
-            "request": request, 
-            "error": "Scan in progress. Please wait for current scan to complete or use 'Clear Scan State' to reset.", 
-            "scan_in_progress": True, 
-            "scan_name": current_scan_name, 
-            "target": current_target,
-            "results_dir": current_results_dir
-        })
-    acquired = scan_in_progress.acquire(blocking=False)
-    if not acquired:
-        return templates.TemplateResponse("cascading.html", {
-            "request": request, 
-            "error": "Could not acquire scan lock. Please try again.", 
-            "scan_in_progress": True, 
-            "scan_name": current_scan_name, 
-            "target": current_target,
-            "results_dir": current_results_dir
-        })
-    scan_name = f"cascading-scan-{int(time.time())}"
-    current_scan_name = scan_name
-    current_target = target
-    current_results_dir = None
-    zap_done = False
-    clear_output_queue()
-    try:
-        # Use the cascading script that runs Naabu -> TLSX -> ZAP -> Nuclei
-        script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'run_cascading_manual.sh'))
-        current_process = subprocess.Popen(
-            ["bash", script_path, target], 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True,
-            cwd=os.path.dirname(script_path)
-        )
-        def read_output():
-            global current_results_dir, zap_done
-            try:
-                while True:
-                    output = current_process.stdout.readline()
-                    if output == '' and current_process.poll() is not None:
-                        break
-                    if output:
-                        line = output.strip()
-                        print(f"CASCADING SCRIPT OUTPUT: {line}")
-                        output_queue.put(line)
-                        # Detect cascading scan completion
-                        if 'CASCADING SCAN WORKFLOW COMPLETE' in line or 'All scans completed successfully' in line:
-                            zap_done = True
-                            print("Cascading scan completed! Download available.")
-                        if "nuclei-results.jsonl" in line:
-                            print("Nuclei results file found!")
-                        if "findings.json" in line:
-                            print("Findings file found!")
-            except Exception as e:
-                print(f"Error in output reading thread: {e}")
-            finally:
-                print("Output reading thread finished")
-                if scan_in_progress.locked():
-                    scan_in_progress.release()
-                current_scan_name = None
-                current_target = None
-        output_thread = threading.Thread(target=read_output, daemon=True)
-        output_thread.start()
-        return templates.TemplateResponse("cascading.html", {
-            "request": request, 
-            "scan_in_progress": True, 
-            "scan_name": scan_name, 
-            "target": target,
-            "results_dir": None,
-            "script_stdout": f"Starting cascading scan (Naabu → TLSX → ZAP → Nuclei) for {target}...\nCheck the output below for real-time progress.",
-            "script_stderr": ""
-        })
-    except Exception as e:
-        if scan_in_progress.locked():
-            scan_in_progress.release()
-        current_scan_name = None
-        current_target = None
-        current_process = None
-        output_thread = None
-        zap_done = False
-        return templates.TemplateResponse("cascading.html", {
-            "request": request, 
-            "error": str(e), 
-            "scan_in_progress": False, 
-            "scan_name": scan_name, 
-            "target": target,
-            "results_dir": None
-        })
+    return await start_scan_page("cascading.html", request, target, {"incremental": bool(incremental)})
 
 @app.get("/cascading-clear-scan")
-def cascading_clear_scan():
+async def cascading_clear_scan(scan_id: str = None):
     """Clear scan state for cascading scanner"""
-    global current_scan_name, current_target, current_results_dir, output_queue, current_process, output_thread, zap_done
     print("=== CLEARING CASCADING SCAN STATE ===")
-    
-    # Kill any running process
-    if current_process is not None:
-        try:
-            print(f"Terminating process (PID: {current_process.pid})")
-            current_process.terminate()
-            try:
-                current_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print("Process didn't terminate gracefully, forcing kill")
-                current_process.kill()
-                current_process.wait()
-        except Exception as e:
-            print(f"Error terminating process: {e}")
-        finally:
-            current_process = None
-    join_output_thread()
-    
-    # Release any locks
-    if scan_in_progress.locked():
-        print("Releasing scan lock")
-        scan_in_progress.release()
-    
-    # Clear the output queue
-    clear_output_queue()
-    
-    # Reset all global variables
-    current_scan_name = None
-    current_target = None
-    current_results_dir = None
-    zap_done = False
-    
-    # Clean up any temporary files
-    try:
-        import tempfile
-        import glob
-        import os
-        
-        # Clean up temporary ZIP files
-        temp_dir = tempfile.gettempdir()
-        for temp_file in glob.glob(os.path.join(temp_dir, "*.zip")):
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"Removed temp file: {temp_file}")
-            except Exception as e:
-                print(f"Error removing temp file {temp_file}: {e}")
-                
-        # Clean up temporary scan files
-        for temp_file in glob.glob("/tmp/*-scan-*.yaml"):
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"Removed scan YAML: {temp_file}")
-            except Exception as e:
-                print(f"Error removing scan YAML {temp_file}: {e}")
-                
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
-    
+    record = await clear_scan_state(scan_id)
     print("=== CASCADING SCAN STATE CLEARED ===")
-    return {"status": "cleared", "message": "All cascading scan state cleared and cleaned up"}
+    return {"status": "cleared", "scan_id": record.id if record else None,
+            "message": "Cascading scan cancelled and temporary files cleaned up"}
 
 @app.get("/cascading-reset")
 def cascading_reset():
     """Reset scan state for cascading scanner"""
-    global current_scan_name, current_target, current_results_dir, zap_done
     print("=== RESETTING CASCADING SCAN STATE ===")
-    
-    # Release any locks
-    if scan_in_progress.locked():
-        print("Releasing scan lock")
-        scan_in_progress.release()
-    
-    # Reset all global variables
-    current_scan_name = None
-    current_target = None
-    current_results_dir = None
-    zap_done = False
-    
+    removed = scan_registry.forget_finished()
     print("=== CASCADING SCAN STATE RESET ===")
-    return {"status": "reset"}
+    return {"status": "reset", "forgotten_scans": removed}
 
 # Mobile App Scanner Routes (completely independent from cascading scanner)
 
@@ -1701,9 +1426,8 @@ def mobile_scan(request: Request, scanner: str = Form(...), target: str = Form(.
         })
     
     print(f"Mobile Scan YAML: {scan_yaml}")
-    load_kube()
-    k8s_api = client.CustomObjectsApi()
     try:
+        k8s_api = get_custom_objects_api()
         k8s_api.create_namespaced_custom_object(
             group="execution.securecodebox.io",
             version="v1",
@@ -1736,31 +1460,62 @@ def mobile_status():
     if not mobile_current_scan_name:
         return {"status": "idle"}
     
-    load_kube()
-    k8s_api = client.CustomObjectsApi()
-    try:
-        scan = k8s_api.get_namespaced_custom_object(
-            group="execution.securecodebox.io",
-            version="v1",
-            namespace=NAMESPACE,
-            plural="scans",
-            name=mobile_current_scan_name
-        )
-        print(f"Mobile scan status: {scan.get('status', {})}")
-        if scan.get("status", {}).get("state") == "Done":
+    scan_watcher.wait_synced(timeout=5)
+    state = scan_watcher.get_state(mobile_current_scan_name)
+    if state is None:
+        # Not seen by the watch yet (just created or watcher unavailable): ask the API once
+        try:
+            k8s_api = get_custom_objects_api()
+            scan = k8s_api.get_namespaced_custom_object(
+                group="execution.securecodebox.io",
+                version="v1",
+                namespace=NAMESPACE,
+                plural="scans",
+                name=mobile_current_scan_name
+            )
+            state = scan.get("status", {}).get("state")
+        except Exception as e:
+            print(f"Error fetching mobile scan status: {e}")
+            return {"status": "error", "error": str(e)}
+    print(f"Mobile scan state: {state}")
+    if state == "Done":
+        if mobile_scan_in_progress.locked():
             mobile_scan_in_progress.release()
-            return {"status": "done"}
-        return {"status": "running"}
-    except Exception as e:
-        print(f"Error fetching mobile scan status: {e}")
-        return {"status": "error", "error": str(e)}
+        return {"status": "done"}
+    if state == "Errored":
+        if mobile_scan_in_progress.locked():
+            mobile_scan_in_progress.release()
+        return {"status": "error", "error": f"Scan {mobile_current_scan_name} errored"}
+    if state == DELETED:
+        if mobile_scan_in_progress.locked():
+            mobile_scan_in_progress.release()
+        return {"status": "error", "error": f"Scan {mobile_current_scan_name} was deleted before it finished"}
+    return {"status": "running"}
+
+@app.get("/scan-events")
+async def scan_events(request: Request, scan: str = None):
+    """Server-sent Scan CRD state transitions, optionally for a single scan"""
+    scan_watcher.start()
+    last_event_id = parse_last_event_id(request)
+
+    async def generate():
+        if scan and last_event_id is None:
+            # Current state first, so a late subscriber does not miss a finished scan
+            yield format_sse(None, {'scan': scan, 'state': scan_watcher.get_state(scan)})
+        async for event_id, data in sse_hub.subscribe("scan-events", last_event_id):
+            if scan and data.get('scan') not in (None, scan):
+                continue
+            yield format_sse(event_id, data)
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/mobile-download")
 def mobile_download(request: Request, scan_name: str = Form(...)):
     """Download mobile scan results"""
     print(f"Mobile download requested for scan_name: {scan_name}")
     
-    s3 = boto3.client("s3", endpoint_url=MINIO_ENDPOINT, aws_access_key_id=MINIO_ACCESS_KEY, aws_secret_access_key=MINIO_SECRET_KEY)
+    s3 = get_s3_client()
     scan_folder = f"scan-{scan_name}"
     findings_key = f"{scan_folder}/findings.json"
     
@@ -1778,17 +1533,10 @@ def mobile_download(request: Request, scan_name: str = Form(...)):
         print(f"Error listing scans: {e}")
     
     try:
-        # Use temporary file that will be automatically cleaned up
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.json') as tmp_file:
-            s3.download_file(MINIO_BUCKET, findings_key, tmp_file.name)
-            print(f"Downloaded mobile findings to temporary file")
-            
-            return FileResponse(
-                tmp_file.name, 
-                filename=f"mobile-findings-{scan_name}.json",
-                media_type='application/json'
-            )
+        # Stream straight from MinIO, nothing is staged in /tmp
+        response = stream_object(findings_key, f"mobile-findings-{scan_name}.json", media_type='application/json', request_headers=request.headers)
+        print(f"Streaming mobile findings from {findings_key}")
+        return response
     except Exception as e:
         print(f"Could not download mobile findings: {e}")
         return templates.TemplateResponse("mobile.html", {
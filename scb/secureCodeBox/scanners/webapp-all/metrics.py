@@ -0,0 +1,61 @@
+"""Prometheus metrics of webapp-all's hot paths, served on /metrics.
+
+Histograms are fed by the shared MinIO client (botocore call events), the
+shared Kubernetes ApiClient, the scan registry's progress events and an
+HTTP middleware; gauges are read from the registry and the SSE hub when
+scraped (main_patched.py binds them). Kubernetes calls made by the cascade
+script and cascade_orchestrator.py run in their own processes and are
+only visible through the stage durations.
+"""
+from prometheus_client import Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# 256 B .. 1 GiB, x4 per bucket
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(12))
+STAGE_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+MINIO_REQUEST_SECONDS = Histogram(
+    "webapp_minio_request_seconds", "MinIO API call latency, retries included",
+    ["operation", "outcome"], buckets=LATENCY_BUCKETS)
+MINIO_RESPONSE_BYTES = Histogram(
+    "webapp_minio_response_bytes", "Content-Length of MinIO responses (object size for GetObject)",
+    ["operation"], buckets=BYTES_BUCKETS)
+KUBE_REQUEST_SECONDS = Histogram(
+    "webapp_kube_request_seconds", "Kubernetes API call latency (until the response headers, for watches)",
+    ["method", "path", "outcome"], buckets=LATENCY_BUCKETS)
+CASCADE_STAGE_SECONDS = Histogram(
+    "webapp_cascade_stage_seconds", "Duration of cascade stages that ran (cached stages are not counted)",
+    ["stage", "status"], buckets=STAGE_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram(
+    "webapp_http_request_seconds", "Request latency per route (until the response starts, for streams)",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+
+SCAN_QUEUE_DEPTH = Gauge("webapp_scan_queue_depth", "Scans waiting for a slot in the scan registry")
+SCANS_RUNNING = Gauge("webapp_scans_running", "Scans whose process is running")
+SSE_SUBSCRIBERS = Gauge("webapp_sse_subscribers", "Connected server-sent event subscribers")
+MINIO_BREAKER_STATE = Gauge("webapp_minio_breaker_state", "MinIO circuit breaker: 0 closed, 1 half open, 2 open")
+SSE_BUFFERED_EVENTS = Gauge("webapp_sse_buffered_events", "Events held in the SSE replay buffers of all channels")
+
+
+def observe_minio(operation, seconds, outcome, size=None):
+    MINIO_REQUEST_SECONDS.labels(operation, outcome).observe(seconds)
+    if size is not None:
+        MINIO_RESPONSE_BYTES.labels(operation).observe(size)
+
+
+def observe_kube(method, path, seconds, outcome):
+    # path is the API's resource path template, e.g. /apis/{group}/{version}/namespaces/{namespace}/{plural}
+    KUBE_REQUEST_SECONDS.labels(method, path, outcome).observe(seconds)
+
+
+def observe_stage(stage, status, seconds):
+    CASCADE_STAGE_SECONDS.labels(stage, status).observe(seconds)
+
+
+def observe_http(method, route, status, seconds):
+    HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def render():
+    """(body, content type) of the Prometheus text exposition"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,120 @@
+"""Async MinIO access for routes running on the event loop.
+
+The aioboto3 client and the aiohttp session used for MinIO health checks
+are created on first use inside the running loop and shared by every
+request, so downloads and health checks wait on sockets instead of
+holding one of Starlette's worker threads each. The client has the same
+configuration as the shared boto3 client and feeds the same health state
+and metrics (minio_client.instrument_client). close() releases both on
+shutdown.
+"""
+import asyncio
+import contextlib
+
+import aioboto3
+import aiohttp
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
+
+from minio_client import (MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_POOL_SIZE, MINIO_CONNECT_TIMEOUT,
+                          MINIO_READ_TIMEOUT, MINIO_MAX_ATTEMPTS, MINIO_RETRY_MODE, MINIO_TCP_KEEPALIVE,
+                          instrument_client)
+from minio_stream import (MINIO_BUCKET, MINIO_STREAM_CHUNK_SIZE, request_params, error_response, retry_headers,
+                          object_response, RETRY_FULL)
+
+HEALTH_PATH = "/minio/health/ready"
+
+_client = None
+_http = None
+_exit_stack = None
+_lock = None
+_loop = None
+
+
+def _bind_loop():
+    # Clients belong to the loop that created them; a new loop (e.g. a test client per request) gets new ones
+    global _client, _http, _exit_stack, _lock, _loop
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        _client = _http = _exit_stack = None
+        _lock = asyncio.Lock()
+        _loop = loop
+    return _lock
+
+
+async def get_async_s3_client():
+    """Return the loop-wide aioboto3 S3 client, creating it on first use"""
+    global _client, _exit_stack
+    lock = _bind_loop()
+    if _client is None:
+        async with lock:
+            if _client is None:
+                config = AioConfig(
+                    max_pool_connections=MINIO_POOL_SIZE,
+                    connect_timeout=MINIO_CONNECT_TIMEOUT,
+                    read_timeout=MINIO_READ_TIMEOUT,
+                    retries={"max_attempts": MINIO_MAX_ATTEMPTS, "mode": MINIO_RETRY_MODE},
+                    tcp_keepalive=MINIO_TCP_KEEPALIVE,
+                )
+                stack = contextlib.AsyncExitStack()
+                client = await stack.enter_async_context(aioboto3.Session().client(
+                    's3', endpoint_url=MINIO_ENDPOINT, aws_access_key_id=MINIO_ACCESS_KEY,
+                    aws_secret_access_key=MINIO_SECRET_KEY, config=config))
+                _client, _exit_stack = instrument_client(client), stack
+                print(f"[MINIO-ASYNC] Created async client for {MINIO_ENDPOINT} (pool size {MINIO_POOL_SIZE})")
+    return _client
+
+
+def _http_session():
+    global _http
+    _bind_loop()
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession()
+    return _http
+
+
+async def check_health(timeout=5):
+    """(HTTP status of MinIO's readiness probe, None) or (None, error message)"""
+    try:
+        async with _http_session().get(f"{MINIO_ENDPOINT}{HEALTH_PATH}",
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            return response.status, None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return None, str(e) or type(e).__name__
+
+
+async def iter_body(body, chunk_size=MINIO_STREAM_CHUNK_SIZE):
+    """Yield an aiobotocore StreamingBody in fixed-size chunks and always close it"""
+    try:
+        async for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
+async def stream_object(key, filename, media_type='application/octet-stream', request_headers=None,
+                        bucket=MINIO_BUCKET):
+    """Async minio_stream.stream_object: same conditional and Range handling, ClientError otherwise"""
+    params = request_params(key, request_headers, bucket)
+    s3 = await get_async_s3_client()
+    try:
+        obj = await s3.get_object(**params)
+    except ClientError as e:
+        response = error_response(e, key, params)
+        if response is RETRY_FULL:
+            return await stream_object(key, filename, media_type, retry_headers(params), bucket)
+        if response is None:
+            raise
+        return response
+
+    return object_response(obj, iter_body(obj['Body']), filename, media_type)
+
+
+async def close():
+    global _client, _exit_stack, _http
+    if _exit_stack is not None:
+        stack, _client, _exit_stack = _exit_stack, None, None
+        await stack.aclose()
+    if _http is not None:
+        http, _http = _http, None
+        await http.close()
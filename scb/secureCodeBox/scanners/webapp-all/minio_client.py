@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+
+import boto3
+from botocore.config import Config
+
+from metrics import observe_minio
+
+# Connection settings for the shared MinIO client (override via env vars)
+MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "http://localhost:9000")
+MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY", "admin")
+MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY", "password")
+MINIO_POOL_SIZE = int(os.environ.get("MINIO_POOL_SIZE", "32"))
+MINIO_CONNECT_TIMEOUT = float(os.environ.get("MINIO_CONNECT_TIMEOUT", "3"))
+MINIO_READ_TIMEOUT = float(os.environ.get("MINIO_READ_TIMEOUT", "30"))
+MINIO_MAX_ATTEMPTS = int(os.environ.get("MINIO_MAX_ATTEMPTS", "3"))
+MINIO_RETRY_MODE = os.environ.get("MINIO_RETRY_MODE", "standard")
+MINIO_TCP_KEEPALIVE = os.environ.get("MINIO_TCP_KEEPALIVE", "true").lower() in ("1", "true", "yes")
+
+_client = None
+_client_lock = threading.Lock()
+
+# Health state of the shared client, updated by record_success/record_failure
+_health_lock = threading.Lock()
+_health = {
+    "created_at": None,
+    "last_success": None,
+    "last_failure": None,
+    "last_error": None,
+    "consecutive_failures": 0,
+    "total_requests": 0,
+    "total_failures": 0,
+}
+_health_listeners = []
+
+
+def build_client_config():
+    """Build the botocore config used by the shared client"""
+    return Config(
+        max_pool_connections=MINIO_POOL_SIZE,
+        connect_timeout=MINIO_CONNECT_TIMEOUT,
+        read_timeout=MINIO_READ_TIMEOUT,
+        retries={"max_attempts": MINIO_MAX_ATTEMPTS, "mode": MINIO_RETRY_MODE},
+        tcp_keepalive=MINIO_TCP_KEEPALIVE,
+    )
+
+
+def create_s3_client():
+    """Create a new, unshared S3 client for MinIO (prefer get_s3_client)"""
+    session = boto3.session.Session()
+    return session.client(
+        's3',
+        endpoint_url=MINIO_ENDPOINT,
+        aws_access_key_id=MINIO_ACCESS_KEY,
+        aws_secret_access_key=MINIO_SECRET_KEY,
+        config=build_client_config(),
+    )
+
+
+def get_s3_client():
+    """Return the process-wide MinIO client, creating it on first use.
+
+    boto3 clients are thread-safe, so one client (and its connection pool)
+    is shared by every request handler and worker thread.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = instrument_client(create_s3_client())
+                with _health_lock:
+                    _health["created_at"] = time.time()
+                print(f"[MINIO-CLIENT] Created shared client for {MINIO_ENDPOINT} (pool size {MINIO_POOL_SIZE})")
+    return _client
+
+
+def instrument_client(client):
+    """Feed a client's calls into the shared health state and the MinIO metrics"""
+    client.meta.events.register('before-call.s3', _on_before_call)
+    client.meta.events.register('after-call.s3', _on_after_call)
+    client.meta.events.register('after-call-error.s3', _on_after_call_error)
+    return client
+
+
+def reset_s3_client():
+    """Drop the shared client so the next call builds a fresh one"""
+    global _client
+    with _client_lock:
+        old_client = _client
+        _client = None
+    if old_client is not None:
+        try:
+            old_client.close()
+        except Exception as e:
+            print(f"[MINIO-CLIENT] Error closing client: {e}")
+    with _health_lock:
+        _health["consecutive_failures"] = 0
+
+
+def add_health_listener(listener):
+    """Call listener(ok, error) after every MinIO call of an instrumented client"""
+    _health_listeners.append(listener)
+
+
+def record_success():
+    with _health_lock:
+        _health["total_requests"] += 1
+        _health["last_success"] = time.time()
+        _health["consecutive_failures"] = 0
+    for listener in _health_listeners:
+        listener(True)
+
+
+def record_failure(error):
+    with _health_lock:
+        _health["total_requests"] += 1
+        _health["total_failures"] += 1
+        _health["last_failure"] = time.time()
+        _health["last_error"] = str(error)
+        _health["consecutive_failures"] += 1
+    for listener in _health_listeners:
+        listener(False, error)
+
+
+def _on_before_call(model=None, context=None, **kwargs):
+    # The request context travels to after-call(-error), which is where latency is recorded
+    if context is not None:
+        context['webapp_call'] = (model.name if model else 'request', time.monotonic())
+
+
+def _observe_call(context, outcome, size=None):
+    operation, started = (context or {}).get('webapp_call', (None, None))
+    if started is not None:
+        observe_minio(operation, time.monotonic() - started, outcome, size)
+
+
+def _on_after_call(http_response=None, model=None, context=None, **kwargs):
+    # 4xx (e.g. NoSuchKey) is a caller problem, not a MinIO health problem
+    status = getattr(http_response, 'status_code', 200)
+    if status >= 500:
+        record_failure(f"{model.name if model else 'request'} returned HTTP {status}")
+    else:
+        record_success()
+    length = (getattr(http_response, 'headers', None) or {}).get('content-length')
+    _observe_call(context, 'error' if status >= 400 else 'ok', int(length) if length and length.isdigit() else None)
+
+
+def _on_after_call_error(exception=None, context=None, **kwargs):
+    record_failure(exception)
+    _observe_call(context, 'error')
+
+
+def health_state():
+    """Snapshot of the shared client's configuration and health"""
+    with _health_lock:
+        state = dict(_health)
+    state["healthy"] = state["consecutive_failures"] == 0
+    state["client_initialized"] = _client is not None
+    state["endpoint"] = MINIO_ENDPOINT
+    state["pool_size"] = MINIO_POOL_SIZE
+    state["connect_timeout"] = MINIO_CONNECT_TIMEOUT
+    state["read_timeout"] = MINIO_READ_TIMEOUT
+    state["max_attempts"] = MINIO_MAX_ATTEMPTS
+    state["retry_mode"] = MINIO_RETRY_MODE
+    state["tcp_keepalive"] = MINIO_TCP_KEEPALIVE
+    return state
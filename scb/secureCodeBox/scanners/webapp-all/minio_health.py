@@ -0,0 +1,176 @@
+"""Cached MinIO health and a circuit breaker shared by every MinIO caller.
+
+A background task probes /minio/health/ready every MINIO_HEALTH_INTERVAL
+seconds and keeps the result, so routes read a cached status instead of
+probing per request. The breaker counts consecutive failures of probes
+and of real MinIO calls (minio_client health listeners):
+
+  closed     calls go through
+  open       after MINIO_BREAKER_THRESHOLD failures; calls are refused at
+             once for MINIO_BREAKER_COOLDOWN seconds
+  half_open  after the cooldown one trial (a probe or a request) is let
+             through; success closes the breaker, failure re-opens it
+
+A probe answered with anything below HTTP 500 counts as reachable (S3
+stand-ins without MinIO's health endpoint answer 404).
+"""
+import os
+import time
+import asyncio
+import threading
+
+from minio_client import add_health_listener
+import minio_async
+
+# Seconds between background probes, and the probe's own timeout
+MINIO_HEALTH_INTERVAL = float(os.environ.get("MINIO_HEALTH_INTERVAL", "5"))
+MINIO_HEALTH_TIMEOUT = float(os.environ.get("MINIO_HEALTH_TIMEOUT", "2"))
+# Consecutive failures that open the breaker, and seconds it stays open before a trial
+MINIO_BREAKER_THRESHOLD = int(os.environ.get("MINIO_BREAKER_THRESHOLD", "5"))
+MINIO_BREAKER_COOLDOWN = float(os.environ.get("MINIO_BREAKER_COOLDOWN", "15"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class MinioUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=MINIO_BREAKER_THRESHOLD, cooldown=MINIO_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None
+        self._last_error = None
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trial_at = None
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """True if a MinIO call may go ahead now; cheap enough to ask on every request"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and (self._trial_at is None or time.monotonic() - self._trial_at >= self.cooldown):
+                # One trial per cooldown; it decides whether the breaker closes
+                self._trial_at = time.monotonic()
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            if self._current_state() == CLOSED:
+                return 0
+            since = self._trial_at if self._state == HALF_OPEN and self._trial_at else self._opened_at
+            return max(1, int(self.cooldown - (time.monotonic() - since) + 0.999))
+
+    def record(self, ok, error=None):
+        with self._lock:
+            state = self._current_state()
+            if ok:
+                if state != CLOSED:
+                    print(f"[MINIO-HEALTH] Breaker closed (was {state})")
+                self._state = CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._stats["opened"] += 1
+                print(f"[MINIO-HEALTH] Breaker open for {self.cooldown:.0f}s after {self._failures} failures: {error}")
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            return dict(self._stats, state=state, consecutive_failures=self._failures, threshold=self.threshold,
+                        cooldown_seconds=self.cooldown, last_error=self._last_error)
+
+
+class MinioHealthMonitor:
+    """Background readiness probe whose last result routes read instead of probing themselves"""
+
+    def __init__(self, breaker, interval=MINIO_HEALTH_INTERVAL, timeout=MINIO_HEALTH_TIMEOUT):
+        self.breaker = breaker
+        self.interval = interval
+        self.timeout = timeout
+        self._task = None
+        self._last = {"status": "unknown", "http_status": None, "error": None, "checked_at": None, "latency_ms": None}
+
+    async def probe(self):
+        """Probe MinIO now and update the cached status and the breaker"""
+        start = time.monotonic()
+        http_status, error = await minio_async.check_health(timeout=self.timeout)
+        if error is not None:
+            status = "unreachable"
+        elif http_status == 200:
+            status = "healthy"
+        elif http_status >= 500:
+            status = "unhealthy"
+        else:
+            status = "reachable"
+        self._last = {"status": status, "http_status": http_status, "error": error, "checked_at": time.time(),
+                      "latency_ms": round((time.monotonic() - start) * 1000, 1)}
+        self.breaker.record(status in ("healthy", "reachable"), error or f"health probe returned HTTP {http_status}")
+        return self.status()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe()
+            except Exception as e:
+                print(f"[MINIO-HEALTH] Probe failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def healthy(self):
+        """Cached verdict: False only while the breaker is open (a half-open trial must go through)"""
+        return self.breaker.state != OPEN
+
+    def status(self):
+        status = dict(self._last)
+        if status["checked_at"] is not None:
+            status["age_seconds"] = round(time.time() - status["checked_at"], 1)
+        status["breaker"] = self.breaker.snapshot()
+        return status
+
+
+minio_breaker = CircuitBreaker()
+minio_health_monitor = MinioHealthMonitor(minio_breaker)
+add_health_listener(minio_breaker.record)
+
+
+def require_minio():
+    """Raise MinioUnavailable while the breaker refuses MinIO calls"""
+    if not minio_breaker.allow():
+        raise MinioUnavailable(f"MinIO is unavailable (circuit open, retry in {minio_breaker.retry_after()}s)")
@@ -0,0 +1,133 @@
+import os
+import re
+import urllib.parse
+
+from botocore.exceptions import ClientError
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+
+from minio_client import get_s3_client
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+# Bytes held in memory per download while piping MinIO -> client
+MINIO_STREAM_CHUNK_SIZE = int(os.environ.get("MINIO_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def content_disposition(filename):
+    """Attachment header value that survives non-ASCII file names"""
+    quoted = urllib.parse.quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+
+def iter_body(body, chunk_size=MINIO_STREAM_CHUNK_SIZE):
+    """Yield a botocore StreamingBody in fixed-size chunks and always close it"""
+    try:
+        for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
+def _single_range(range_header):
+    # Multi-range requests are answered with the full object, as RFC 9110 allows
+    if not range_header or ',' in range_header:
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    return range_header.strip()
+
+
+def request_params(key, request_headers=None, bucket=MINIO_BUCKET):
+    """GetObject parameters for a download honouring the client's conditional and Range headers"""
+    request_headers = request_headers or {}
+    params = {'Bucket': bucket, 'Key': key}
+
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match:
+        params['IfNoneMatch'] = if_none_match
+
+    byte_range = _single_range(request_headers.get('range'))
+    if_range = request_headers.get('if-range')
+    if byte_range and if_range:
+        if if_range.startswith('"'):
+            # Only serve the range if the client's copy is still current
+            params['IfMatch'] = if_range
+        else:
+            # A date or weak tag cannot be checked exactly, so send the full object (RFC 9110 13.1.5)
+            byte_range = None
+    if byte_range:
+        params['Range'] = byte_range
+    return params
+
+
+# Returned by error_response when the download should be retried without If-Range
+RETRY_FULL = object()
+
+
+def error_response(e, key, params):
+    """Response for a GetObject ClientError that has one (304, 416), RETRY_FULL, or None to re-raise"""
+    code = e.response.get('Error', {}).get('Code')
+    status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    if code in ('304', 'NotModified') or status == 304:
+        # The client may have sent several tags or *; echo the object's own validator, if MinIO gave one
+        etag = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('etag')
+        return Response(status_code=304, headers={'ETag': etag} if etag else None)
+    if code == 'PreconditionFailed' and 'IfMatch' in params:
+        # If-Range did not match: fall back to the full, current object
+        return RETRY_FULL
+    if code == 'InvalidRange' or status == 416:
+        return JSONResponse(
+            content={"error": f"Requested range not satisfiable for {key}"},
+            status_code=416,
+            headers={'Content-Range': 'bytes */*'}
+        )
+    return None
+
+
+def retry_headers(params):
+    return {'if-none-match': params['IfNoneMatch']} if 'IfNoneMatch' in params else None
+
+
+def object_response(obj, body, filename, media_type):
+    """StreamingResponse for a GetObject result, with its length, validators and range"""
+    headers = {
+        'Content-Disposition': content_disposition(filename),
+        'Content-Length': str(obj['ContentLength']),
+        'Accept-Ranges': 'bytes',
+    }
+    if obj.get('ETag'):
+        headers['ETag'] = obj['ETag']
+    if obj.get('LastModified'):
+        headers['Last-Modified'] = obj['LastModified'].strftime('%a, %d %b %Y %H:%M:%S GMT')
+    status_code = 200
+    if obj.get('ContentRange'):
+        headers['Content-Range'] = obj['ContentRange']
+        status_code = 206
+
+    return StreamingResponse(body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def stream_object(key, filename, media_type='application/octet-stream', request_headers=None, bucket=MINIO_BUCKET):
+    """Stream a MinIO object to the client without staging it on disk.
+
+    Honours If-None-Match (304 for unchanged objects) and single-part
+    Range / If-Range requests (206). Raises the underlying ClientError
+    for anything else, e.g. a missing key.
+    """
+    params = request_params(key, request_headers, bucket)
+    s3 = get_s3_client()
+    try:
+        obj = s3.get_object(**params)
+    except ClientError as e:
+        response = error_response(e, key, params)
+        if response is RETRY_FULL:
+            return stream_object(key, filename, media_type, retry_headers(params), bucket)
+        if response is None:
+            raise
+        return response
+
+    return object_response(obj, iter_body(obj['Body']), filename, media_type)
@@ -0,0 +1,59 @@
+import json
+
+from minio_stream import MINIO_STREAM_CHUNK_SIZE
+
+
+def _parse_line(raw):
+    line = raw.strip()
+    if not line:
+        return None
+    try:
+        return line, json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+def iter_jsonl_findings(body, chunk_size=MINIO_STREAM_CHUNK_SIZE):
+    """Yield (raw_line, finding) for each valid JSON line of a Nuclei JSONL body"""
+    try:
+        for raw in body.iter_lines(chunk_size):
+            parsed = _parse_line(raw)
+            if parsed is not None:
+                yield parsed
+    finally:
+        body.close()
+
+
+async def iter_jsonl_findings_async(body, chunk_size=MINIO_STREAM_CHUNK_SIZE):
+    """iter_jsonl_findings for an aiobotocore StreamingBody"""
+    try:
+        async for raw in body.iter_lines(chunk_size):
+            parsed = _parse_line(raw)
+            if parsed is not None:
+                yield parsed
+    finally:
+        body.close()
+
+
+async def stream_nuclei_envelope(body, target="IP address"):
+    """Convert a Nuclei JSONL body (aiobotocore) into the download envelope, incrementally.
+
+    Findings are emitted one per line as they are read, so only a single
+    finding is held in memory. Because the count is only known at the end,
+    "scan_info" is written as a trailer after the "findings" array; the
+    document has the same keys as before, just in a different order.
+    """
+    yield b'{\n  "findings": [\n'
+    count = 0
+    async for line, _ in iter_jsonl_findings_async(body):
+        yield (b',\n    ' if count else b'    ') + line
+        count += 1
+    scan_info = {
+        "scanner": "nuclei",
+        "target": target,
+        "status": "completed",
+        "findings_count": count,
+        "message": f"Found {count} vulnerabilities" if count else "No vulnerabilities found"
+    }
+    print(f"[DOWNLOAD-NUCLEI] Processed {count} findings")
+    yield b'\n  ],\n  "scan_info": ' + json.dumps(scan_info).encode() + b'\n}\n'
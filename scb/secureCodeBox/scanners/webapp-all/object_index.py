@@ -0,0 +1,327 @@
+import os
+import time
+import hashlib
+import threading
+import urllib.parse
+
+from minio_client import get_s3_client
+from key_classifier import classify, SCANNER_TYPES
+from minio_health import minio_breaker, require_minio
+import key_classifier
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+# Seconds an index stays fresh; the next lookup after that re-lists the bucket before it returns
+OBJECT_INDEX_TTL = float(os.environ.get("OBJECT_INDEX_TTL", "30"))
+OBJECT_INDEX_PAGE_SIZE = int(os.environ.get("OBJECT_INDEX_PAGE_SIZE", "1000"))
+
+
+def file_id_of(key):
+    """Stable download id of a key: the same key always maps to the same id"""
+    return hashlib.blake2b(key.encode(), digest_size=10).hexdigest()
+
+
+def scan_folder_of(key):
+    if key.startswith('scan-') and '/' in key:
+        return key.split('/', 1)[0]
+    return None
+
+
+class ObjectIndex:
+    """In-memory index of the MinIO bucket keyed by scanner type and scan folder.
+
+    The index is built with a paginated listing and kept current by
+    incremental refreshes (only new or changed keys are re-classified),
+    MinIO bucket notifications (apply_event) and explicit invalidation.
+    """
+
+    def __init__(self, bucket=MINIO_BUCKET, ttl=OBJECT_INDEX_TTL, page_size=OBJECT_INDEX_PAGE_SIZE):
+        self.bucket = bucket
+        self.ttl = ttl
+        self.page_size = page_size
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._objects = {}
+        self._by_id = {}
+        self._by_scanner = {scanner: {} for scanner in SCANNER_TYPES}
+        self._by_folder = {}
+        self._sorted_scanner = {}
+        self._sorted_folder = {}
+        self._sorted_keys = None
+        self._folder_summaries = None
+        self._built = False
+        self._last_refresh = 0.0
+        self._stale = True
+        # Bumped by invalidate(), so a refresh that was already listing does not clear a newer invalidation
+        self._generation = 0
+        self._stats = {"full_builds": 0, "incremental_refreshes": 0, "events_applied": 0,
+                       "last_refresh_seconds": None, "last_changed": 0, "last_removed": 0}
+
+    # --- maintenance -----------------------------------------------------
+
+    def _list_all(self):
+        s3 = get_s3_client()
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, PaginationConfig={'PageSize': self.page_size}):
+            for obj in page.get('Contents', []):
+                yield obj
+
+    def _add(self, key, size, last_modified, etag):
+        scanner_type, file_type = classify(key, etag, self.bucket)
+        file_info = {
+            'key': key,
+            'size': size,
+            'last_modified': last_modified,
+            'etag': etag,
+            'file_type': file_type,
+            'scanner_type': scanner_type,
+            'scan_folder': scan_folder_of(key),
+            'file_id': file_id_of(key),
+        }
+        self._objects[key] = file_info
+        self._by_id[file_info['file_id']] = file_info
+        self._sorted_keys = self._folder_summaries = None
+        self._by_scanner[scanner_type][key] = file_info
+        self._sorted_scanner.pop(scanner_type, None)
+        folder = file_info['scan_folder']
+        if folder:
+            self._by_folder.setdefault(folder, {})[key] = file_info
+            self._sorted_folder.pop(folder, None)
+
+    def _remove(self, key):
+        file_info = self._objects.pop(key, None)
+        if file_info is None:
+            return
+        self._sorted_keys = self._folder_summaries = None
+        self._by_id.pop(file_info['file_id'], None)
+        self._by_scanner[file_info['scanner_type']].pop(key, None)
+        self._sorted_scanner.pop(file_info['scanner_type'], None)
+        folder = file_info['scan_folder']
+        if folder and folder in self._by_folder:
+            self._by_folder[folder].pop(key, None)
+            if not self._by_folder[folder]:
+                del self._by_folder[folder]
+            self._sorted_folder.pop(folder, None)
+
+    def refresh(self):
+        """Re-list the bucket and apply only the differences to the index"""
+        with self._refresh_lock:
+            start = time.time()
+            with self._lock:
+                generation = self._generation
+            listed = {obj['Key']: obj for obj in self._list_all()}
+            # Classify new and changed keys outside the index lock, sniffing one takes a request
+            for key, obj in listed.items():
+                current = self._objects.get(key)
+                if current is None or current['etag'] != obj.get('ETag'):
+                    classify(key, obj.get('ETag'), self.bucket)
+            changed = 0
+            with self._lock:
+                full_build = not self._built
+                for key, obj in listed.items():
+                    current = self._objects.get(key)
+                    etag = obj.get('ETag')
+                    if current is None or current['etag'] != etag or current['last_modified'] != obj['LastModified']:
+                        if current is not None:
+                            self._remove(key)
+                        self._add(key, obj['Size'], obj['LastModified'], etag)
+                        changed += 1
+                removed = [key for key in self._objects if key not in listed]
+                for key in removed:
+                    self._remove(key)
+                self._built = True
+                self._stale = self._generation != generation
+                self._last_refresh = time.time()
+                self._stats["full_builds" if full_build else "incremental_refreshes"] += 1
+                self._stats["last_refresh_seconds"] = round(self._last_refresh - start, 3)
+                self._stats["last_changed"] = changed
+                self._stats["last_removed"] = len(removed)
+            print(f"[OBJECT-INDEX] Refreshed {len(listed)} objects in {time.time()-start:.2f}s "
+                  f"({changed} changed, {len(removed)} removed)")
+
+    def is_fresh(self):
+        """True while lookups are served without re-listing the bucket"""
+        return self._built and not self._stale and time.time() - self._last_refresh < self.ttl
+
+    def ensure_fresh(self):
+        """Refresh when stale; concurrent callers reuse the current view"""
+        if self.is_fresh():
+            return
+        if self._built and not minio_breaker.allow():
+            # MinIO is down: serve the last view rather than wait for timeouts
+            return
+        if not self._built:
+            # Nothing to serve yet, every caller has to wait for the first build
+            require_minio()
+            self.refresh()
+            return
+        if self._refresh_lock.locked():
+            return
+        self.refresh()
+
+    def invalidate(self):
+        """Mark the index stale so the next lookup re-lists the bucket"""
+        with self._lock:
+            self._stale = True
+            self._generation += 1
+
+    def clear(self):
+        """Drop everything; the next lookup performs a full rebuild"""
+        with self._lock:
+            self._objects.clear()
+            self._by_id.clear()
+            self._by_scanner = {scanner: {} for scanner in SCANNER_TYPES}
+            self._by_folder.clear()
+            self._sorted_scanner.clear()
+            self._sorted_folder.clear()
+            self._sorted_keys = self._folder_summaries = None
+            self._built = False
+            self._stale = True
+            self._generation += 1
+
+    def apply_event(self, record):
+        """Apply one MinIO bucket notification record (webhook payload)"""
+        event_name = record.get('eventName', '')
+        s3_info = record.get('s3', {})
+        if s3_info.get('bucket', {}).get('name', self.bucket) != self.bucket:
+            return False
+        obj = s3_info.get('object', {})
+        key = urllib.parse.unquote_plus(obj.get('key', ''))
+        if not key:
+            return False
+        etag = obj.get('eTag')
+        etag = f'"{etag}"' if etag else None
+        if event_name.startswith('s3:ObjectCreated'):
+            classify(key, etag, self.bucket)
+        with self._lock:
+            if event_name.startswith('s3:ObjectRemoved'):
+                self._remove(key)
+            elif event_name.startswith('s3:ObjectCreated'):
+                self._remove(key)
+                event_time = record.get('eventTime')
+                last_modified = _parse_event_time(event_time) if event_time else None
+                self._add(key, obj.get('size', 0), last_modified, etag)
+            else:
+                return False
+            self._stats["events_applied"] += 1
+        return True
+
+    # --- lookups ---------------------------------------------------------
+
+    def files_for_scanner(self, scanner_type):
+        """Files of one scanner type, newest first"""
+        self.ensure_fresh()
+        with self._lock:
+            if scanner_type not in self._by_scanner:
+                return None
+            files = self._sorted_scanner.get(scanner_type)
+            if files is None:
+                files = _newest_first(self._by_scanner[scanner_type].values())
+                self._sorted_scanner[scanner_type] = files
+            return files
+
+    def files_in_folder(self, folder_name):
+        """Files of one scan folder, newest first (None if unknown)"""
+        self.ensure_fresh()
+        with self._lock:
+            if folder_name not in self._by_folder:
+                return None
+            files = self._sorted_folder.get(folder_name)
+            if files is None:
+                files = _newest_first(self._by_folder[folder_name].values())
+                self._sorted_folder[folder_name] = files
+            return files
+
+    def get(self, key):
+        self.ensure_fresh()
+        with self._lock:
+            return self._objects.get(key)
+
+    def get_by_id(self, file_id):
+        """File with this download id, from the current view (no re-listing once built)"""
+        if not self._built:
+            self.ensure_fresh()
+        with self._lock:
+            return self._by_id.get(file_id)
+
+    def files_by_key(self):
+        """Every indexed file in key order"""
+        self.ensure_fresh()
+        with self._lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self._objects.values(), key=lambda f: f['key'])
+            return self._sorted_keys
+
+    def folder_summaries(self):
+        """One summary per scan folder, newest first (see folder_position)"""
+        self.ensure_fresh()
+        with self._lock:
+            if self._folder_summaries is None:
+                summaries = []
+                for folder_name, files in self._by_folder.items():
+                    scanner_counts = {}
+                    for file_info in files.values():
+                        scanner_counts[file_info['scanner_type']] = scanner_counts.get(file_info['scanner_type'], 0) + 1
+                    modified = [f['last_modified'] for f in files.values() if f['last_modified'] is not None]
+                    summaries.append({
+                        'folder_name': folder_name,
+                        'total_files': len(files),
+                        'scanners': list(scanner_counts),
+                        'scanner_counts': scanner_counts,
+                        'latest_modified': max(modified) if modified else None,
+                    })
+                summaries.sort(key=folder_position, reverse=True)
+                self._folder_summaries = summaries
+            return self._folder_summaries
+
+    def scanner_files(self):
+        return {scanner: self.files_for_scanner(scanner) for scanner in SCANNER_TYPES}
+
+    def scan_folders(self):
+        self.ensure_fresh()
+        with self._lock:
+            folder_names = list(self._by_folder)
+        return {folder: self.files_in_folder(folder) for folder in folder_names}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "bucket": self.bucket,
+                "objects": len(self._objects),
+                "scan_folders": len(self._by_folder),
+                "built": self._built,
+                "stale": self._stale,
+                "ttl_seconds": self.ttl,
+                "age_seconds": round(time.time() - self._last_refresh, 3) if self._built else None,
+                "classifier": key_classifier.stats(),
+            })
+        return stats
+
+
+def _timestamp(value):
+    # Unknown times sort last in newest-first views
+    return value.timestamp() if value is not None else -1.0
+
+
+def file_position(file_info):
+    """Sort position of a file in newest-first views (ties broken by key)"""
+    return _timestamp(file_info['last_modified']), file_info['key']
+
+
+def folder_position(summary):
+    return _timestamp(summary['latest_modified']), summary['folder_name']
+
+
+def _newest_first(files):
+    return sorted(files, key=file_position, reverse=True)
+
+
+def _parse_event_time(value):
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+object_index = ObjectIndex()
@@ -0,0 +1,248 @@
+"""Typed progress events of a cascading scan (Naabu -> TLSX -> ZAP -> Nuclei).
+
+The cascade script and cascade_orchestrator.py append one JSON object per
+line to the file named by $CASCADE_EVENTS_FILE (set per scan by the scan
+registry). Event types:
+
+    stage_started     stage, plus total/concurrency for zap
+    stage_finished    stage, status (done/failed/timeout), cached when results were reused
+    zap_target        target, scan, state (started/Done/Errored/Timeout), duration
+    cache_hit         stage, saved (seconds), uri; target for zap (incremental cascades)
+    count             name (ports/endpoints/findings), value
+    artifact          stage, uri
+    workflow_finished status (done/failed)
+
+ScanProgress folds these into per-stage state as they arrive, so a status
+request reads a small snapshot instead of scanning the output log.
+"""
+import os
+import json
+import math
+import time
+import threading
+
+# Stage order; zap and nuclei run side by side after tlsx
+STAGES = ("naabu", "tlsx", "zap", "nuclei")
+PARALLEL_STAGES = ("zap", "nuclei")
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+# Weight of the newest run in the per-stage duration averages used for ETAs
+PROGRESS_HISTORY_WEIGHT = float(os.environ.get("PROGRESS_HISTORY_WEIGHT", "0.3"))
+
+_emit_lock = threading.Lock()
+
+
+def emit_event(event_type, **fields):
+    """Append one event to $CASCADE_EVENTS_FILE; a no-op when it is not set"""
+    path = os.environ.get("CASCADE_EVENTS_FILE")
+    if not path:
+        return
+    event = {"type": event_type, "ts": time.time()}
+    event.update(fields)
+    line = json.dumps(event) + "\n"
+    try:
+        with _emit_lock, open(path, "a") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"[PROGRESS] Could not write event to {path}: {e}", flush=True)
+
+
+def _number(value, default=None):
+    # Events written by the shell script carry every field as a string
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class StageHistory:
+    """Moving average of how long each stage (and each ZAP target) took"""
+
+    def __init__(self, weight=PROGRESS_HISTORY_WEIGHT):
+        self.weight = weight
+        self._averages = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, duration):
+        with self._lock:
+            previous = self._averages.get(key)
+            self._averages[key] = duration if previous is None else \
+                previous + self.weight * (duration - previous)
+
+    def average(self, key):
+        with self._lock:
+            return self._averages.get(key)
+
+    def snapshot(self):
+        with self._lock:
+            return {k: round(v, 1) for k, v in self._averages.items()}
+
+
+stage_history = StageHistory()
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.state = PENDING
+        self.started_at = None
+        self.finished_at = None
+        self.total = None
+        self.concurrency = 1
+        self.targets = {}
+        self.completed = 0
+        self.failed = 0
+        self.cached = 0
+
+    def elapsed(self, now):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or now) - self.started_at
+
+
+class ScanProgress:
+    """Per-stage state, counts and artifacts of one scan, updated event by event"""
+
+    def __init__(self, history=stage_history):
+        self.history = history
+        self.stages = {name: _Stage(name) for name in STAGES}
+        self.counts = {}
+        self.artifacts = []
+        self.time_saved = 0.0
+        self.workflow_status = None
+        self.last_event = None
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def apply(self, event):
+        """Fold one event into the progress state; unknown types are ignored"""
+        with self._lock:
+            self.events += 1
+            self.last_event = event
+            event_type = event.get("type")
+            ts = _number(event.get("ts"), time.time())
+            stage = self.stages.get(event.get("stage"))
+            if event_type == "stage_started" and stage:
+                stage.state = RUNNING
+                stage.started_at = ts
+                stage.total = _number(event.get("total"), stage.total)
+                stage.concurrency = max(1, int(_number(event.get("concurrency"), stage.concurrency)))
+            elif event_type == "stage_finished" and stage:
+                stage.state = event.get("status") or DONE
+                stage.finished_at = ts
+                # Stages that reused cached results would make the averages too optimistic
+                if stage.state == DONE and stage.started_at is not None and not _number(event.get("cached"), 0):
+                    self.history.record(stage.name, stage.elapsed(ts))
+            elif event_type == "zap_target":
+                self._apply_zap_target(event, ts)
+            elif event_type == "cache_hit" and stage:
+                stage.cached += 1
+                self.time_saved += _number(event.get("saved"), 0.0)
+            elif event_type == "count" and event.get("name"):
+                self.counts[event["name"]] = int(_number(event.get("value"), 0))
+            elif event_type == "artifact" and event.get("uri"):
+                self.artifacts.append({"stage": event.get("stage"), "uri": event["uri"]})
+            elif event_type == "workflow_finished":
+                self.workflow_status = event.get("status") or DONE
+
+    def _apply_zap_target(self, event, ts):
+        zap = self.stages["zap"]
+        target = event.get("target")
+        state = event.get("state")
+        if state == "started":
+            zap.targets[target] = ts
+            return
+        started = zap.targets.pop(target, None)
+        if state == "Done":
+            zap.completed += 1
+            duration = _number(event.get("duration"))
+            if duration is None and started is not None:
+                duration = ts - started
+            if duration is not None:
+                self.history.record("zap_target", duration)
+        else:
+            zap.failed += 1
+
+    def finish(self, status):
+        """The scan's process ended (status: completed/failed/cancelled): stop running stages"""
+        status = DONE if status == "completed" else status
+        with self._lock:
+            now = time.time()
+            for stage in self.stages.values():
+                if stage.state == RUNNING:
+                    stage.state = status
+                    stage.finished_at = now
+            if self.workflow_status is None:
+                self.workflow_status = status
+
+    @property
+    def succeeded(self):
+        return self.workflow_status == DONE
+
+    def _stage_eta(self, stage, now):
+        """Seconds until the stage should finish, or None without history to go by"""
+        if stage.state not in (PENDING, RUNNING):
+            return 0.0
+        if stage.name == "zap":
+            average = self.history.average("zap_target")
+            # Before the ZAP stage starts its size is the TLSX endpoint count, if known yet
+            total = stage.total if stage.total is not None else self.counts.get("endpoints")
+            if average is None or total is None:
+                # Not known until TLSX is done: fall back to how long the whole stage took before
+                whole = self.history.average("zap")
+                return None if whole is None else max(0.0, whole - stage.elapsed(now))
+            remaining = max(0.0, total - stage.completed - stage.failed)
+            if stage.state == PENDING:
+                return math.ceil(remaining / stage.concurrency) * average
+            in_flight = [now - started for started in stage.targets.values()]
+            # Targets already running only need what is left of an average run
+            waiting = max(0.0, remaining - len(in_flight))
+            current = max([max(0.0, average - e) for e in in_flight], default=0.0)
+            return current + math.ceil(waiting / stage.concurrency) * average
+        average = self.history.average(stage.name)
+        if average is None:
+            return None
+        return max(0.0, average - stage.elapsed(now))
+
+    def snapshot(self):
+        """Per-stage progress and ETAs; cost does not depend on how long the scan has run"""
+        with self._lock:
+            now = time.time()
+            stages = {}
+            etas = {}
+            for stage in self.stages.values():
+                eta = self._stage_eta(stage, now)
+                etas[stage.name] = eta
+                data = {
+                    "state": stage.state,
+                    "started_at": stage.started_at,
+                    "finished_at": stage.finished_at,
+                    "elapsed": round(stage.elapsed(now), 1),
+                    "eta_seconds": round(eta, 1) if eta is not None else None,
+                    "cached": stage.cached,
+                }
+                if stage.name == "zap":
+                    data.update(total=int(stage.total) if stage.total is not None else None,
+                                completed=stage.completed, failed=stage.failed,
+                                running=len(stage.targets), concurrency=stage.concurrency)
+                stages[stage.name] = data
+            sequential = [etas[name] for name in STAGES if name not in PARALLEL_STAGES]
+            parallel = [etas[name] for name in PARALLEL_STAGES]
+            if self.workflow_status is not None:
+                eta = 0.0
+            elif None in sequential or None in parallel:
+                eta = None
+            else:
+                eta = sum(sequential) + max(parallel)
+            current = [name for name in STAGES if self.stages[name].state == RUNNING]
+            return {
+                "stages": stages,
+                "current_stages": current,
+                "counts": dict(self.counts),
+                "artifacts": list(self.artifacts),
+                "time_saved_seconds": round(self.time_saved, 1),
+                "workflow_status": self.workflow_status,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "events": self.events,
+            }
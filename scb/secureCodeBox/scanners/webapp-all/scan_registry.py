@@ -0,0 +1,610 @@
+import os
+import time
+import uuid
+import json
+import signal
+import asyncio
+import tempfile
+import threading
+import collections
+
+from progress import ScanProgress
+
+# Cascades running at once, overall and against the same target
+SCAN_MAX_CONCURRENT = max(1, int(os.environ.get("SCAN_MAX_CONCURRENT", "4")))
+SCAN_MAX_PER_TARGET = max(1, int(os.environ.get("SCAN_MAX_PER_TARGET", "1")))
+# Submissions waiting for a free slot; beyond this new scans are rejected
+SCAN_QUEUE_LIMIT = int(os.environ.get("SCAN_QUEUE_LIMIT", "50"))
+SCAN_OUTPUT_BUFFER_LINES = int(os.environ.get("SCAN_OUTPUT_BUFFER_LINES", "5000"))
+# Finished scans kept for /scans before the oldest are forgotten
+SCAN_HISTORY_LIMIT = int(os.environ.get("SCAN_HISTORY_LIMIT", "100"))
+# Seconds between SIGTERM and SIGKILL when a scan's process group is stopped
+SCAN_TERMINATE_GRACE = float(os.environ.get("SCAN_TERMINATE_GRACE", "5"))
+# Longest output line read from a scan script
+SCAN_MAX_LINE_BYTES = 1024 * 1024
+# Per-scan progress event files (CASCADE_EVENTS_FILE) and how often they are read
+SCAN_EVENTS_DIR = os.environ.get("SCAN_EVENTS_DIR", os.path.join(tempfile.gettempdir(), "scan-events"))
+SCAN_EVENTS_POLL_INTERVAL = float(os.environ.get("SCAN_EVENTS_POLL_INTERVAL", "0.5"))
+# Per-scan output logs and exit codes; scans write there instead of to a pipe, so they outlive the webapp
+SCAN_LOG_DIR = os.environ.get("SCAN_LOG_DIR", os.path.join(tempfile.gettempdir(), "scan-logs"))
+# Stop running scans when the webapp shuts down; by default they keep running and are reattached on start
+SCAN_STOP_ON_SHUTDOWN = os.environ.get("SCAN_STOP_ON_SHUTDOWN", "0").lower() in ("1", "true", "yes")
+# Return code of a scan whose process ended while no webapp was watching it and left no exit code
+LOST_RETURN_CODE = -1
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+TRANSITIONS = {
+    QUEUED: (RUNNING, CANCELLED),
+    RUNNING: (COMPLETED, FAILED, CANCELLED),
+    COMPLETED: (),
+    FAILED: (),
+    CANCELLED: (),
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def normalize_target(target):
+    return target.strip().lower()
+
+
+def _proc_stat(pid):
+    # Fields of /proc/<pid>/stat after the command name (which may contain spaces); None off Linux
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+
+
+def process_start_time(pid):
+    """Start time of a process in clock ticks since boot (Linux), to tell a reused PID apart"""
+    fields = _proc_stat(pid)
+    try:
+        return int(fields[19]) if fields else None
+    except (IndexError, ValueError):
+        return None
+
+
+def process_alive(pid, start_time=None):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    fields = _proc_stat(pid)
+    if fields is None:
+        return True
+    if fields[0] == "Z":
+        return False
+    return start_time is None or process_start_time(pid) == start_time
+
+
+class DetachedProcess:
+    """A scan process started by an earlier webapp instance.
+
+    It is not our child, so its exit is polled and its return code read
+    from the exit file the launcher writes (LOST_RETURN_CODE without one).
+    """
+
+    def __init__(self, pid, start_time, exit_file):
+        self.pid = pid
+        self.start_time = start_time
+        self.exit_file = exit_file
+        self.returncode = None
+
+    async def wait(self):
+        while self.returncode is None:
+            if process_alive(self.pid, self.start_time):
+                await asyncio.sleep(SCAN_EVENTS_POLL_INTERVAL)
+                continue
+            try:
+                with open(self.exit_file) as f:
+                    self.returncode = int(f.read().strip())
+            except (OSError, ValueError):
+                self.returncode = LOST_RETURN_CODE
+        return self.returncode
+
+
+class ScanRecord:
+    """One submitted scan: its process, output buffer, progress and lifecycle state"""
+
+    def __init__(self, scan_id, target, kind, options=None):
+        self.id = scan_id
+        self.target = target
+        self.kind = kind
+        self.options = dict(options or {})
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.return_code = None
+        self.error = None
+        self.results_dir = None
+        self.zap_done = False
+        self.process = None
+        self.pid_start_time = None
+        self.task = None
+        self.events_file = os.path.join(SCAN_EVENTS_DIR, f"{scan_id}.jsonl")
+        self.log_file = os.path.join(SCAN_LOG_DIR, f"{scan_id}.log")
+        self.exit_file = os.path.join(SCAN_LOG_DIR, f"{scan_id}.exit")
+        self.progress = ScanProgress()
+        # Last lines of output, for /scans/{id}; live streaming goes through sse_hub
+        self._output = collections.deque(maxlen=SCAN_OUTPUT_BUFFER_LINES)
+        self._line_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    def append_output(self, line):
+        with self._lock:
+            self._output.append(line)
+            self._line_count += 1
+
+    def output_tail(self, limit):
+        with self._lock:
+            return list(self._output)[-limit:] if limit else []
+
+    def to_dict(self, output_lines=0):
+        data = {
+            "id": self.id,
+            "target": self.target,
+            "kind": self.kind,
+            "options": self.options,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": round((self.finished_at or time.time()) - self.started_at, 1) if self.started_at else None,
+            "return_code": self.return_code,
+            "error": self.error,
+            "pid": self.process.pid if self.process else None,
+            "zap_done": self.zap_done,
+            "results_dir": self.results_dir,
+            "output_lines": self._line_count,
+            "progress": self.progress.snapshot(),
+        }
+        if output_lines:
+            data["output"] = self.output_tail(output_lines)
+        return data
+
+
+class ScanRegistry:
+    """Tracks every scan and starts queued ones as concurrency slots free up.
+
+    `command_builder(record)` returns (argv, cwd) or (argv, cwd, env) for
+    the scan's process; env entries are added to the inherited environment.
+    The process gets SCAN_ID and CASCADE_EVENTS_FILE in its environment; the
+    typed progress events it appends there are applied to record.progress
+    and passed to event hooks while it runs.
+    Queued scans start in submission order, except that a scan whose target
+    is at its per-target limit does not hold back scans for other targets.
+
+    Processes are supervised on the event loop (asyncio subprocesses in
+    their own session), so submitting, reading output, cancelling and
+    collecting exit codes never block a worker thread. submit() and
+    cancel() must be awaited on the application's loop.
+
+    Output goes to a log file that is tailed, not to a pipe, so a scan
+    survives a webapp restart. With a `journal` (see state_journal.py),
+    every scan, transition and event is recorded, and recover() rebuilds
+    the registry on startup, reattaching scans that are still running.
+    """
+
+    def __init__(self, command_builder, max_concurrent=SCAN_MAX_CONCURRENT, max_per_target=SCAN_MAX_PER_TARGET,
+                 queue_limit=SCAN_QUEUE_LIMIT, journal=None):
+        self.command_builder = command_builder
+        self.max_concurrent = max_concurrent
+        self.max_per_target = max_per_target
+        self.queue_limit = queue_limit
+        self.journal = journal
+        self.reconcile = None
+        self._lock = threading.RLock()
+        self._scans = collections.OrderedDict()
+        self._queue = collections.deque()
+        self._schedule_lock = None
+        self._output_hooks = []
+        self._event_hooks = []
+        self._state_listeners = []
+
+    def add_output_hook(self, callback):
+        """callback(record, line) runs in the output thread for every line"""
+        self._output_hooks.append(callback)
+
+    def add_event_hook(self, callback):
+        """callback(record, event) runs for every progress event, after record.progress is updated"""
+        self._event_hooks.append(callback)
+
+    def add_state_listener(self, callback):
+        """callback(record, old_state, new_state) runs on every transition"""
+        self._state_listeners.append(callback)
+
+    # --- submission and scheduling ----------------------------------------
+
+    async def submit(self, target, kind="cascading", options=None):
+        with self._lock:
+            if len(self._queue) >= self.queue_limit:
+                raise QueueFull(f"{len(self._queue)} scans already queued (limit {self.queue_limit})")
+            scan_id = f"{kind}-scan-{int(time.time())}-{uuid.uuid4().hex[:6]}"
+            record = ScanRecord(scan_id, target, kind, options)
+            self._scans[scan_id] = record
+            self._queue.append(record)
+            print(f"[SCAN-REGISTRY] Queued {scan_id} for {target}")
+            self._journal_save(record)
+            self._prune()
+        await self._schedule()
+        return record
+
+    async def recover(self, reconcile=None):
+        """Rebuild the registry from the journal after a restart.
+
+        Queued scans are queued again. Running scans are reattached: their
+        output and events are re-read from their files and their process is
+        watched until it exits. A scan whose process ended while the webapp
+        was down is finished from its exit file; without one it fails, after
+        `reconcile(record)` (run in a worker thread) had a chance to check it
+        against the cluster and MinIO.
+        """
+        if self.journal is None:
+            return
+        self.reconcile = reconcile
+        reattached = 0
+        for row in self.journal.load(SCAN_HISTORY_LIMIT):
+            record = ScanRecord(row["id"], row["target"], row["kind"], json.loads(row["options"] or "{}"))
+            record.created_at = row["created_at"]
+            record.started_at = row["started_at"]
+            record.finished_at = row["finished_at"]
+            record.return_code = row["return_code"]
+            record.error = row["error"]
+            record.zap_done = bool(row["zap_done"])
+            record.state = row["state"]
+            with self._lock:
+                self._scans[record.id] = record
+                if record.state == QUEUED:
+                    self._queue.append(record)
+            if record.state == RUNNING and row["pid"]:
+                record.pid_start_time = row["pid_start_time"]
+                record.process = DetachedProcess(row["pid"], row["pid_start_time"], record.exit_file)
+                record.task = asyncio.ensure_future(self._supervise(record))
+                reattached += 1
+            elif record.state == RUNNING:
+                # Marked running but never started: start it again
+                record.state = QUEUED
+                with self._lock:
+                    self._queue.append(record)
+            else:
+                for event in self.journal.events(record.id):
+                    record.progress.apply(event)
+                record.progress.finish(record.state)
+                self._load_output(record)
+        print(f"[SCAN-REGISTRY] Recovered {len(self._scans)} scans from the journal ({reattached} reattached, "
+              f"{len(self._queue)} queued)")
+        await self._schedule()
+
+    def _load_output(self, record):
+        try:
+            with open(record.log_file, "rb") as f:
+                for raw in collections.deque(f, maxlen=SCAN_OUTPUT_BUFFER_LINES):
+                    line = raw.decode(errors="replace").strip()
+                    if line:
+                        record.append_output(line)
+        except OSError:
+            pass
+
+    def _journal_save(self, record):
+        if self.journal is None:
+            return
+        try:
+            self.journal.save(record)
+        except Exception as e:
+            print(f"[SCAN-REGISTRY] Journal error for {record.id}: {e}")
+
+    def _running(self):
+        return [r for r in self._scans.values() if r.state == RUNNING]
+
+    def _next_startable(self):
+        """Take the next queued scan that fits the limits off the queue, or None"""
+        with self._lock:
+            running = self._running()
+            if len(running) >= self.max_concurrent:
+                return None
+            per_target = collections.Counter(normalize_target(r.target) for r in running)
+            for record in self._queue:
+                if per_target[normalize_target(record.target)] < self.max_per_target:
+                    self._queue.remove(record)
+                    self._transition(record, RUNNING)
+                    return record
+            return None
+
+    async def _schedule(self):
+        if self._schedule_lock is None:
+            # Created lazily so it belongs to the running loop
+            self._schedule_lock = asyncio.Lock()
+        async with self._schedule_lock:
+            while True:
+                record = self._next_startable()
+                if record is None:
+                    return
+                await self._start(record)
+
+    async def _start(self, record):
+        record.started_at = time.time()
+        try:
+            command = self.command_builder(record)
+            argv, cwd = command[:2]
+            os.makedirs(SCAN_EVENTS_DIR, exist_ok=True)
+            os.makedirs(SCAN_LOG_DIR, exist_ok=True)
+            env = dict(os.environ, **(command[2] if len(command) > 2 else {}))
+            env.update(SCAN_ID=record.id, CASCADE_EVENTS_FILE=record.events_file, SCAN_EXIT_FILE=record.exit_file)
+            # The launcher shell records the exit code for a webapp that reattaches after a restart
+            launcher = ["sh", "-c", '"$@"; rc=$?; echo "$rc" > "$SCAN_EXIT_FILE"; exit "$rc"', "sh"]
+            with open(record.log_file, "ab") as log:
+                # New session: the script and every kubectl/python child share one process group
+                record.process = await asyncio.create_subprocess_exec(
+                    *(launcher + list(argv)),
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=asyncio.subprocess.STDOUT,
+                    cwd=cwd,
+                    env=env,
+                    start_new_session=True
+                )
+            record.pid_start_time = process_start_time(record.process.pid)
+        except Exception as e:
+            print(f"[SCAN-REGISTRY] Failed to start {record.id}: {e}")
+            record.error = str(e)
+            with self._lock:
+                self._finish(record, FAILED)
+            return
+        print(f"[SCAN-REGISTRY] Started {record.id} (PID: {record.process.pid})")
+        self._journal_save(record)
+        record.task = asyncio.ensure_future(self._supervise(record))
+
+    async def _supervise(self, record):
+        exited = asyncio.Event()
+        followers = asyncio.gather(
+            self._follow(record.log_file, exited, lambda raw: self._dispatch_output(record, raw)),
+            self._follow(record.events_file, exited, lambda raw: self._dispatch_event(record, raw)))
+        try:
+            record.return_code = await record.process.wait()
+        except asyncio.CancelledError:
+            # Detached on shutdown: the process keeps running and recover() reattaches it
+            followers.cancel()
+            await asyncio.gather(followers, return_exceptions=True)
+            raise
+        print(f"[SCAN-REGISTRY] {record.id} exited with code {record.return_code}")
+        # Read the last output and events (e.g. workflow_finished) before the final transition
+        exited.set()
+        await asyncio.gather(followers, return_exceptions=True)
+        try:
+            os.remove(record.events_file)
+        except OSError:
+            pass
+        if record.return_code == LOST_RETURN_CODE and record.state == RUNNING:
+            record.error = "Process ended while the webapp was down; exit code unknown"
+            if self.reconcile is not None:
+                try:
+                    await asyncio.get_event_loop().run_in_executor(None, self.reconcile, record)
+                except Exception as e:
+                    print(f"[SCAN-REGISTRY] Reconciling {record.id} failed: {e}")
+        with self._lock:
+            if record.state == RUNNING:
+                self._finish(record, COMPLETED if record.return_code == 0 else FAILED)
+        await self._schedule()
+
+    async def _follow(self, path, exited, on_line):
+        """Pass each line appended to path to on_line until the process has exited"""
+        offset = 0
+        partial = b""
+        while True:
+            done = exited.is_set()
+            try:
+                if os.path.getsize(path) > offset:
+                    with open(path, "rb") as f:
+                        f.seek(offset)
+                        chunk = f.read()
+                    offset += len(chunk)
+                    lines = (partial + chunk).split(b"\n")
+                    # A line without its newline yet is completed by the next read
+                    partial = lines.pop()
+                    if len(partial) > SCAN_MAX_LINE_BYTES:
+                        # Never-ending line: pass on what there is
+                        lines.append(partial)
+                        partial = b""
+                    for raw in lines:
+                        on_line(raw)
+            except FileNotFoundError:
+                pass
+            if done:
+                if partial:
+                    on_line(partial)
+                return
+            try:
+                await asyncio.wait_for(exited.wait(), SCAN_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch_output(self, record, raw):
+        line = raw.decode(errors='replace').strip()
+        if not line:
+            return
+        record.append_output(line)
+        for hook in self._output_hooks:
+            try:
+                hook(record, line)
+            except Exception as e:
+                print(f"[SCAN-REGISTRY] Output hook error: {e}")
+
+    def _dispatch_event(self, record, raw):
+        if not raw.strip():
+            return
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            print(f"[SCAN-REGISTRY] Ignoring malformed event from {record.id}: {raw[:200]!r}")
+            return
+        if not isinstance(event, dict):
+            return
+        record.progress.apply(event)
+        if self.journal is not None:
+            try:
+                # Sequence numbers make re-reading the events file after a reattach idempotent
+                self.journal.append_event(record.id, record.progress.events, event)
+            except Exception as e:
+                print(f"[SCAN-REGISTRY] Journal error for {record.id}: {e}")
+        for hook in self._event_hooks:
+            try:
+                hook(record, event)
+            except Exception as e:
+                print(f"[SCAN-REGISTRY] Event hook error: {e}")
+
+    def _transition(self, record, new_state):
+        old_state = record.state
+        if new_state not in TRANSITIONS[old_state]:
+            raise InvalidTransition(f"{record.id}: {old_state} -> {new_state}")
+        record.state = new_state
+        self._journal_save(record)
+        for callback in self._state_listeners:
+            try:
+                callback(record, old_state, new_state)
+            except Exception as e:
+                print(f"[SCAN-REGISTRY] State listener error: {e}")
+
+    def _finish(self, record, state):
+        record.finished_at = time.time()
+        record.progress.finish(state)
+        self._transition(record, state)
+
+    def _prune(self):
+        finished = [r for r in self._scans.values() if not r.active]
+        for record in finished[:max(0, len(finished) - SCAN_HISTORY_LIMIT)]:
+            self._forget(record)
+
+    def _forget(self, record):
+        del self._scans[record.id]
+        if self.journal is not None:
+            try:
+                self.journal.forget(record.id)
+            except Exception as e:
+                print(f"[SCAN-REGISTRY] Journal error for {record.id}: {e}")
+        for path in (record.log_file, record.exit_file):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # --- control ------------------------------------------------------------
+
+    async def cancel(self, scan_id):
+        """Cancel a queued scan or stop a running one; returns the record or None.
+
+        Returns as soon as the scan is marked cancelled; the process group is
+        stopped in the background (SIGTERM, then SIGKILL after the grace period).
+        """
+        with self._lock:
+            record = self._scans.get(scan_id)
+            if record is None or not record.active:
+                return record
+            if record.state == QUEUED:
+                self._queue.remove(record)
+            self._finish(record, CANCELLED)
+        if record.process is not None:
+            asyncio.ensure_future(self._terminate(record.process))
+        return record
+
+    async def _terminate(self, process):
+        if process.returncode is not None:
+            return
+        print(f"Terminating process group (PID: {process.pid})")
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), SCAN_TERMINATE_GRACE)
+            except asyncio.TimeoutError:
+                print("Process didn't terminate gracefully, forcing kill")
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+        except ProcessLookupError:
+            pass
+        except Exception as e:
+            print(f"Error terminating process: {e}")
+
+    async def shutdown(self, stop_scans=SCAN_STOP_ON_SHUTDOWN):
+        """Application shutdown: stop supervising scans.
+
+        Without a journal, or with stop_scans, running scans are stopped;
+        otherwise they keep running and the next start reattaches them.
+        """
+        if self.journal is not None and not stop_scans:
+            tasks = [r.task for r in self.list() if r.task is not None and not r.task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if tasks:
+                print(f"[SCAN-REGISTRY] Detached {len(tasks)} running scans; they are reattached on the next start")
+            return
+        for record in self.list():
+            if record.active:
+                await self.cancel(record.id)
+        processes = [r.process for r in self.list() if r.process is not None and r.process.returncode is None]
+        await asyncio.gather(*(self._terminate(p) for p in processes), return_exceptions=True)
+
+    def forget_finished(self):
+        """Drop finished scans from the registry; returns how many were removed"""
+        with self._lock:
+            finished = [r for r in self._scans.values() if not r.active]
+            for record in finished:
+                self._forget(record)
+            return len(finished)
+
+    # --- queries --------------------------------------------------------------
+
+    def get(self, scan_id):
+        with self._lock:
+            return self._scans.get(scan_id)
+
+    def list(self, state=None):
+        with self._lock:
+            return [r for r in reversed(self._scans.values()) if state is None or r.state == state]
+
+    def latest(self, active_only=False):
+        """Most recently submitted scan (used by the single-scan legacy routes)"""
+        for record in self.list():
+            if not active_only or record.active:
+                return record
+        return None
+
+    def queue_position(self, record):
+        with self._lock:
+            try:
+                return self._queue.index(record) + 1
+            except ValueError:
+                return None
+
+    def stats(self):
+        with self._lock:
+            counts = collections.Counter(r.state for r in self._scans.values())
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_per_target": self.max_per_target,
+                "queue_limit": self.queue_limit,
+                "queued": counts.get(QUEUED, 0),
+                "running": counts.get(RUNNING, 0),
+                "completed": counts.get(COMPLETED, 0),
+                "failed": counts.get(FAILED, 0),
+                "cancelled": counts.get(CANCELLED, 0),
+            }
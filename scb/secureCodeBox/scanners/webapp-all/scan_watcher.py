@@ -0,0 +1,235 @@
+"""Watch-based tracking of secureCodeBox Scan CRD state.
+
+One background thread keeps a watch on scans.execution.securecodebox.io
+open, resuming from the last resourceVersion (and re-listing when the
+API server answers 410 Gone). State transitions are pushed to blocked
+waiters and to listeners, so nobody has to poll with fixed sleeps.
+
+Also usable from shell scripts:
+
+    python3 scan_watcher.py wait <scan-name> --namespace default --timeout 1800
+
+prints each state transition and exits 0 once the scan is Done, 1 when it
+is Errored, deleted before finishing, or the timeout passes.
+"""
+import argparse
+import os
+import sys
+import time
+import threading
+
+from kubernetes import client, watch
+
+from kube_client import get_custom_objects_api
+
+SCAN_GROUP = "execution.securecodebox.io"
+SCAN_VERSION = "v1"
+SCAN_PLURAL = "scans"
+# Server-side timeout of one watch request; the watch is resumed right after
+SCAN_WATCH_TIMEOUT = int(os.environ.get("SCAN_WATCH_TIMEOUT", "300"))
+TERMINAL_STATES = ("Done", "Errored")
+# Recorded for a scan deleted (or dropped by a re-list) before it reached a terminal state
+DELETED = "Deleted"
+# Label linking a Scan CRD to the webapp scan (SCAN_ID) whose cascade created it
+SCAN_ID_LABEL = "webapp-all/scan-id"
+
+
+class ScanWatcher:
+    """Caches the state of every Scan in a namespace from a single watch"""
+
+    def __init__(self, namespace, api_factory=get_custom_objects_api, field_selector=None):
+        self.namespace = namespace
+        self.field_selector = field_selector
+        self._api_factory = api_factory
+        self._api = None
+        self._scans = {}
+        # Terminal state of scans seen finishing, kept after the Scan is deleted
+        # (ttlSecondsAfterFinished: 0 removes it right after Done)
+        self._finished = {}
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._listeners = []
+        self._resource_version = None
+        self._synced = False
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_error = None
+
+    # --- lifecycle -------------------------------------------------------
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"scan-watcher-{self.namespace}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add_listener(self, callback):
+        """callback(name, old_state, new_state, scan) is called on every transition"""
+        self._listeners.append(callback)
+
+    def _list_kwargs(self):
+        kwargs = {}
+        if self.field_selector:
+            kwargs['field_selector'] = self.field_selector
+        return kwargs
+
+    def _relist(self):
+        response = self._api.list_namespaced_custom_object(
+            SCAN_GROUP, SCAN_VERSION, self.namespace, SCAN_PLURAL, **self._list_kwargs())
+        seen = set()
+        for scan in response.get('items', []):
+            seen.add(scan['metadata']['name'])
+            self._apply('ADDED', scan)
+        for name in [n for n in self._scans if n not in seen]:
+            self._apply('DELETED', self._scans[name]['object'])
+        self._resource_version = response['metadata']['resourceVersion']
+        with self._cond:
+            self._synced = True
+            self._cond.notify_all()
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                # Cheap when cached; picks up a client rebuilt after credential rotation
+                self._api = self._api_factory()
+                if self._resource_version is None:
+                    self._relist()
+                stream = watch.Watch().stream(
+                    self._api.list_namespaced_custom_object,
+                    SCAN_GROUP, SCAN_VERSION, self.namespace, SCAN_PLURAL,
+                    resource_version=self._resource_version,
+                    timeout_seconds=SCAN_WATCH_TIMEOUT,
+                    allow_watch_bookmarks=True,
+                    **self._list_kwargs())
+                for event in stream:
+                    if self._stop.is_set():
+                        break
+                    scan = event['object']
+                    self._resource_version = scan.get('metadata', {}).get('resourceVersion', self._resource_version)
+                    if event['type'] != 'BOOKMARK':
+                        self._apply(event['type'], scan)
+                backoff = 1
+            except client.exceptions.ApiException as e:
+                if e.status == 410:
+                    # Our resourceVersion is too old: start over from a fresh list
+                    print("[SCAN-WATCHER] resourceVersion expired, re-listing scans")
+                    self._resource_version = None
+                    continue
+                self._on_error(e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                self._on_error(e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _on_error(self, error):
+        self.last_error = str(error)
+        print(f"[SCAN-WATCHER] Watch error: {error}")
+
+    def _apply(self, event_type, scan):
+        name = scan['metadata']['name']
+        with self._cond:
+            previous = self._scans.get(name)
+            old_state = previous['state'] if previous else None
+            if event_type == 'DELETED':
+                self._scans.pop(name, None)
+                new_state = DELETED
+                # Without this, waiters on a scan that vanished before Done/Errored would block until timeout
+                self._finished.setdefault(name, DELETED)
+            else:
+                new_state = scan.get('status', {}).get('state', 'Init')
+                if new_state in TERMINAL_STATES:
+                    self._finished[name] = new_state
+                elif old_state is None:
+                    self._finished.pop(name, None)
+                self._scans[name] = {'state': new_state, 'uid': scan['metadata'].get('uid'), 'object': scan,
+                                     'updated': time.time()}
+            if old_state == new_state:
+                return
+            self._seq += 1
+            self._cond.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(name, old_state, new_state, scan)
+            except Exception as e:
+                print(f"[SCAN-WATCHER] Listener error: {e}")
+
+    # --- queries ---------------------------------------------------------
+
+    def wait_synced(self, timeout=None):
+        self.start()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._synced, timeout)
+
+    def get_state(self, name):
+        """Last known state of a scan, or None if the watcher has not seen it"""
+        with self._cond:
+            return self._current(name)
+
+    def get_scan(self, name):
+        with self._cond:
+            entry = self._scans.get(name)
+            return entry['object'] if entry else None
+
+    def wait_for(self, name, states=TERMINAL_STATES, timeout=None):
+        """Block until the scan reaches one of `states` or is deleted; returns the state or None on timeout"""
+        self.start()
+        with self._cond:
+            reached = self._cond.wait_for(lambda: self._current(name) in states or self._current(name) == DELETED,
+                                          timeout)
+            return self._current(name) if reached else None
+
+    def _current(self, name):
+        entry = self._scans.get(name)
+        return entry['state'] if entry else self._finished.get(name)
+
+    def status(self):
+        with self._cond:
+            return {
+                'namespace': self.namespace,
+                'running': self._thread is not None and self._thread.is_alive(),
+                'synced': self._synced,
+                'resource_version': self._resource_version,
+                'scans_tracked': len(self._scans),
+                'last_event_seq': self._seq,
+                'last_error': self.last_error,
+            }
+
+
+def _wait_cli(args):
+    watcher = ScanWatcher(args.namespace, field_selector=f"metadata.name={args.scan_name}")
+    watcher.add_listener(lambda name, old, new, scan: print(f"Current state: {new}", flush=True))
+    watcher.start()
+    state = watcher.wait_for(args.scan_name, TERMINAL_STATES, args.timeout)
+    if state == "Done":
+        print("✅ Scan completed successfully!", flush=True)
+        return 0
+    if state == "Errored":
+        print("❌ Scan failed!", flush=True)
+    elif state == DELETED:
+        print("❌ Scan was deleted before it finished!", flush=True)
+    else:
+        print(f"❌ Scan did not finish within {args.timeout}s", flush=True)
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait for secureCodeBox scans using the Kubernetes watch API")
+    sub = parser.add_subparsers(dest="command", required=True)
+    wait = sub.add_parser("wait", help="block until a scan is Done (exit 0) or Errored/deleted (exit 1)")
+    wait.add_argument("scan_name")
+    wait.add_argument("--namespace", default=os.environ.get("K8S_NAMESPACE", "default"))
+    wait.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args()
+    sys.exit(_wait_cli(args))
+
+
+if __name__ == "__main__":
+    main()
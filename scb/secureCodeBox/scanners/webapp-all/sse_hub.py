@@ -0,0 +1,176 @@
+import os
+import json
+import asyncio
+import threading
+import collections
+
+# Events kept per channel for replay (Last-Event-ID) and late subscribers
+SSE_BUFFER_EVENTS = int(os.environ.get("SSE_BUFFER_EVENTS", "5000"))
+# A subscriber this many events behind is skipped ahead to the newest events
+SSE_MAX_LAG = int(os.environ.get("SSE_MAX_LAG", str(SSE_BUFFER_EVENTS // 2)))
+# Events sent again after a skip, so the client still sees the latest output
+SSE_RESUME_TAIL = int(os.environ.get("SSE_RESUME_TAIL", "100"))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_MAX_CHANNELS = int(os.environ.get("SSE_MAX_CHANNELS", "200"))
+
+
+class _Channel:
+    def __init__(self, name):
+        self.name = name
+        self.events = collections.deque(maxlen=SSE_BUFFER_EVENTS)
+        # Id of the next event; ids start at 1 so Last-Event-ID 0 means "from the start"
+        self.next_id = 1
+        self.closed = False
+        self.subscribers = 0
+        self.wakeup = None
+
+
+class SSEHub:
+    """Fan-out of server-sent events with a bounded replay buffer per channel.
+
+    publish() may be called from any thread (e.g. a scan's output reader);
+    subscribers are async generators on the event loop, each with its own
+    cursor, so any number of tabs see every line and can resume with
+    Last-Event-ID. A subscriber that falls too far behind gets one summary
+    event for the skipped range instead of an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = collections.OrderedDict()
+        self._loop = None
+
+    def _channel(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self._channels[name] = _Channel(name)
+            while len(self._channels) > SSE_MAX_CHANNELS:
+                oldest = next(iter(self._channels.values()))
+                if oldest.subscribers:
+                    break
+                del self._channels[oldest.name]
+        return channel
+
+    def publish(self, name, data):
+        """Append an event to a channel and wake its subscribers; returns the event id"""
+        with self._lock:
+            channel = self._channel(name)
+            event_id = channel.next_id
+            channel.events.append((event_id, data))
+            channel.next_id += 1
+        self._wake(channel)
+        return event_id
+
+    def replay_closed(self, name, events):
+        """Create a closed channel holding `events` unless `name` already has a channel; True if created.
+
+        For streams whose source finished before anyone subscribed (e.g. a
+        scan recovered after a restart), which nothing will publish to again.
+        """
+        with self._lock:
+            if name in self._channels:
+                return False
+            channel = self._channel(name)
+            for data in events:
+                channel.events.append((channel.next_id, data))
+                channel.next_id += 1
+            channel.closed = True
+        return True
+
+    def close(self, name):
+        """Mark a channel finished; subscribers drain what is left and stop"""
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                return
+            channel.closed = True
+        self._wake(channel)
+
+    def _wake(self, channel):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._set_wakeup, channel)
+        except RuntimeError:
+            pass
+
+    @staticmethod
+    def _set_wakeup(channel):
+        if channel.wakeup is not None:
+            channel.wakeup.set()
+            channel.wakeup = None
+
+    def _read(self, channel, cursor, check_lag=True):
+        """Events after `cursor` plus the number skipped because of overflow or lag"""
+        with self._lock:
+            first_id = channel.next_id - len(channel.events)
+            skipped = 0
+            if cursor + 1 < first_id:
+                skipped = first_id - cursor - 1
+                cursor = first_id - 1
+            if check_lag and channel.next_id - 1 - cursor > SSE_MAX_LAG:
+                new_cursor = channel.next_id - 1 - SSE_RESUME_TAIL
+                skipped += new_cursor - cursor
+                cursor = new_cursor
+            events = [e for e in channel.events if e[0] > cursor]
+            return events, skipped, channel.closed
+
+    async def subscribe(self, name, last_event_id=None, keepalive=SSE_KEEPALIVE_SECONDS):
+        """Yield (event_id, data) tuples; event_id is None for keepalives and summaries"""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            channel = self._channel(name)
+            channel.subscribers += 1
+        cursor = last_event_id or 0
+        # The initial replay is sent in full; lag only counts once the client is live
+        catching_up = True
+        try:
+            while True:
+                wakeup = asyncio.Event()
+                with self._lock:
+                    channel.wakeup = channel.wakeup or wakeup
+                    wakeup = channel.wakeup
+                events, skipped, closed = self._read(channel, cursor, check_lag=not catching_up)
+                catching_up = False
+                if skipped:
+                    yield None, {"summary": True, "dropped": skipped,
+                                 "message": f"{skipped} lines skipped, client fell behind"}
+                for event_id, data in events:
+                    cursor = event_id
+                    yield event_id, data
+                if events or skipped:
+                    continue
+                if closed:
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None, {"keepalive": True}
+        finally:
+            with self._lock:
+                channel.subscribers -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(c.subscribers for c in self._channels.values()),
+                "buffered_events": sum(len(c.events) for c in self._channels.values()),
+                "buffer_events": SSE_BUFFER_EVENTS,
+                "max_lag": SSE_MAX_LAG,
+            }
+
+
+def format_sse(event_id, data):
+    """One text/event-stream message"""
+    message = f"data: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+
+def parse_last_event_id(request):
+    value = request.headers.get("last-event-id", "")
+    return int(value) if value.isdigit() else None
+
+
+sse_hub = SSEHub()
@@ -0,0 +1,163 @@
+"""Durable journal of the scan registry's scans, for webapp restarts.
+
+SQLite holds one row per scan (target, options, state, process id, exit
+code) and the append-only list of its progress events, from which stages,
+counts and artifact locations are rebuilt. ScanRegistry writes to it on
+every submission, start, transition and event, and reads it back in
+recover() on startup.
+
+reconcile_lost_scan() checks a scan whose process ended while the webapp
+was down against its Scan CRDs (labelled with SCAN_ID_LABEL) and against
+MinIO, so its record says what still runs in the cluster and which of its
+artifacts exist.
+"""
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+
+from botocore.exceptions import ClientError
+
+from kube_client import get_custom_objects_api
+from minio_client import get_s3_client
+from scan_watcher import SCAN_GROUP, SCAN_VERSION, SCAN_PLURAL, SCAN_ID_LABEL, TERMINAL_STATES
+
+STATE_JOURNAL_PATH = os.environ.get("STATE_JOURNAL_PATH", os.path.join(tempfile.gettempdir(), "webapp-all-state.sqlite3"))
+K8S_NAMESPACE = os.environ.get("K8S_NAMESPACE", "default")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    options TEXT,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    pid_start_time INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    return_code INTEGER,
+    error TEXT,
+    zap_done INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_scans_state ON scans (state, created_at);
+CREATE TABLE IF NOT EXISTS scan_events (
+    scan_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (scan_id, seq)
+);
+"""
+_ACTIVE_STATES = ("queued", "running")
+
+
+class StateJournal:
+    """SQLite-backed record of every scan and its progress events"""
+
+    def __init__(self, path=STATE_JOURNAL_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def save(self, record):
+        """Insert or update a scan's row from its ScanRecord"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scans (id, target, kind, options, state, pid, pid_start_time, created_at,"
+                " started_at, finished_at, return_code, error, zap_done) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record.id, record.target, record.kind, json.dumps(record.options), record.state,
+                 record.process.pid if record.process else None, record.pid_start_time, record.created_at,
+                 record.started_at, record.finished_at, record.return_code, record.error, int(record.zap_done)))
+
+    def append_event(self, scan_id, seq, event):
+        """Record a progress event; the same (scan, seq) again is ignored"""
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO scan_events (scan_id, seq, event) VALUES (?, ?, ?)",
+                         (scan_id, seq, json.dumps(event)))
+
+    def load(self, finished_limit):
+        """Every queued or running scan plus the newest finished ones, oldest first"""
+        conn = self._connect()
+        placeholders = ",".join("?" * len(_ACTIVE_STATES))
+        rows = conn.execute(f"SELECT * FROM scans WHERE state IN ({placeholders})", _ACTIVE_STATES).fetchall()
+        rows += conn.execute(f"SELECT * FROM scans WHERE state NOT IN ({placeholders}) ORDER BY created_at DESC LIMIT ?",
+                             _ACTIVE_STATES + (finished_limit,)).fetchall()
+        return sorted((dict(row) for row in rows), key=lambda row: row["created_at"])
+
+    def events(self, scan_id):
+        conn = self._connect()
+        return [json.loads(row[0]) for row in
+                conn.execute("SELECT event FROM scan_events WHERE scan_id = ? ORDER BY seq", (scan_id,))]
+
+    def forget(self, scan_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM scan_events WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scans WHERE id = ?", (scan_id,))
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "path": self.path,
+            "scans": dict(conn.execute("SELECT state, COUNT(*) FROM scans GROUP BY state").fetchall()),
+            "events": conn.execute("SELECT COUNT(*) FROM scan_events").fetchone()[0],
+        }
+
+
+state_journal = StateJournal()
+
+
+def _artifact_exists(s3, uri):
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def reconcile_lost_scan(record, namespace=K8S_NAMESPACE):
+    """Annotate a scan whose process ended unobserved with the state of its CRDs and artifacts.
+
+    Scan CRDs of the cascade that are still running keep going in the
+    cluster (their findings still reach MinIO and the findings store);
+    artifacts no longer in MinIO are dropped from the scan's progress.
+    """
+    notes = []
+    try:
+        scans = get_custom_objects_api().list_namespaced_custom_object(
+            SCAN_GROUP, SCAN_VERSION, namespace, SCAN_PLURAL, label_selector=f"{SCAN_ID_LABEL}={record.id}")
+        running = [s["metadata"]["name"] for s in scans.get("items", [])
+                   if (s.get("status") or {}).get("state") not in TERMINAL_STATES]
+        if running:
+            notes.append(f"{len(running)} of its Scan CRDs still running ({', '.join(running)})")
+    except Exception as e:
+        print(f"[STATE-JOURNAL] Could not list Scan CRDs of {record.id}: {e}")
+    artifacts = record.progress.artifacts
+    if artifacts:
+        try:
+            s3 = get_s3_client()
+            kept = [a for a in artifacts if not a["uri"].startswith("s3://") or _artifact_exists(s3, a["uri"])]
+            if len(kept) < len(artifacts):
+                notes.append(f"{len(artifacts) - len(kept)} artifacts missing from MinIO")
+            record.progress.artifacts = kept
+        except Exception as e:
+            print(f"[STATE-JOURNAL] Could not check artifacts of {record.id}: {e}")
+    if notes:
+        record.error = f"{record.error}; {'; '.join(notes)}"
+    print(f"[STATE-JOURNAL] Reconciled {record.id}: {record.error}")
@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+import zipfile
+
+from minio_client import MINIO_POOL_SIZE
+import minio_async
+
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "securecodebox")
+# Objects fetched in parallel while the archive is being written
+ZIP_FETCH_CONCURRENCY = max(1, min(int(os.environ.get("ZIP_FETCH_CONCURRENCY", "4")), MINIO_POOL_SIZE))
+# Objects up to this size are read fully by the fetch tasks, larger ones are streamed
+ZIP_PREFETCH_MAX_BYTES = int(os.environ.get("ZIP_PREFETCH_MAX_BYTES", str(1024 * 1024)))
+ZIP_CHUNK_SIZE = int(os.environ.get("ZIP_CHUNK_SIZE", str(64 * 1024)))
+ZIP_TEXT_COMPRESSLEVEL = int(os.environ.get("ZIP_TEXT_COMPRESSLEVEL", "6"))
+ZIP_BINARY_COMPRESSLEVEL = int(os.environ.get("ZIP_BINARY_COMPRESSLEVEL", "1"))
+
+# Payloads that do not shrink any further are stored as-is
+COMPRESSED_EXTENSIONS = ('.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.apk', '.jar',
+                         '.png', '.jpg', '.jpeg', '.gif', '.webp', '.pdf')
+TEXT_EXTENSIONS = ('.json', '.jsonl', '.xml', '.html', '.htm', '.txt', '.md', '.log', '.csv', '.yaml', '.yml', '.sarif')
+
+
+def compression_for(key):
+    """Pick (compress_type, compresslevel) for one archive entry"""
+    lower_key = key.lower()
+    if lower_key.endswith(COMPRESSED_EXTENSIONS):
+        return zipfile.ZIP_STORED, None
+    if lower_key.endswith(TEXT_EXTENSIONS):
+        return zipfile.ZIP_DEFLATED, ZIP_TEXT_COMPRESSLEVEL
+    return zipfile.ZIP_DEFLATED, ZIP_BINARY_COMPRESSLEVEL
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object; zipfile falls back to data descriptors"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+async def _fetch(s3, key, bucket):
+    obj = await s3.get_object(Bucket=bucket, Key=key)
+    body = obj['Body']
+    if obj['ContentLength'] <= ZIP_PREFETCH_MAX_BYTES:
+        try:
+            return key, obj, await body.read(), None
+        finally:
+            body.close()
+    return key, obj, None, body
+
+
+def _entry_info(arcname, obj):
+    last_modified = obj.get('LastModified')
+    date_time = last_modified.timetuple()[:6] if last_modified else time.localtime()[:6]
+    zinfo = zipfile.ZipInfo(arcname, date_time=date_time)
+    zinfo.compress_type, level = compression_for(arcname)
+    # ZipFile.open(zinfo, 'w') takes the level from the ZipInfo; it is public as compress_level
+    # from Python 3.13, older versions only have the private _compresslevel
+    if hasattr(zipfile.ZipInfo, 'compress_level'):
+        zinfo.compress_level = level
+    else:
+        zinfo._compresslevel = level
+    zinfo.file_size = obj['ContentLength']
+    zinfo.external_attr = 0o644 << 16
+    return zinfo
+
+
+async def stream_zip(files, strip_prefix='', bucket=MINIO_BUCKET, concurrency=ZIP_FETCH_CONCURRENCY):
+    """Yield a ZIP archive of the given index entries as it is being built.
+
+    Up to `concurrency` objects are fetched at once on the event loop and
+    each entry is compressed (in a worker thread) and emitted as soon as its
+    object arrives, so memory stays bounded by
+    concurrency * ZIP_PREFETCH_MAX_BYTES regardless of folder size.
+    """
+    keys = [f['key'] for f in files]
+    sink = _ChunkSink()
+    errors = []
+    start = time.time()
+    total_bytes = 0
+
+    s3 = await minio_async.get_async_s3_client()
+    pending = {}
+    remaining = iter(keys)
+
+    def submit_next():
+        for key in remaining:
+            pending[asyncio.ensure_future(_fetch(s3, key, bucket))] = key
+            return
+
+    try:
+        with zipfile.ZipFile(sink, 'w', allowZip64=True) as zip_file:
+            for _ in range(concurrency):
+                submit_next()
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = pending.pop(task)
+                    submit_next()
+                    try:
+                        _, obj, data, body = task.result()
+                    except Exception as e:
+                        print(f"[ZIP-STREAM] Error fetching {key}: {e}")
+                        errors.append(f"{key}: {e}")
+                        continue
+
+                    arcname = key[len(strip_prefix):] if strip_prefix and key.startswith(strip_prefix) else key.split('/')[-1]
+                    zinfo = _entry_info(arcname, obj)
+                    try:
+                        with zip_file.open(zinfo, 'w') as entry:
+                            # Deflating a prefetched object can take tens of ms; keep it off the loop
+                            if data is not None:
+                                await asyncio.to_thread(entry.write, data)
+                                total_bytes += len(data)
+                            else:
+                                async for chunk in body.iter_chunks(ZIP_CHUNK_SIZE):
+                                    await asyncio.to_thread(entry.write, chunk)
+                                    total_bytes += len(chunk)
+                                    for piece in sink.drain():
+                                        yield piece
+                    except Exception as e:
+                        print(f"[ZIP-STREAM] Error adding {key}: {e}")
+                        errors.append(f"{key}: {e}")
+                    finally:
+                        if body is not None:
+                            body.close()
+                    for piece in sink.drain():
+                        yield piece
+
+            if errors:
+                # The status line is already sent, so report failures inside the archive
+                zip_file.writestr('_errors.txt', "\n".join(errors) + "\n")
+    finally:
+        # Client went away or we failed: release any objects fetched but not written
+        for task in pending:
+            task.cancel()
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for result in results:
+            if isinstance(result, tuple) and result[3] is not None:
+                result[3].close()
+
+    for piece in sink.drain():
+        yield piece
+    print(f"[ZIP-STREAM] Streamed {len(keys) - len(errors)}/{len(keys)} files "
+          f"({total_bytes} bytes) in {time.time()-start:.2f}s")